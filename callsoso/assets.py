@@ -0,0 +1,147 @@
+"""
+Static asset build step for Call Soso.
+
+Runs inside ``collectstatic``: the stylesheets of each bundle listed in
+``settings.STATIC_BUNDLES`` (the shared ``site`` bundle and one per page
+family) are concatenated and minified into ``bundles/<name>.css`` before
+WhiteNoise hashes them and writes the gzip and Brotli variants. A small
+``bundles/manifest.json`` records each bundle and the fonts it references,
+which the ``stylesheet_bundle`` template tag turns into
+``<link rel="stylesheet">`` tags and font ``<link rel="preload">`` hints.
+"""
+
+import json
+import logging
+import posixpath
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_DIR = "bundles"
+BUNDLE_MANIFEST = f"{BUNDLE_DIR}/manifest.json"
+SHARED_BUNDLE = "site"  # linked on every page, ahead of the page family's bundle
+
+_COMMENT_RE = re.compile(r"/\*(?!!).*?\*/", re.S)
+_STRING_RE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""")
+_URL_RE = re.compile(r"""url\(\s*(['"]?)(?P<url>[^'")]+)\1\s*\)""")
+
+PRELOAD_TYPES = {
+    ".woff2": "font",
+    ".woff": "font",
+    ".ttf": "font",
+}
+
+
+# ===========================
+# CSS HELPERS
+# ===========================
+def minify_css(css):
+    """
+    Conservative CSS minifier: drops comments and redundant whitespace but
+    leaves strings, selectors such as ``a :hover`` and ``calc()`` intact.
+    """
+    css = _COMMENT_RE.sub("", css)
+    parts = _STRING_RE.split(css)
+    for i in range(0, len(parts), 2):  # even indexes are outside strings
+        chunk = re.sub(r"\s+", " ", parts[i])
+        chunk = re.sub(r"\s*([{};,>])\s*", r"\1", chunk)
+        chunk = re.sub(r":\s+", ":", chunk)
+        parts[i] = chunk.replace(";}", "}")
+    return "".join(parts).strip()
+
+
+def rebase_urls(css, source_path, bundle_path):
+    """
+    Rewrite relative ``url()`` references so they still resolve once the
+    stylesheet lives at ``bundle_path`` instead of ``source_path``.
+    Returns the rewritten CSS and the list of referenced static paths.
+    """
+    referenced = []
+
+    def rewrite(match):
+        url = match.group("url").strip()
+        if url.startswith(("/", "data:", "http:", "https:", "#")):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(source_path), url))
+        referenced.append(target)
+        return f'url("{posixpath.relpath(target, posixpath.dirname(bundle_path))}")'
+
+    return _URL_RE.sub(rewrite, css), referenced
+
+
+# ===========================
+# STORAGE
+# ===========================
+class BundledStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    WhiteNoise manifest storage that builds the per-page CSS bundles first,
+    so they are hashed and precompressed like every other static file.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            yield from super().post_process(paths, dry_run, **options)
+            return
+
+        paths = dict(paths)
+        references = {}
+        for name, sources in settings.STATIC_BUNDLES.items():
+            bundle_path = f"{BUNDLE_DIR}/{name}.css"
+            chunks = []
+            references[name] = []
+            for source in sources:
+                with self.open(source) as handle:
+                    css, referenced = rebase_urls(handle.read().decode("utf-8"), source, bundle_path)
+                chunks.append(minify_css(css))
+                references[name].extend(path for path in referenced if self.exists(path))
+            self._replace(bundle_path, "\n".join(chunks).encode("utf-8"))
+            paths[bundle_path] = (self, bundle_path)
+
+        yield from super().post_process(paths, dry_run, **options)
+
+        manifest = {
+            name: {
+                "file": f"{BUNDLE_DIR}/{name}.css",
+                "sources": list(settings.STATIC_BUNDLES[name]),
+                "preload": [
+                    [path, PRELOAD_TYPES[posixpath.splitext(path)[1]]]
+                    for path in dict.fromkeys(refs)
+                    if posixpath.splitext(path)[1] in PRELOAD_TYPES
+                ],
+            }
+            for name, refs in references.items()
+        }
+        self._replace(BUNDLE_MANIFEST, json.dumps(manifest, indent=2).encode("utf-8"))
+
+    def hashed_name(self, name, content=None, filename=None):
+        # A stylesheet pointing at an image that was never committed
+        # (css/style.css -> images/hero-bg.jpg) should not fail the deploy;
+        # the reference is left unhashed, exactly as it was served before.
+        if content is None and not self.exists(filename or name.split("?")[0].split("#")[0]):
+            logger.warning("Static reference %s not found; leaving it unhashed.", name)
+            return name
+        return super().hashed_name(name, content, filename)
+
+    def _replace(self, path, content):
+        if self.exists(path):
+            self.delete(path)
+        self._save(path, ContentFile(content))
+
+
+@lru_cache(maxsize=1)
+def load_bundle_manifest():
+    """
+    Bundle manifest written by ``collectstatic``; empty when the bundles
+    have not been built (``runserver`` with ``DEBUG``), in which case the
+    template tag links the individual source stylesheets instead.
+    """
+    try:
+        with open(settings.STATIC_ROOT / BUNDLE_MANIFEST, encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
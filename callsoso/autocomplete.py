@@ -0,0 +1,205 @@
+"""
+In-memory prefix index for typeahead suggestions.
+
+Each *source* ("issues", "locations", ...) is a sorted list of
+``(normalized word suffix, value)`` pairs held by every worker, so a
+completion is a binary search plus a short scan: no query, no cache
+round trip. Every word start is indexed, so "har" completes both
+"Harare" and "Greater Harare".
+
+Apps register their sources with a loader that returns the current
+values (one query), and either report changes with ``record_change``
+after the transaction commits or let ``track`` do it from model signals. The reporting worker updates its index in place;
+the others see the source's version stamp (in the default cache, read
+through its L1) move and reload the source on their next lookup.
+"""
+
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .cache import bump, version_stamp
+
+VERSION_KEY = "autocomplete-version:{name}"
+# Entries scanned per lookup before ranking; bounds the cost of short prefixes.
+SCAN_LIMIT = 200
+
+
+def normalize(text):
+    """Case- and accent-insensitive form used for matching."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return " ".join("".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold().split())
+
+
+class PrefixIndex:
+    def __init__(self, values=()):
+        # How many rows carry each value; a value stays until its last row goes.
+        self._counts = Counter(value.strip() for value in values if value and value.strip())
+        self._keys = sorted(key for value in self._counts for key in self._keys_for(value))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _keys_for(value):
+        words = normalize(value).split(" ")
+        return [(" ".join(words[i:]), i, value) for i in range(len(words)) if words[i]]
+
+    def __len__(self):
+        return len(self._counts)
+
+    def add(self, value):
+        value = (value or "").strip()
+        if not value:
+            return
+        with self._lock:
+            self._counts[value] += 1
+            if self._counts[value] == 1:
+                for key in self._keys_for(value):
+                    insort(self._keys, key)
+
+    def discard(self, value):
+        value = (value or "").strip()
+        if not value or not self._counts.get(value):
+            return
+        with self._lock:
+            self._counts[value] -= 1
+            if self._counts[value] <= 0:
+                del self._counts[value]
+                for key in self._keys_for(value):
+                    position = bisect_left(self._keys, key)
+                    if position < len(self._keys) and self._keys[position] == key:
+                        del self._keys[position]
+
+    def complete(self, prefix, limit=10):
+        """Values with a word starting with ``prefix``; whole-value matches first, then shortest."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            start = bisect_left(self._keys, (prefix,))
+            candidates = []
+            for key in self._keys[start:start + SCAN_LIMIT]:
+                if not key[0].startswith(prefix):
+                    break
+                candidates.append(key)
+        seen, results = set(), []
+        for _, _, value in sorted(candidates, key=lambda key: (key[1] > 0, len(key[2]), key[2])):
+            folded = normalize(value)
+            if folded not in seen:
+                seen.add(folded)
+                results.append(value)
+                if len(results) == limit:
+                    break
+        return results
+
+
+# ===========================
+# SOURCES
+# ===========================
+@dataclass
+class Source:
+    name: str
+    load: Callable[[], Iterable[str]]
+    login_required: bool = False
+    index: PrefixIndex = None
+    version: str = None
+
+
+_sources = {}
+_reload_lock = threading.Lock()
+
+
+def register(name, load, login_required=False):
+    """Declare a source; ``load()`` returns every value it should suggest."""
+    _sources[name] = Source(name, load, login_required)
+
+
+def get_source(name):
+    return _sources.get(name)
+
+
+def _current_version(name):
+    return version_stamp(VERSION_KEY.format(name=name))
+
+
+def index(name):
+    """The source's index in this worker, (re)loaded when its version moved."""
+    source = _sources[name]
+    version = _current_version(name)
+    if source.index is None or source.version != version:
+        with _reload_lock:
+            if source.index is None or source.version != version:
+                source.index = PrefixIndex(source.load())
+                source.version = version
+    return source.index
+
+
+def complete(name, prefix, limit=10):
+    return index(name).complete(prefix, limit)
+
+
+def record_change(name, removed=(), added=()):
+    """Apply a committed change here and make the other workers reload."""
+    source = _sources[name]
+    up_to_date = source.index is not None and source.version == _current_version(name)
+    version = bump(VERSION_KEY.format(name=name))
+    with _reload_lock:
+        if not up_to_date:
+            source.index = None  # missed someone else's change; reload on next use
+            return
+        for value in removed:
+            source.index.discard(value)
+        for value in added:
+            source.index.add(value)
+        source.version = version
+
+
+def invalidate(*names):
+    """Reload the sources everywhere, e.g. after a bulk update that skipped signals."""
+    for name in names:
+        _sources[name].index = None
+        bump(VERSION_KEY.format(name=name))
+
+
+# ===========================
+# MODEL TRACKING
+# ===========================
+def track(model, name, field, visible=None):
+    """
+    Keep source ``name`` in step with ``model.<field>`` for rows where
+    ``visible(obj)`` holds (e.g. published or approved). Bulk updates skip
+    these signals; call ``invalidate(name)`` after them.
+    """
+
+    def values(obj):
+        value = getattr(obj, field)
+        return [value] if value and (visible is None or visible(obj)) else []
+
+    def remember(sender, instance, raw=False, **kwargs):
+        if raw or not instance.pk:
+            return
+        old = sender._default_manager.filter(pk=instance.pk).first()
+        instance.__dict__.setdefault("_autocomplete_old", {})[name] = values(old) if old else []
+
+    def saved(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        removed = instance.__dict__.get("_autocomplete_old", {}).pop(name, [])
+        added = values(instance)
+        if removed != added:
+            transaction.on_commit(lambda: record_change(name, removed, added))
+
+    def deleted(sender, instance, **kwargs):
+        removed = values(instance)
+        if removed:
+            transaction.on_commit(lambda: record_change(name, removed))
+
+    uid = f"autocomplete:{name}:{model._meta.label}:{field}"
+    pre_save.connect(remember, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(saved, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=uid)
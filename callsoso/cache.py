@@ -0,0 +1,344 @@
+"""
+Two-tier cache backend.
+
+``TwoTierCache`` keeps a small, size-bounded LRU (L1) in each process in
+front of a shared cache (L2, another ``CACHES`` alias: the file-based or
+database cache, so no extra service is needed)::
+
+    CACHES = {
+        "default": {
+            "BACKEND": "callsoso.cache.TwoTierCache",
+            "OPTIONS": {"L2": "shared", "L1_MAX_ENTRIES": 1000, "L1_TIMEOUT": 5},
+        },
+        "shared": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", ...},
+    }
+
+L1 entries live at most ``L1_TIMEOUT`` seconds, which bounds how long a
+worker can serve a value another worker has already replaced or deleted.
+
+``get_or_compute`` is the stampede-safe read for expensive values:
+
+- probabilistic early recomputation ("XFetch"): each reader may decide to
+  refresh a little before expiry, with a probability that grows as expiry
+  nears and with how long the value took to compute;
+- single flight: the refresh takes a lock in L2 with ``add``; the other
+  workers keep serving the previous value meanwhile, or wait briefly if
+  there is none.
+
+``add`` and ``incr`` must be atomic in L2 for the lock and the counters to
+hold. Redis and Memcached make them so, and the database cache's ``add``
+inserts in a transaction. The file-based cache checks and then writes, so
+with it both run under a per-key lock file created with ``O_EXCL``.
+
+``version_stamp`` and ``bump`` keep the shared stamps that tell workers
+when to reload an in-process copy (categories, typeahead sources, the
+similarity index).
+
+Hit and miss counters are kept per process and added to L2 once a minute,
+so ``manage.py cache_stats`` can report them across all workers.
+"""
+
+import math
+import os
+import pickle
+import random
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager, suppress
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+
+STAT_NAMES = ("l1_hits", "l2_hits", "misses", "sets", "early_recomputes", "recomputes", "lock_waits")
+STATS_KEY = "callsoso-cache-stats:{name}:{stat}"
+STATS_FLUSH_SECONDS = 60
+# A lock file older than this was left by a worker that died holding it;
+# the lock only ever covers a read and a write of one cache file.
+FILE_LOCK_STALE_SECONDS = 5
+
+# Shared by every thread's backend instance in this process, like LocMemCache.
+_l1_stores = {}
+_l1_locks = {}
+_stats = {}
+_stats_flushed = {}
+# Striped single-flight locks for threads within one process.
+_flight_locks = [threading.Lock() for _ in range(64)]
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._name = name
+        self._l2_alias = options.get("L2", "shared")
+        self._l1_max_entries = int(options.get("L1_MAX_ENTRIES", 1000))
+        self._l1_timeout = float(options.get("L1_TIMEOUT", 5))
+        self._l1 = _l1_stores.setdefault(name, OrderedDict())
+        self._lock = _l1_locks.setdefault(name, threading.Lock())
+        self._stats = _stats.setdefault(name, Counter())
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    # ===========================
+    # L1
+    # ===========================
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return None
+            expires, pickled = entry
+            if expires <= time.monotonic():
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def _l1_set(self, key, value, timeout):
+        ttl = self._l1_timeout if timeout is None else min(self._l1_timeout, timeout)
+        if ttl <= 0:
+            self._l1_delete(key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._l1[key] = (time.monotonic() + ttl, pickled)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, key):
+        with self._lock:
+            return self._l1.pop(key, None) is not None
+
+    # ===========================
+    # CACHE API
+    # ===========================
+    def _count(self, stat, amount=1):
+        self._stats[stat] += amount
+        now = time.monotonic()
+        if now - _stats_flushed.get(self._name, 0) >= STATS_FLUSH_SECONDS:
+            _stats_flushed[self._name] = now
+            self.flush_stats()
+
+    def get(self, key, default=None, version=None):
+        l1_key = self.make_and_validate_key(key, version=version)
+        value = self._l1_get(l1_key)
+        if value is not None:
+            self._count("l1_hits")
+            return value
+        sentinel = object()
+        value = self.l2.get(key, sentinel, version=version)
+        if value is sentinel:
+            self._count("misses")
+            return default
+        self._count("l2_hits")
+        self._l1_set(l1_key, value, self._l1_timeout)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout=self._timeout(timeout), version=version)
+        self._l1_set(self.make_and_validate_key(key, version=version), value, self._timeout(timeout))
+        self._count("sets")
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._l2_lock(key, version):
+            added = self.l2.add(key, value, timeout=self._timeout(timeout), version=version)
+        if added:
+            self._l1_set(self.make_and_validate_key(key, version=version), value, self._timeout(timeout))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout=self._timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self._l1_delete(self.make_and_validate_key(key, version=version))
+        return self.l2.delete(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._l1_delete(self.make_and_validate_key(key, version=version))
+        with self._l2_lock(key, version):
+            return self.l2.incr(key, delta, version=version)
+
+    def has_key(self, key, version=None):
+        if self._l1_get(self.make_and_validate_key(key, version=version)) is not None:
+            return True
+        return self.l2.has_key(key, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+        self.l2.clear()
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    @contextmanager
+    def _l2_lock(self, key, version=None):
+        """
+        Hold ``key``'s lock file across processes if L2 is file-based;
+        other backends' ``add`` and ``incr`` are atomic already.
+        """
+        l2 = self.l2
+        if not isinstance(l2, FileBasedCache):
+            yield
+            return
+        path = l2._key_to_file(key, version) + ".lock"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        while True:
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                with suppress(FileNotFoundError):
+                    if time.time() - os.path.getmtime(path) > FILE_LOCK_STALE_SECONDS:
+                        os.remove(path)
+                        continue
+                time.sleep(0.001)
+        try:
+            yield
+        finally:
+            with suppress(FileNotFoundError):
+                os.remove(path)
+
+    # ===========================
+    # STAMPEDE PROTECTION
+    # ===========================
+    def get_or_compute(self, key, compute, timeout=DEFAULT_TIMEOUT, beta=1.0, lock_timeout=30, version=None):
+        """
+        Cached ``compute()`` for ``timeout`` seconds, refreshed by at most
+        one worker at a time and usually shortly before it expires.
+        """
+        timeout = self._timeout(timeout)
+        entry = self.get(key, version=version)
+        if entry is not None:
+            value, delta, expiry = entry
+            # -log(U) is exponentially distributed: rarely large, so early
+            # refreshes are spread out instead of all landing at expiry.
+            if time.time() - delta * beta * math.log(random.random() or 1e-12) < expiry:
+                return value
+            self._count("early_recomputes")
+
+        # Threads of this process queue on a local lock; processes on the L2 one.
+        local_lock = _flight_locks[hash((self._name, key)) % len(_flight_locks)]
+        if entry is not None:
+            if not local_lock.acquire(blocking=False):
+                return entry[0]
+            locked = True
+        else:
+            locked = local_lock.acquire(timeout=lock_timeout)
+        try:
+            return self._refresh(key, compute, entry, timeout, lock_timeout, version)
+        finally:
+            if locked:
+                local_lock.release()
+
+    def _refresh(self, key, compute, entry, timeout, lock_timeout, version):
+        lock_key = f"{key}:compute-lock"
+        with self._l2_lock(lock_key, version):
+            locked = self.l2.add(lock_key, 1, lock_timeout, version=version)
+        if locked:
+            try:
+                fresh = self.l2.get(key, version=version)
+                if fresh is not None and (entry is None or fresh[2] != entry[2]):
+                    # Another worker refreshed it while we waited or our L1 copy aged.
+                    self._l1_set(self.make_and_validate_key(key, version=version), fresh, self._l1_timeout)
+                    return fresh[0]
+                return self._compute(key, compute, timeout, lock_timeout, version)
+            finally:
+                self.l2.delete(lock_key, version=version)
+
+        if entry is not None:
+            return entry[0]  # someone else is refreshing; the old value is still good
+        self._count("lock_waits")
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            fresh = self.l2.get(key, version=version)
+            if fresh is not None:
+                return fresh[0]
+        return self._compute(key, compute, timeout, lock_timeout, version)
+
+    def _compute(self, key, compute, timeout, lock_timeout, version):
+        self._count("recomputes")
+        start = time.time()
+        value = compute()
+        now = time.time()
+        entry = (value, now - start, math.inf if timeout is None else now + timeout)
+        # Keep the entry a little past its logical expiry so readers can
+        # serve it while one worker recomputes.
+        self.set(key, entry, None if timeout is None else timeout + lock_timeout, version=version)
+        return value
+
+    # ===========================
+    # STATISTICS
+    # ===========================
+    def flush_stats(self):
+        """Add this process's counters to the totals kept in L2."""
+        pending = {stat: self._stats.pop(stat, 0) for stat in STAT_NAMES}
+        for stat, amount in pending.items():
+            if not amount:
+                continue
+            key = STATS_KEY.format(name=self._name, stat=stat)
+            with self._l2_lock(key):
+                try:
+                    if not self.l2.add(key, amount, None):
+                        self.l2.incr(key, amount)
+                except ValueError:
+                    self.l2.set(key, amount, None)  # expired between add and incr
+
+    def stats(self):
+        """Totals across every process that has flushed, plus this one's unflushed counts."""
+        totals = {stat: self.l2.get(STATS_KEY.format(name=self._name, stat=stat), 0) for stat in STAT_NAMES}
+        for stat in STAT_NAMES:
+            totals[stat] += self._stats.get(stat, 0)
+        lookups = totals["l1_hits"] + totals["l2_hits"] + totals["misses"]
+        totals["hit_rate"] = (totals["l1_hits"] + totals["l2_hits"]) / lookups if lookups else 0.0
+        return totals
+
+    def reset_stats(self):
+        self._stats.clear()
+        self.l2.delete_many([STATS_KEY.format(name=self._name, stat=stat) for stat in STAT_NAMES])
+
+
+def get_or_compute(key, compute, timeout=DEFAULT_TIMEOUT, alias="default", **kwargs):
+    """
+    ``TwoTierCache.get_or_compute`` on ``alias``; other backends get a
+    plain get-or-set (same stored format, no stampede protection).
+    """
+    backend = caches[alias]
+    if isinstance(backend, TwoTierCache):
+        return backend.get_or_compute(key, compute, timeout=timeout, **kwargs)
+    entry = backend.get(key)
+    if entry is None:
+        entry = (compute(), 0, math.inf)
+        backend.set(key, entry, timeout)
+    return entry[0]
+
+
+# ===========================
+# VERSION STAMPS
+# ===========================
+def version_stamp(key, alias="default"):
+    """
+    The shared stamp under ``key``; a worker reloads its in-process copy
+    when the stamp differs from the one the copy was built at.
+    """
+    backend = caches[alias]
+    version = backend.get(key)
+    if version is None:
+        # Evicted or never set: start a new stamp so every worker reloads.
+        backend.add(key, uuid.uuid4().hex, None)
+        version = backend.get(key)
+    return version
+
+
+def bump(key, alias="default"):
+    """Move the stamp under ``key`` so every worker reloads; returns the new stamp."""
+    version = uuid.uuid4().hex
+    caches[alias].set(key, version, None)
+    return version
@@ -0,0 +1,55 @@
+"""
+Work deferred until the current response has been sent.
+
+``after_response(func)`` queues ``func`` on the current thread's request
+and runs it from ``request_finished``, which WSGI servers send once the
+body has gone out, so slow follow-up work (rebuilding sitemaps, feeds and
+pre-rendered pages) never delays the request that caused it. Outside a
+request (shell, management commands) ``func`` runs at once.
+
+Queuing a callable that is already queued runs it once. With ``items``
+the calls are merged instead: ``func`` runs once with the union of every
+call's items, e.g. all the pages a request's saves touched.
+
+A failure is logged and never reaches the server.
+"""
+
+import logging
+import threading
+
+from django.core.signals import request_finished, request_started
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def after_response(func, items=None):
+    queue = getattr(_local, "queue", None)
+    if queue is None:
+        _run(func, items)
+        return
+    if items is None:
+        queue.setdefault(func, None)
+    else:
+        queue.setdefault(func, set()).update(items)
+
+
+def _run(func, items):
+    try:
+        func() if items is None else func(items)
+    except Exception:
+        logger.exception("Deferred %s failed", getattr(func, "__qualname__", func))
+
+
+@receiver(request_started)
+def start_request(**kwargs):
+    _local.queue = {}
+
+
+@receiver(request_finished)
+def finish_request(**kwargs):
+    queue, _local.queue = getattr(_local, "queue", None), None
+    for func, items in (queue or {}).items():
+        _run(func, items)
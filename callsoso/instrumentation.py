@@ -0,0 +1,149 @@
+"""
+Per-request performance instrumentation.
+
+``PerformanceMiddleware`` records, for every request, the resolved view
+name, the number and total time of database queries (through
+``connection.execute_wrapper``), template render time and response size.
+The figures are returned in a ``Server-Timing`` header and written as one
+JSON log line to the ``callsoso.performance`` logger. Query shapes that
+repeat within a single request are flagged as probable N+1 patterns.
+"""
+
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger("callsoso.performance")
+
+_metrics = ContextVar("request_metrics", default=None)
+
+# Collapse "IN (%s, %s, ...)" so batches of different sizes share a shape.
+_IN_LIST_RE = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.query_count = 0
+        self.query_time = 0.0
+        self.query_shapes = Counter()
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    def record_query(self, sql, elapsed):
+        self.query_count += 1
+        self.query_time += elapsed
+        self.query_shapes[_IN_LIST_RE.sub("(%s…)", sql)] += 1
+
+    def repeated_queries(self, threshold):
+        return [
+            {"count": count, "sql": sql[:200]}
+            for sql, count in self.query_shapes.most_common()
+            if count >= threshold
+        ]
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    metrics = _metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - start)
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapped(self, *args, **kwargs):
+        metrics = _metrics.get()
+        if metrics is None:
+            return render(self, *args, **kwargs)
+        # Only the outermost render counts; nested renders are already inside it.
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - start
+    wrapped._instrumented = True
+    return wrapped
+
+
+def _instrument_template_backends():
+    from django.template.backends import django as django_backend
+    backends = [django_backend.Template]
+    try:
+        from django.template.backends import jinja2 as jinja2_backend
+        backends.append(jinja2_backend.Template)
+    except ImportError:  # Jinja2 is optional
+        pass
+    for template_cls in backends:
+        if not getattr(template_cls.render, "_instrumented", False):
+            template_cls.render = _timed_render(template_cls.render)
+
+
+class PerformanceMiddleware:
+    """
+    Enabled by ``PERFORMANCE_INSTRUMENTATION``; keep it first in MIDDLEWARE
+    so the timings cover the rest of the stack.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = settings.PERFORMANCE_N_PLUS_ONE_THRESHOLD
+        _instrument_template_backends()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(_query_wrapper))
+                response = self.get_response(request)
+        finally:
+            _metrics.reset(token)
+        total = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        repeated = metrics.repeated_queries(self.threshold)
+        size = None if response.streaming else len(response.content)
+
+        timings = [
+            f'db;dur={metrics.query_time * 1000:.1f};desc="{metrics.query_count} queries"',
+            f"tpl;dur={metrics.template_time * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ]
+        if repeated:
+            timings.append(f'n1;desc="{len(repeated)} repeated query shapes"')
+        response["Server-Timing"] = ", ".join(timings)
+
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "duration_ms": round(total * 1000, 2),
+            "db_queries": metrics.query_count,
+            "db_ms": round(metrics.query_time * 1000, 2),
+            "template_ms": round(metrics.template_time * 1000, 2),
+            "response_bytes": size,
+            "n_plus_one": repeated,
+        }
+        logger.log(logging.WARNING if repeated else logging.INFO, json.dumps(record))
+        return response
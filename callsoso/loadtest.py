@@ -0,0 +1,347 @@
+"""
+Closed-loop load generator used by ``manage.py loadtest``.
+
+Each virtual user is a thread that runs one scenario after another with
+no think time, so exactly ``concurrency`` requests are in flight and the
+measured throughput is what the server sustains at that concurrency.
+Requests go to a local gunicorn over plain HTTP with
+``X-Forwarded-Proto: https``, the way Render's proxy forwards them, so
+the production security settings (secure cookies, CSRF origin checks)
+stay on. Worker CPU and RSS are sampled from ``/proc`` (Linux only).
+"""
+
+import http.client
+import os
+import random
+import re
+import statistics
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode
+
+from django.urls import reverse
+
+# A refused or dropped connection, or a malformed response (BadStatusLine,
+# IncompleteRead, ...): counted as an error sample, never a crashed user.
+REQUEST_ERRORS = (OSError, http.client.HTTPException)
+
+CSRF_TOKEN_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+DEFAULT_MIX = {
+    "browse": 70,
+    "login": 10,
+    "create_listing": 10,
+    "suggest_match": 10,
+}
+
+
+# ===========================
+# HTTP CLIENT
+# ===========================
+class Session:
+    """
+    One keep-alive connection plus a cookie jar. Secure cookies are kept
+    even though the hop to gunicorn is plain HTTP (the proxy terminates TLS).
+    """
+
+    def __init__(self, host, port):
+        self.host = f"{host}:{port}"
+        self.origin = f"https://{self.host}"
+        self.connection = http.client.HTTPConnection(host, port, timeout=60)
+        self.cookies = {}
+
+    def request(self, method, path, form=None):
+        headers = {
+            "Host": self.host,
+            "X-Forwarded-Proto": "https",
+            "User-Agent": "callsoso-loadtest",
+        }
+        body = None
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+            headers["Origin"] = self.origin
+            headers["Referer"] = self.origin + path
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+            # The server closed an idle keep-alive connection; retry once.
+            self.connection.close()
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+        content = response.read()
+        for header in response.msg.get_all("Set-Cookie") or ():
+            name, _, rest = header.partition("=")
+            value, _, attributes = rest.partition(";")
+            if "max-age=0" in attributes.lower():
+                self.cookies.pop(name, None)
+            else:
+                self.cookies[name] = value
+        return response.status, content
+
+    def csrf_token(self, content):
+        match = CSRF_TOKEN_RE.search(content.decode("utf-8", "replace"))
+        return match.group(1) if match else ""
+
+    def close(self):
+        self.connection.close()
+
+
+# ===========================
+# VIRTUAL USER
+# ===========================
+class VirtualUser:
+    def __init__(self, index, host, port, data, recorder, seed=0):
+        self.host = host
+        self.port = port
+        self.data = data
+        self.recorder = recorder
+        self.rng = random.Random(seed * 1000 + index)
+        self.anonymous = Session(host, port)
+        self.member = None
+
+    def timed(self, session, label, method, path, form=None, expect=(200,)):
+        start = time.perf_counter()
+        try:
+            status, content = session.request(method, path, form)
+        except REQUEST_ERRORS as exc:
+            self.recorder.record(label, time.perf_counter() - start, False, type(exc).__name__)
+            raise
+        self.recorder.record(label, time.perf_counter() - start, status in expect, status)
+        return status, content
+
+    def login(self, session, username):
+        path = reverse("login")
+        _, content = self.timed(session, "GET /login/", "GET", path)
+        self.timed(session, "POST /login/", "POST", path, {
+            "username": username,
+            "password": self.data["password"],
+            "csrfmiddlewaretoken": session.csrf_token(content),
+        }, expect=(302,))
+
+    def member_session(self):
+        if self.member is None or "sessionid" not in self.member.cookies:
+            self.member = Session(self.host, self.port)
+            self.login(self.member, self.rng.choice(self.data["usernames"]))
+        return self.member
+
+    # ---------------------------
+    # Scenarios
+    # ---------------------------
+    def browse(self):
+        label, path = self.rng.choice((
+            ("GET /", reverse("website:home")),
+            ("GET /news/", reverse("website:news")),
+            ("GET /news/<slug>/", reverse("website:article_detail", args=[self.rng.choice(self.data["article_slugs"])])),
+            ("GET /insights/", reverse("website:insights")),
+            ("GET /knowledge/", reverse("website:knowledge")),
+            ("GET /magazine/", reverse("website:magazine")),
+        ))
+        self.timed(self.anonymous, label, "GET", path)
+
+    def login_scenario(self):
+        session = Session(self.host, self.port)
+        try:
+            self.login(session, self.rng.choice(self.data["usernames"]))
+        finally:
+            session.close()
+
+    def create_listing(self):
+        session = self.member_session()
+        path = reverse("directory:surplus_create")
+        _, content = self.timed(session, "GET /directory/surplus/create/", "GET", path)
+        n = self.rng.randrange(1_000_000)
+        self.timed(session, "POST /directory/surplus/create/", "POST", path, {
+            "csrfmiddlewaretoken": session.csrf_token(content),
+            "company": f"Load Test Supplies {n}",
+            "location": "London",
+            "material_type": self.rng.choice(("wood", "metal", "textiles", "food")),
+            "description": "Offcuts from the load test.",
+            "monthly_volume": str(self.rng.randint(1, 500)),
+            "contact_email": f"loadtest-{n}@example.org",
+        }, expect=(302,))
+
+    def suggest_match(self):
+        path = reverse("directory:suggest_match", args=[
+            self.rng.choice(self.data["surplus_ids"]),
+            self.rng.choice(self.data["demand_ids"]),
+        ])
+        self.timed(self.member_session(), "GET /directory/match/suggest/<s>/<d>/", "GET", path, expect=(302,))
+
+    def run(self, mix, deadline):
+        scenarios = {
+            "browse": self.browse,
+            "login": self.login_scenario,
+            "create_listing": self.create_listing,
+            "suggest_match": self.suggest_match,
+        }
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        while time.monotonic() < deadline:
+            try:
+                scenarios[self.rng.choices(names, weights)[0]]()
+            except REQUEST_ERRORS:
+                # Already recorded; start over with fresh connections.
+                self.anonymous = Session(self.host, self.port)
+                self.member = None
+
+
+# ===========================
+# RESULTS
+# ===========================
+class Recorder:
+    """Thread-safe latency/error log; samples before ``start_measuring`` are dropped."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.measuring = False
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+
+    def start_measuring(self):
+        with self.lock:
+            self.measuring = True
+            self.started = time.perf_counter()
+
+    def stop_measuring(self):
+        with self.lock:
+            self.measuring = False
+            self.elapsed = time.perf_counter() - self.started
+
+    def record(self, label, elapsed, ok, status):
+        with self.lock:
+            if not self.measuring:
+                return
+            self.samples[label].append(elapsed)
+            if not ok:
+                self.errors[label][str(status)] += 1
+
+
+def _percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def _latency_summary(samples, errors, elapsed):
+    ordered = sorted(samples)
+    failed = sum(errors.values())
+    return {
+        "requests": len(ordered),
+        "rps": round(len(ordered) / elapsed, 2),
+        "errors": failed,
+        "error_rate": round(failed / len(ordered), 4) if ordered else 0.0,
+        "error_statuses": dict(errors),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2) if ordered else None,
+        "p50_ms": round(_percentile(ordered, 50) * 1000, 2) if ordered else None,
+        "p90_ms": round(_percentile(ordered, 90) * 1000, 2) if ordered else None,
+        "p99_ms": round(_percentile(ordered, 99) * 1000, 2) if ordered else None,
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else None,
+    }
+
+
+# ===========================
+# WORKER SAMPLING
+# ===========================
+class ProcessSampler(threading.Thread):
+    """Polls CPU ticks and RSS of the gunicorn master's children."""
+
+    def __init__(self, master_pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.master_pid = master_pid
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.first_ticks = {}
+        self.last_ticks = {}
+        self.peak_rss = defaultdict(int)
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+
+    def children(self):
+        try:
+            with open(f"/proc/{self.master_pid}/task/{self.master_pid}/children") as handle:
+                return [int(pid) for pid in handle.read().split()]
+        except OSError:
+            return []
+
+    def sample(self):
+        for pid in self.children():
+            try:
+                with open(f"/proc/{pid}/stat") as handle:
+                    # Fields after the parenthesised command name; utime and stime are 14 and 15.
+                    fields = handle.read().rpartition(")")[2].split()
+                with open(f"/proc/{pid}/statm") as handle:
+                    rss_pages = int(handle.read().split()[1])
+            except OSError:
+                continue  # worker exited between listing and reading
+            ticks = int(fields[11]) + int(fields[12])
+            self.first_ticks.setdefault(pid, ticks)
+            self.last_ticks[pid] = ticks
+            self.peak_rss[pid] = max(self.peak_rss[pid], rss_pages * self.page_size)
+
+    def run(self):
+        self.started = time.monotonic()
+        while not self.stopped.is_set():
+            self.sample()
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.sample()
+        self.elapsed = time.monotonic() - self.started
+        self.stopped.set()
+        self.join()
+
+    def summary(self):
+        return [
+            {
+                "pid": pid,
+                "cpu_percent": round(
+                    (self.last_ticks[pid] - self.first_ticks[pid]) / self.clock_ticks / self.elapsed * 100, 1
+                ),
+                "peak_rss_mb": round(self.peak_rss[pid] / 2**20, 1),
+            }
+            for pid in sorted(self.last_ticks)
+        ]
+
+
+# ===========================
+# DRIVER
+# ===========================
+def run_load(host, port, data, master_pid, concurrency=16, duration=30, warmup=5, mix=None, seed=0):
+    """
+    Drive the server for ``warmup + duration`` seconds and return the
+    per-endpoint summary, overall totals and per-worker CPU/RSS.
+    """
+    mix = mix or DEFAULT_MIX
+    recorder = Recorder()
+    deadline = time.monotonic() + warmup + duration
+    users = [VirtualUser(i, host, port, data, recorder, seed) for i in range(concurrency)]
+    threads = [threading.Thread(target=user.run, args=(mix, deadline), daemon=True) for user in users]
+    for thread in threads:
+        thread.start()
+
+    time.sleep(warmup)
+    sampler = ProcessSampler(master_pid)
+    sampler.start()
+    recorder.start_measuring()
+    for thread in threads:
+        thread.join()
+    recorder.stop_measuring()
+    sampler.stop()
+
+    all_samples = [s for samples in recorder.samples.values() for s in samples]
+    all_errors = defaultdict(int)
+    for errors in recorder.errors.values():
+        for status, count in errors.items():
+            all_errors[status] += count
+    return {
+        "endpoints": {
+            label: _latency_summary(samples, recorder.errors[label], recorder.elapsed)
+            for label, samples in sorted(recorder.samples.items())
+        },
+        "total": _latency_summary(all_samples, all_errors, recorder.elapsed),
+        "workers": sampler.summary(),
+        "measured_seconds": round(recorder.elapsed, 2),
+    }
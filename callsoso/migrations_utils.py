@@ -0,0 +1,31 @@
+"""
+Operations shared by the apps' migrations.
+
+Keep what is here stable: applied migrations import it by name.
+"""
+
+from django.db import migrations
+
+
+def pattern_indexes(indexes):
+    """
+    RunPython creating ``{index name: (table, column)}`` expression indexes
+    for the admin's ``^field`` / ``=field`` searches, which compile to
+    ``UPPER("col"::text) LIKE/= UPPER(%s)`` on PostgreSQL; reversing drops
+    them. Other backends skip them.
+    """
+    def create(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for name, (table, column) in indexes.items():
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" (UPPER("{column}"::text) text_pattern_ops)'
+            )
+
+    def drop(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for name in indexes:
+            schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+    return migrations.RunPython(create, drop)
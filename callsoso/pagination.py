@@ -0,0 +1,78 @@
+"""
+Pagination helpers for very large tables.
+
+``COUNT(*)`` is a full scan on PostgreSQL and SQLite, so an admin
+changelist over millions of rows spends most of its time counting.
+``EstimatedCountPaginator`` answers the count of an *unfiltered* queryset
+from the database's own statistics instead and only counts exactly when
+the table is small or the queryset is filtered.
+"""
+
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+
+
+def estimated_row_count(model, using="default"):
+    """
+    Cheap row-count estimate for ``model``'s table, or None when the
+    backend has no fast source:
+
+    - PostgreSQL: ``pg_class.reltuples`` as maintained by (auto)ANALYZE;
+    - SQLite: the largest rowid, i.e. an upper bound that drifts only
+      with deletions.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        elif connection.vendor == "sqlite":
+            cursor.execute(f"SELECT MAX(_rowid_) FROM {connection.ops.quote_name(table)}")
+        else:
+            return None
+        row = cursor.fetchone()
+    # reltuples is -1 for a table that has never been analysed.
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    # Below this many rows an exact COUNT(*) is cheap enough and nicer to show.
+    exact_count_threshold = 10_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where and not queryset.query.distinct:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.exact_count_threshold:
+                return estimate
+        return super().count
+
+
+class KnownCountPaginator(Paginator):
+    """Paginator for callers that already know the total (e.g. from a rollup table)."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
+
+    @cached_property
+    def count(self):
+        return self._known_count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist defaults for tables that grow without bound: no second
+    ``COUNT(*)`` for "N total" and an estimated count for the unfiltered
+    list. Subclasses should search with ``^``/``=`` prefixes so the
+    pattern indexes can serve the lookups.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
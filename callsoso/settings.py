@@ -5,6 +5,7 @@ Production-ready, host-agnostic configuration.
 
 from pathlib import Path
 import os
+import tempfile
 
 # ======================================================
 # BASE DIRECTORY
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.sitemaps",
 
     # Local apps
     "website",
@@ -51,6 +53,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Per-request timings (Server-Timing header + log line); first so it
+    # measures the whole stack. Disabled unless PERFORMANCE_INSTRUMENTATION.
+    "callsoso.instrumentation.PerformanceMiddleware",
+
     "django.middleware.security.SecurityMiddleware",
 
     # Whitenoise (static files in production)
@@ -62,6 +68,10 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+
+    # Pre-rendered HTML for anonymous visitors; last so the security
+    # headers above still apply. Disabled unless PRERENDER_PAGES.
+    "website.prerender.PrerenderedPageMiddleware",
 ]
 
 ROOT_URLCONF = "callsoso.urls"
@@ -82,6 +92,27 @@ TEMPLATES = [
     },
 ]
 
+# Optional Jinja2 engine for the public website pages ("django" or "jinja2").
+# Ported templates live in website/jinja2/; everything else stays on Django.
+WEBSITE_TEMPLATE_ENGINE = os.getenv("DJANGO_WEBSITE_TEMPLATE_ENGINE", "django")
+
+JINJA2_TEMPLATES_BACKEND = {
+    "BACKEND": "django.template.backends.jinja2.Jinja2",
+    "NAME": "jinja2",
+    "DIRS": [],
+    "APP_DIRS": True,
+    "OPTIONS": {
+        "environment": "website.jinja_env.environment",
+        "context_processors": [
+            "django.contrib.auth.context_processors.auth",
+            "django.contrib.messages.context_processors.messages",
+        ],
+    },
+}
+
+if WEBSITE_TEMPLATE_ENGINE == "jinja2":
+    TEMPLATES.append(JINJA2_TEMPLATES_BACKEND)
+
 WSGI_APPLICATION = "callsoso.wsgi.application"
 
 # ======================================================
@@ -127,9 +158,157 @@ USE_TZ = True
 # ======================================================
 STATIC_URL = "/static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
-STATIC_ROOT = BASE_DIR / "staticfiles"
+STATIC_ROOT = Path(os.getenv("DJANGO_STATIC_ROOT", BASE_DIR / "staticfiles"))
+
+# Django 5.x reads storages from STORAGES (STATICFILES_STORAGE is ignored).
+# The staticfiles backend is WhiteNoise's compressed manifest storage plus
+# the CSS bundle build step (gzip + Brotli variants, hashed names).
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "callsoso.assets.BundledStaticFilesStorage"},
+}
+
+# Minified stylesheets built during collectstatic. Every page links the
+# shared "site" bundle first, then its page family's bundle, so the shared
+# CSS is downloaded and cached once for the whole site. Order matters: it
+# is the cascade order of the original <link> tags.
+STATIC_BUNDLES = {
+    "site": ["css/style.css", "css/base.css"],
+    "home": ["css/home.css"],
+    "about": ["css/about.css"],
+    "contact": ["css/contact.css"],
+    "news": ["css/news.css"],
+    "article": ["css/article_detail.css"],
+    "insights": ["css/insights.css"],
+    "knowledge": ["css/knowledge_center.css"],
+    "magazine": ["css/magazine.css"],
+    "impact": ["css/impact_tracer.css"],
+    "support": ["css/support.css"],
+    "loops": ["css/loops.css"],
+    "directory": ["css/directory.css"],
+    "surplus": ["css/surplus.css"],
+    "demand": ["css/demand.css"],
+}
+
+# ======================================================
+# PERFORMANCE INSTRUMENTATION
+# ======================================================
+# On by default in development only: the Server-Timing header reveals
+# query counts to clients.
+PERFORMANCE_INSTRUMENTATION = os.getenv(
+    "DJANGO_PERFORMANCE_INSTRUMENTATION", str(DEBUG)
+) == "True"
+# A query shape repeated this many times in one request is flagged as N+1.
+PERFORMANCE_N_PLUS_ONE_THRESHOLD = int(os.getenv("DJANGO_PERFORMANCE_N_PLUS_ONE_THRESHOLD", "5"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "callsoso.performance": {
+            "handlers": ["console"],
+            "level": os.getenv("DJANGO_PERFORMANCE_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+        "callsoso.warmup": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
+# ======================================================
+# HTTP CACHING (public content pages)
+# ======================================================
+# Browser max-age stays short; shared caches (Render edge, CDN) may keep
+# anonymous copies longer and revalidate with ETag / Last-Modified.
+CONTENT_CACHE_MAX_AGE = int(os.getenv("DJANGO_CONTENT_CACHE_MAX_AGE", "60"))
+CONTENT_CACHE_S_MAXAGE = int(os.getenv("DJANGO_CONTENT_CACHE_S_MAXAGE", "300"))
 
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# ======================================================
+# SITEMAPS & FEEDS (pre-built files)
+# ======================================================
+# Written by website.syndication on content changes, after the response
+# that saved (`manage.py build_syndication --pending` catches up on any
+# left marked), and on demand when missing; absolute URLs in them use
+# SITE_PROTOCOL://SITE_DOMAIN.
+SYNDICATION_ROOT = Path(os.getenv("DJANGO_SYNDICATION_ROOT", BASE_DIR / "syndication"))
+SITE_DOMAIN = os.getenv("DJANGO_SITE_DOMAIN", ALLOWED_HOSTS[0])
+SITE_PROTOCOL = os.getenv("DJANGO_SITE_PROTOCOL", "https")
+# The sitemaps protocol caps a single file at 50,000 URLs.
+SITEMAP_SHARD_SIZE = int(os.getenv("DJANGO_SITEMAP_SHARD_SIZE", "50000"))
+FEED_ITEMS = int(os.getenv("DJANGO_FEED_ITEMS", "30"))
+
+# ======================================================
+# PRE-RENDERED PAGES
+# ======================================================
+# Anonymous copies of the public pages written by `manage.py prerender`
+# and refreshed on content changes; off in development so edits show up.
+PRERENDER_PAGES = os.getenv("DJANGO_PRERENDER_PAGES", str(not DEBUG)) == "True"
+PRERENDER_ROOT = Path(os.getenv("DJANGO_PRERENDER_ROOT", BASE_DIR / "prerendered"))
+
+# ======================================================
+# CACHE
+# ======================================================
+# "default" is a per-process LRU (L1) in front of "shared" (L2), which
+# every worker on the instance sees: file-based by default, or the
+# database cache (DJANGO_CACHE_BACKEND=...db.DatabaseCache, LOCATION a
+# table made with `manage.py createcachetable`). See callsoso.cache.
+CACHES = {
+    "default": {
+        "BACKEND": "callsoso.cache.TwoTierCache",
+        "OPTIONS": {
+            "L2": "shared",
+            "L1_MAX_ENTRIES": int(os.getenv("DJANGO_CACHE_L1_MAX_ENTRIES", "1000")),
+            "L1_TIMEOUT": float(os.getenv("DJANGO_CACHE_L1_TIMEOUT", "5")),
+        },
+    },
+    "shared": {
+        "BACKEND": os.getenv("DJANGO_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.getenv("DJANGO_CACHE_LOCATION", str(Path(tempfile.gettempdir()) / "callsoso-cache")),
+    },
+}
+
+# `manage.py test` swaps "shared" for a per-process LocMemCache (and the
+# file roots above for scratch directories); see callsoso.testing.
+TEST_RUNNER = "callsoso.testing.TestRunner"
+
+# ======================================================
+# THROTTLING
+# ======================================================
+# Token buckets for the POST endpoints that hash passwords or send mail
+# (see website.throttling). Rates are "<requests>/<period>", period being
+# s, m, h or d with an optional multiplier ("10/15m"). Buckets live in
+# THROTTLE_CACHE and fall back to process memory if it is unreachable.
+THROTTLE_ENABLED = os.getenv("DJANGO_THROTTLE_ENABLED", "True") == "True"
+THROTTLE_CACHE = os.getenv("DJANGO_THROTTLE_CACHE", "shared")
+THROTTLE_RATES = {
+    "login:ip": os.getenv("DJANGO_THROTTLE_LOGIN_IP", "10/m"),
+    "login:username": os.getenv("DJANGO_THROTTLE_LOGIN_USERNAME", "5/m"),
+    "signup:ip": os.getenv("DJANGO_THROTTLE_SIGNUP_IP", "5/m"),
+    "contact:ip": os.getenv("DJANGO_THROTTLE_CONTACT_IP", "5/m"),
+    "founders:ip": os.getenv("DJANGO_THROTTLE_FOUNDERS_IP", "10/m"),
+}
+# Number of trusted proxies in front of the app that append to
+# X-Forwarded-For (1 on Render). 0 uses REMOTE_ADDR and ignores the header.
+THROTTLE_PROXY_COUNT = int(os.getenv("DJANGO_THROTTLE_PROXY_COUNT", "0"))
+
+# ======================================================
+# FOUNDERS LIST SIGNUPS
+# ======================================================
+# Homepage signups are buffered per process and written in one
+# INSERT ... ON CONFLICT DO NOTHING when the buffer fills, after
+# FOUNDERS_FLUSH_SECONDS, or when the worker exits. A SIGKILL (OOM
+# killer, hard deploy timeout) skips the exit hooks and loses what is
+# buffered: at most FOUNDERS_BUFFER_SIZE signups from the last
+# FOUNDERS_FLUSH_SECONDS, so keep both small. A size of 1 writes each
+# signup immediately.
+FOUNDERS_BUFFER_SIZE = int(os.getenv("DJANGO_FOUNDERS_BUFFER_SIZE", "1" if DEBUG else "10"))
+FOUNDERS_FLUSH_SECONDS = float(os.getenv("DJANGO_FOUNDERS_FLUSH_SECONDS", "1"))
 
 # ======================================================
 # MEDIA FILES
@@ -188,6 +367,11 @@ if not DEBUG:
     SECURE_CONTENT_TYPE_NOSNIFF = True
 
     X_FRAME_OPTIONS = "DENY"
+
+    # Behind a TLS-terminating proxy (Render, the load-test harness) the
+    # scheme arrives in X-Forwarded-Proto; only trust it when told to.
+    if os.getenv("DJANGO_TRUST_X_FORWARDED_PROTO", "False") == "True":
+        SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 else:
     # Local dev MUST disable HTTPS enforcement
     SECURE_SSL_REDIRECT = False
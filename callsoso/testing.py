@@ -0,0 +1,91 @@
+"""
+Test runner and query-budget helpers for the test suites.
+
+A view passes its budget when it stays under a fixed number of queries
+*and* issues the same number on a small and a large dataset; a count that
+grows with the data is an N+1 even if it happens to fit the budget.
+"""
+
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+
+# The manifest storage needs collectstatic; tests resolve static URLs plainly.
+TEST_STORAGES = {
+    **settings.STORAGES,
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(STORAGES=TEST_STORAGES, PERFORMANCE_INSTRUMENTATION=False)
+class QueryBudgetTestCase(TestCase):
+    """
+    Subclasses set ``seed_func``, a function called as
+    ``seed_func(test, scale)`` that creates rows proportional to ``scale``.
+    """
+    SMALL_SCALE = 1
+    LARGE_SCALE = 8
+    seed_func = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.seed_func is None:
+            raise TypeError(f"{cls.__name__} needs a seed_func to build its datasets")
+
+    def count_queries(self, url, scale):
+        # Measure cold: a value cached by the previous run would hide queries.
+        cache.clear()
+        # Seed inside a savepoint so every measurement starts from the same base.
+        with transaction.atomic():
+            self.seed_func(scale)
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(url)
+            transaction.set_rollback(True)
+        self.assertEqual(response.status_code, 200, url)
+        return [query["sql"] for query in captured.captured_queries]
+
+    def assertQueryBudget(self, url, budget):
+        small = self.count_queries(url, self.SMALL_SCALE)
+        large = self.count_queries(url, self.LARGE_SCALE)
+        self.assertLessEqual(
+            len(large), budget,
+            f"{url} ran {len(large)} queries (budget {budget}):\n" + "\n".join(large),
+        )
+        self.assertEqual(
+            len(small), len(large),
+            f"{url} query count grows with the data ({len(small)} -> {len(large)}):\n" + "\n".join(large),
+        )
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the suite against a per-process in-memory "shared" cache and
+    scratch sitemap/pre-render directories, so tests that clear the cache
+    or write files never touch those of a server running on the same host,
+    and ``--parallel`` workers never share keys.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._scratch = tempfile.TemporaryDirectory(prefix="callsoso-test-")
+        root = Path(self._scratch.name)
+        self._isolation = override_settings(
+            CACHES={
+                **settings.CACHES,
+                "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "callsoso-test"},
+            },
+            SYNDICATION_ROOT=root / "syndication",
+            PRERENDER_ROOT=root / "prerendered",
+        )
+        self._isolation.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._isolation.disable()
+        self._scratch.cleanup()
+        super().teardown_test_environment(**kwargs)
@@ -1,6 +1,92 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.utils import timezone
+
+from callsoso.pagination import LargeTableAdmin
+
+from . import moderation
 from .models import SurplusListing, DemandListing, Match
 
-admin.site.register(SurplusListing)
-admin.site.register(DemandListing)
-admin.site.register(Match)
+
+# ===========================
+# MODERATION
+# ===========================
+class ModerationStatusFilter(admin.SimpleListFilter):
+    title = "moderation status"
+    parameter_name = "status"
+
+    def lookups(self, request, model_admin):
+        return [("pending", "Pending"), ("approved", "Approved"), ("rejected", "Rejected")]
+
+    def queryset(self, request, queryset):
+        if self.value() == "pending":
+            return queryset.filter(reviewed_on__isnull=True)
+        if self.value() == "approved":
+            return queryset.filter(approved=True)
+        if self.value() == "rejected":
+            return queryset.filter(approved=False, reviewed_on__isnull=False)
+        return queryset
+
+
+class ModerationAdmin(LargeTableAdmin):
+    """Listing admin with a pending queue and bulk approve/reject actions."""
+
+    actions = ("approve_selected", "reject_selected")
+    readonly_fields = ("reviewed_on",)
+
+    def get_ordering(self, request):
+        # The pending queue is worked oldest-first off the partial index.
+        if request.GET.get(ModerationStatusFilter.parameter_name) == "pending":
+            return ("created_on", "id")
+        return super().get_ordering(request)
+
+    def save_model(self, request, obj, form, change):
+        if "approved" in form.changed_data:
+            obj.reviewed_on = timezone.now()
+        super().save_model(request, obj, form, change)
+
+    @admin.action(description="Approve selected listings", permissions=["change"])
+    def approve_selected(self, request, queryset):
+        count = moderation.approve(queryset)
+        self.message_user(request, f"Approved {count} listings; owners will be notified.", messages.SUCCESS)
+
+    @admin.action(description="Reject selected listings", permissions=["change"])
+    def reject_selected(self, request, queryset):
+        count = moderation.reject(queryset)
+        self.message_user(request, f"Rejected {count} listings; owners will be notified.", messages.WARNING)
+
+
+# ===========================
+# SURPLUS LISTING
+# ===========================
+@admin.register(SurplusListing)
+class SurplusListingAdmin(ModerationAdmin):
+    list_display = ("company", "material_type", "location", "user", "approved", "created_on")
+    list_select_related = ("user",)
+    list_filter = (ModerationStatusFilter, "material_type")
+    search_fields = ("^company", "=contact_email")
+    raw_id_fields = ("user",)
+    ordering = ("-created_on",)
+
+
+# ===========================
+# DEMAND LISTING
+# ===========================
+@admin.register(DemandListing)
+class DemandListingAdmin(ModerationAdmin):
+    list_display = ("organisation", "material_wanted", "location", "user", "approved", "created_on")
+    list_select_related = ("user",)
+    list_filter = (ModerationStatusFilter, "material_wanted")
+    search_fields = ("^organisation",)
+    raw_id_fields = ("user",)
+    ordering = ("-created_on",)
+
+
+# ===========================
+# MATCH
+# ===========================
+@admin.register(Match)
+class MatchAdmin(LargeTableAdmin):
+    list_display = ("surplus", "demand", "allocated_quantity", "suggested_by", "created_on")
+    list_select_related = ("surplus", "demand", "suggested_by")
+    raw_id_fields = ("surplus", "demand", "suggested_by")
+    ordering = ("-created_on",)
@@ -0,0 +1,238 @@
+"""
+Batch allocation of surplus volume to demand.
+
+One surplus listing's ``monthly_volume`` can serve several requesters and
+one demand can need several suppliers, so matches carry an
+``allocated_quantity``. ``allocate(material_type)`` plans every approved
+listing of one material at once:
+
+1. within each location, existing matches keep first claim on their
+   listings' capacity (in the order they were made), so a rerun repairs
+   the plan instead of reshuffling it, and the remaining volume is swept;
+2. what is left is matched across locations, existing cross-location
+   matches first.
+
+Locations are free text, so the distance penalty is 0 within a location
+and 1 between locations, and fulfilled volume always outranks it. For
+that cost, filling each location first and then sweeping the remainders
+is a min-cost max-flow: every unit that can be placed is, and as few
+units as possible cross locations. An existing cross-location match only
+gets what its listings still have after that, so an earlier run or a
+hand-made match never pulls volume away from its own location. Each
+sweep pairs the listings in
+order of age over cumulative sums (NumPy when installed, a two-pointer
+merge otherwise), which gives at most ``suppliers + requesters - 1``
+matches.
+
+Matches of the material that are outside the plan (an unapproved
+listing, or a requester of another material) are set to 0, so a listing
+taken off the directory stops counting towards the diverted volume.
+
+Quantities are handled in hundredths as integers, so the plan is exact.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+
+from . import metrics
+from .models import DemandListing, Match, SurplusListing
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the pure-Python sweep gives the same plan
+    np = None
+
+BATCH_SIZE = 1000
+CENTS = Decimal("0.01")
+
+
+def _cents(value):
+    return int((value * 100).to_integral_value())
+
+
+def _quantity(cents):
+    return (Decimal(cents) * CENTS).quantize(CENTS)
+
+
+def _location_key(location):
+    return " ".join((location or "").casefold().split())
+
+
+# ===========================
+# SWEEPS
+# ===========================
+def _sweep_numpy(supply, demand):
+    supply_edges = np.cumsum(np.asarray(supply, dtype=np.int64))
+    demand_edges = np.cumsum(np.asarray(demand, dtype=np.int64))
+    total = min(supply_edges[-1], demand_edges[-1])
+    edges = np.union1d(supply_edges, demand_edges)
+    edges = edges[(edges > 0) & (edges <= total)]
+    starts = np.concatenate(([0], edges[:-1]))
+    # Segment [start, edge) of the volume axis lies in one supplier's and one requester's span.
+    suppliers = np.searchsorted(supply_edges, starts, side="right")
+    requesters = np.searchsorted(demand_edges, starts, side="right")
+    return zip(suppliers.tolist(), requesters.tolist(), (edges - starts).tolist())
+
+
+def _sweep_python(supply, demand):
+    pairs = []
+    i = j = 0
+    left_supply, left_demand = supply[0], demand[0]
+    while True:
+        amount = min(left_supply, left_demand)
+        if amount:
+            pairs.append((i, j, amount))
+        left_supply -= amount
+        left_demand -= amount
+        if not left_supply:
+            i += 1
+            if i == len(supply):
+                break
+            left_supply = supply[i]
+        if not left_demand:
+            j += 1
+            if j == len(demand):
+                break
+            left_demand = demand[j]
+    return pairs
+
+
+def sweep(supply, demand):
+    """``(supplier index, requester index, amount)`` filling the requesters in order from the suppliers in order."""
+    if not supply or not demand or not sum(supply) or not sum(demand):
+        return []
+    return list((_sweep_numpy if np is not None else _sweep_python)(supply, demand))
+
+
+def plan(surpluses, demands, committed=()):
+    """
+    ``{(surplus_id, demand_id): cents}`` for ``surpluses`` and ``demands``,
+    lists of ``(id, location, cents)`` oldest first, and ``committed``
+    ``(surplus_id, demand_id)`` pairs served first within their phase
+    (same location, then across). Committed pairs are always in the
+    result, with 0 when their listings ran out.
+    """
+    supply_left = {pk: amount for pk, _, amount in surpluses}
+    demand_left = {pk: amount for pk, _, amount in demands}
+    supply_location = {pk: _location_key(location) for pk, location, _ in surpluses}
+    demand_location = {pk: _location_key(location) for pk, location, _ in demands}
+    allocation = defaultdict(int)
+
+    def place(supply_ids, demand_ids):
+        for i, j, amount in sweep([supply_left[pk] for pk in supply_ids], [demand_left[pk] for pk in demand_ids]):
+            surplus_id, demand_id = supply_ids[i], demand_ids[j]
+            allocation[surplus_id, demand_id] += amount
+            supply_left[surplus_id] -= amount
+            demand_left[demand_id] -= amount
+
+    def serve(pairs):
+        for surplus_id, demand_id in pairs:
+            amount = min(supply_left[surplus_id], demand_left[demand_id])
+            allocation[surplus_id, demand_id] += amount
+            supply_left[surplus_id] -= amount
+            demand_left[demand_id] -= amount
+
+    local, crossing = [], []
+    for surplus_id, demand_id in committed:
+        same = supply_location[surplus_id] == demand_location[demand_id]
+        (local if same else crossing).append((surplus_id, demand_id))
+
+    serve(local)
+    by_location = defaultdict(lambda: ([], []))
+    for pk, _, _ in surpluses:
+        if supply_left[pk]:
+            by_location[supply_location[pk]][0].append(pk)
+    for pk, _, _ in demands:
+        if demand_left[pk]:
+            by_location[demand_location[pk]][1].append(pk)
+    for supply_ids, demand_ids in by_location.values():
+        place(supply_ids, demand_ids)
+
+    serve(crossing)
+    place(
+        [pk for pk, _, _ in surpluses if supply_left[pk]],
+        [pk for pk, _, _ in demands if demand_left[pk]],
+    )
+    return dict(allocation)
+
+
+# ===========================
+# RUNNING
+# ===========================
+def allocate(material_type):
+    """
+    Plan one material and write it: update existing matches' allocated
+    quantities, create the new ones and zero the ones left out of the
+    plan. Returns counts and volumes. Call ``metrics.rebuild()`` for the
+    material afterwards (``allocate_all`` does).
+    """
+    surpluses = [
+        (pk, location, _cents(volume))
+        for pk, location, volume in SurplusListing.objects.filter(approved=True, material_type=material_type)
+        .order_by("created_on", "pk")
+        .values_list("pk", "location", "monthly_volume")
+    ]
+    demands = [
+        (pk, location, _cents(quantity))
+        for pk, location, quantity in DemandListing.objects.filter(approved=True, material_wanted=material_type)
+        .order_by("created_on", "pk")
+        .values_list("pk", "location", "quantity_needed")
+    ]
+    existing = {
+        (match.surplus_id, match.demand_id): match
+        for match in Match.objects.filter(
+            surplus__approved=True, surplus__material_type=material_type,
+            demand__approved=True, demand__material_wanted=material_type,
+        ).order_by("created_on", "pk").only("pk", "surplus_id", "demand_id", "allocated_quantity")
+    }
+    allocation = plan(surpluses, demands, committed=list(existing))
+
+    changed, created = [], []
+    for pair, amount in allocation.items():
+        quantity = _quantity(amount)
+        match = existing.get(pair)
+        if match is None:
+            created.append(Match(surplus_id=pair[0], demand_id=pair[1], allocated_quantity=quantity))
+        elif match.allocated_quantity != quantity:
+            match.allocated_quantity = quantity
+            changed.append(match)
+    Match.objects.bulk_update(changed, ["allocated_quantity"], batch_size=BATCH_SIZE)
+    Match.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    # Matches are counted under their surplus's material, so each is reset by one material's run.
+    reset = (
+        Match.objects.filter(surplus__material_type=material_type)
+        .exclude(surplus__approved=True, demand__approved=True, demand__material_wanted=material_type)
+        .exclude(allocated_quantity=0)
+        .update(allocated_quantity=0)
+    )
+
+    supply_location = {pk: _location_key(location) for pk, location, _ in surpluses}
+    demand_location = {pk: _location_key(location) for pk, location, _ in demands}
+    crossing = sum(
+        amount for (surplus_id, demand_id), amount in allocation.items()
+        if supply_location[surplus_id] != demand_location[demand_id]
+    )
+    return {
+        "created": len(created),
+        "updated": len(changed),
+        "reset": reset,
+        "allocated": _quantity(sum(allocation.values())),
+        "cross_location": _quantity(crossing),
+    }
+
+
+@transaction.atomic
+def allocate_all(material_types=None):
+    """``allocate`` each material (all by default), then rebuild the rollup of the materials that changed."""
+    material_types = material_types or [choice for choice, _ in SurplusListing.MATERIAL_CHOICES]
+    results = {material_type: allocate(material_type) for material_type in material_types}
+    # Bulk writes skip the signals that maintain the rollup.
+    changed = [
+        material_type for material_type, result in results.items()
+        if result["created"] or result["updated"] or result["reset"]
+    ]
+    if changed:
+        metrics.rebuild(changed)
+    return results
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DirectoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'directory'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (keeps the diverted-volume rollup current)
+        from . import suggestions  # noqa: F401  (typeahead sources)
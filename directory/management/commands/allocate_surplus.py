@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from directory import allocation
+from directory.models import SurplusListing
+
+
+class Command(BaseCommand):
+    help = "Allocate approved surplus volume to approved demand per material type, writing Match.allocated_quantity."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--material", action="append", choices=[choice for choice, _ in SurplusListing.MATERIAL_CHOICES],
+            help="Only this material type (repeatable); all by default",
+        )
+
+    def handle(self, *args, **options):
+        for material_type, result in allocation.allocate_all(options["material"]).items():
+            self.stdout.write(
+                f"{material_type}: {result['allocated']} allocated ({result['cross_location']} across locations), "
+                f"{result['created']} matches created, {result['updated']} updated, {result['reset']} reset"
+            )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from directory.moderation import process_events
+
+
+class Command(BaseCommand):
+    help = "Send the owner e-mails for moderation decisions that have not been processed yet (safe to run from cron)."
+
+    def handle(self, *args, **options):
+        processed = process_events()
+        self.stdout.write(f"Processed {processed} moderation events")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from directory import search
+
+
+class Command(BaseCommand):
+    help = "Recompute listing search text and, on databases without pg_trgm, the trigram table (after bulk imports)."
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        self.stdout.write("Rebuilt listing search")
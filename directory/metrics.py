@@ -0,0 +1,149 @@
+"""
+Materials-diverted metrics.
+
+Every match adds its ``allocated_quantity`` (``directory.allocation``),
+or until allocation has run the smaller of ``SurplusListing.monthly_volume``
+and ``DemandListing.quantity_needed``, to a ``DivertedVolume`` bucket keyed
+by (material type, month of the match, surplus location). The buckets are
+updated in the same transaction as the change (``directory.signals``):
+
+- a match is created or deleted;
+- a listing's volume, quantity, material or location is edited, which
+  moves its matches' contributions to the new figures.
+
+Reads (``summary``, ``export_rows``) touch only the rollup.
+``rebuild()`` / ``manage.py rebuild_rollups`` recomputes it after bulk
+writes, which skip model signals; ``rebuild(material_types)`` recomputes
+only those materials' buckets.
+"""
+
+import csv
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DivertedVolume, Match
+
+CONTRIBUTION_FIELDS = (
+    "surplus__material_type",
+    "created_on",
+    "surplus__location",
+    "surplus__monthly_volume",
+    "demand__quantity_needed",
+    "allocated_quantity",
+)
+
+
+def _bucket(material_type, created_on, location):
+    return material_type, timezone.localtime(created_on).date().replace(day=1), location
+
+
+def diverted(surplus_volume, demand_quantity, allocated_quantity=None):
+    if allocated_quantity is not None:
+        return allocated_quantity
+    return min(surplus_volume, demand_quantity)
+
+
+def contributions(matches):
+    """``{bucket: (count, volume)}`` for a Match queryset, in one query."""
+    totals = defaultdict(lambda: [0, Decimal(0)])
+    for material_type, created_on, location, surplus_volume, demand_quantity, allocated in matches.values_list(
+        *CONTRIBUTION_FIELDS
+    ):
+        bucket = totals[_bucket(material_type, created_on, location)]
+        bucket[0] += 1
+        bucket[1] += diverted(surplus_volume, demand_quantity, allocated)
+    return {key: tuple(value) for key, value in totals.items()}
+
+
+# ===========================
+# INCREMENTAL UPDATES
+# ===========================
+def apply(delta, sign=1):
+    """Add (``sign=1``) or remove (``-1``) a ``contributions()`` result."""
+    for (material_type, month, location), (count, volume) in delta.items():
+        if not count:
+            continue
+        row, _ = DivertedVolume.objects.get_or_create(material_type=material_type, month=month, location=location)
+        DivertedVolume.objects.filter(pk=row.pk).update(
+            match_count=F("match_count") + sign * count,
+            volume=F("volume") + sign * volume,
+        )
+
+
+def match_added(match):
+    apply({
+        _bucket(match.surplus.material_type, match.created_on, match.surplus.location): (
+            1, diverted(match.surplus.monthly_volume, match.demand.quantity_needed, match.allocated_quantity)
+        ),
+    })
+
+
+def matches_of(listing):
+    """Queryset of the matches a listing takes part in."""
+    field = "surplus" if listing._meta.model_name == "surpluslisting" else "demand"
+    return Match.objects.filter(**{field: listing.pk})
+
+
+# ===========================
+# FULL REBUILD
+# ===========================
+@transaction.atomic
+def rebuild(material_types=None):
+    rows, matches = DivertedVolume.objects.all(), Match.objects.order_by()
+    if material_types is not None:
+        rows = rows.filter(material_type__in=material_types)
+        matches = matches.filter(surplus__material_type__in=material_types)
+    rows.delete()
+    DivertedVolume.objects.bulk_create(
+        DivertedVolume(material_type=material_type, month=month, location=location, match_count=count, volume=volume)
+        for (material_type, month, location), (count, volume) in contributions(matches).items()
+    )
+
+
+# ===========================
+# READING
+# ===========================
+def summary(months=12):
+    """Totals overall, per material and per recent month, from one rollup query."""
+    labels = dict(DivertedVolume._meta.get_field("material_type").choices)
+    by_material, by_month = Counter(), Counter()
+    matches = 0
+    for material_type, month, count, volume in DivertedVolume.objects.filter(match_count__gt=0).values_list(
+        "material_type", "month", "match_count", "volume"
+    ):
+        by_material[material_type] += volume
+        by_month[month] += volume
+        matches += count
+    return {
+        "total_volume": sum(by_material.values(), Decimal(0)),
+        "matches": matches,
+        "by_material": [
+            {"material": labels.get(material, material), "volume": volume}
+            for material, volume in by_material.most_common()
+        ],
+        "by_month": [
+            {"month": month, "volume": by_month[month]}
+            for month in sorted(by_month, reverse=True)[:months]
+        ],
+    }
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def export_rows():
+    """CSV lines of every non-empty bucket."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(["month", "material_type", "location", "matches", "volume"])
+    rows = DivertedVolume.objects.filter(match_count__gt=0).order_by("month", "material_type", "location")
+    for row in rows.iterator():
+        location = row.location
+        if location.startswith(("=", "+", "-", "@")):
+            location = "'" + location  # keep spreadsheets from evaluating it
+        yield writer.writerow([row.month.strftime("%Y-%m"), row.material_type, location, row.match_count, row.volume])
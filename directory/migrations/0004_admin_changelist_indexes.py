@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:39
+
+from django.db import migrations, models
+
+from callsoso.migrations_utils import pattern_indexes
+
+
+# Expression indexes for the admin's ^field / =field searches on PostgreSQL
+# (see callsoso.migrations_utils.pattern_indexes).
+PATTERN_INDEXES = {
+    "directory_surplus_company_upper_like": ("directory_surpluslisting", "company"),
+    "directory_surplus_email_upper_like": ("directory_surpluslisting", "contact_email"),
+    "directory_demand_org_upper_like": ("directory_demandlisting", "organisation"),
+}
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0003_alter_demandlisting_intended_use_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='demandlisting',
+            name='created_on',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='match',
+            name='created_on',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='surpluslisting',
+            name='created_on',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        pattern_indexes(PATTERN_INDEXES),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_approved_as_reviewed(apps, schema_editor):
+    # Listings approved before moderation existed must not reappear as pending.
+    for name in ("SurplusListing", "DemandListing"):
+        model = apps.get_model("directory", name)
+        model.objects.filter(approved=True, reviewed_on__isnull=True).update(reviewed_on=models.F("created_on"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0004_admin_changelist_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing_type', models.CharField(choices=[('surplus', 'Surplus'), ('demand', 'Demand')], max_length=10)),
+                ('listing_id', models.PositiveBigIntegerField()),
+                ('approved', models.BooleanField()),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('processed_on', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='demandlisting',
+            name='reviewed_on',
+            field=models.DateTimeField(blank=True, help_text='When a moderator approved or rejected it; empty while pending', null=True),
+        ),
+        migrations.AddField(
+            model_name='surpluslisting',
+            name='reviewed_on',
+            field=models.DateTimeField(blank=True, help_text='When a moderator approved or rejected it; empty while pending', null=True),
+        ),
+        migrations.RunPython(mark_approved_as_reviewed, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='demandlisting',
+            index=models.Index(condition=models.Q(('reviewed_on__isnull', True)), fields=['created_on', 'id'], name='demand_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surpluslisting',
+            index=models.Index(condition=models.Q(('reviewed_on__isnull', True)), fields=['created_on', 'id'], name='surplus_pending_idx'),
+        ),
+        migrations.AddField(
+            model_name='moderationevent',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='moderation_events', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='moderationevent',
+            index=models.Index(condition=models.Q(('processed_on__isnull', True)), fields=['id'], name='moderation_unprocessed_idx'),
+        ),
+    ]
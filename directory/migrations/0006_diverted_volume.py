@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:48
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def populate_diverted_volume(apps, schema_editor):
+    Match = apps.get_model("directory", "Match")
+    DivertedVolume = apps.get_model("directory", "DivertedVolume")
+    totals = defaultdict(lambda: [0, Decimal(0)])
+    rows = Match.objects.values_list(
+        "surplus__material_type", "created_on", "surplus__location",
+        "surplus__monthly_volume", "demand__quantity_needed",
+    )
+    for material_type, created_on, location, surplus_volume, demand_quantity in rows:
+        bucket = totals[material_type, timezone.localtime(created_on).date().replace(day=1), location]
+        bucket[0] += 1
+        bucket[1] += min(surplus_volume, demand_quantity)
+    DivertedVolume.objects.bulk_create(
+        DivertedVolume(material_type=material_type, month=month, location=location, match_count=count, volume=volume)
+        for (material_type, month, location), (count, volume) in totals.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0005_moderation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DivertedVolume',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('material_type', models.CharField(choices=[('wood', 'Wood'), ('metal', 'Metal'), ('textiles', 'Textiles'), ('plastic', 'Plastic'), ('foam', 'Foam'), ('cardboard', 'Cardboard'), ('food', 'Food'), ('other', 'Other')], max_length=50)),
+                ('month', models.DateField(help_text='First day of the month the match was made, in the site time zone')),
+                ('location', models.CharField(max_length=150)),
+                ('match_count', models.IntegerField(default=0)),
+                ('volume', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+            options={
+                'ordering': ['-month', 'material_type', 'location'],
+                'constraints': [models.UniqueConstraint(fields=('material_type', 'month', 'location'), name='diverted_volume_bucket')],
+            },
+        ),
+        migrations.RunPython(populate_diverted_volume, migrations.RunPython.noop),
+    ]
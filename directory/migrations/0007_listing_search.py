@@ -0,0 +1,86 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:05
+
+from django.db import migrations, models
+
+from directory.models import search_text
+from directory.search import trigrams
+
+# word_similarity (``<%``) lookups on PostgreSQL; elsewhere
+# directory.search reads the ListingTrigram side table.
+TRIGRAM_INDEXES = {
+    "directory_surplus_search_trgm": "directory_surpluslisting",
+    "directory_demand_search_trgm": "directory_demandlisting",
+}
+
+
+def populate_search(apps, schema_editor):
+    SurplusListing = apps.get_model("directory", "SurplusListing")
+    DemandListing = apps.get_model("directory", "DemandListing")
+    ListingTrigram = apps.get_model("directory", "ListingTrigram")
+    documents = {
+        "surplus": (SurplusListing, lambda row: search_text(
+            row.company, row.get_material_type_display(), row.description, row.location)),
+        "demand": (DemandListing, lambda row: search_text(
+            row.organisation, row.get_material_wanted_display(), row.intended_use, row.location)),
+    }
+    for listing_type, (model, document) in documents.items():
+        rows = list(model.objects.all())
+        for row in rows:
+            row.search_text = document(row)
+        model.objects.bulk_update(rows, ["search_text"], batch_size=1000)
+        if schema_editor.connection.vendor != "postgresql":
+            ListingTrigram.objects.bulk_create(
+                (
+                    ListingTrigram(listing_type=listing_type, listing_id=row.pk, trigram=gram)
+                    for row in rows
+                    for gram in trigrams(row.search_text)
+                ),
+                batch_size=1000,
+            )
+
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for name, table in TRIGRAM_INDEXES.items():
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" USING gin ("search_text" gin_trgm_ops)'
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0006_diverted_volume'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='demandlisting',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='surpluslisting',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.CreateModel(
+            name='ListingTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing_type', models.CharField(choices=[('surplus', 'Surplus'), ('demand', 'Demand')], max_length=10)),
+                ('listing_id', models.PositiveBigIntegerField()),
+                ('trigram', models.CharField(max_length=3)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['listing_type', 'trigram', 'listing_id'], name='listing_trigram_lookup_idx'), models.Index(fields=['listing_type', 'listing_id'], name='listing_trigram_owner_idx')],
+            },
+        ),
+        migrations.RunPython(populate_search, drop_trigram_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0007_listing_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='allocated_quantity',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Volume the allocation run (directory.allocation) routes through this match; empty until it has run', max_digits=10, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0008_match_allocated_quantity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='moderationevent',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,7 +1,18 @@
+import re
+import unicodedata
+
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
 
 
+def search_text(*parts):
+    """Lower-case, accent-free words of ``parts``: what listing search matches against."""
+    text = unicodedata.normalize("NFKD", " ".join(part for part in parts if part))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    return " ".join(re.findall(r"\w+", text))
+
+
 # ================================
 # Surplus Listings (Materials / Food)
 # ================================
@@ -33,16 +44,32 @@ class SurplusListing(models.Model):
     contact_email = models.EmailField()
 
     approved = models.BooleanField(default=False, help_text="Admin approval before appearing publicly")
-    created_on = models.DateTimeField(auto_now_add=True)
+    reviewed_on = models.DateTimeField(null=True, blank=True, help_text="When a moderator approved or rejected it; empty while pending")
+    created_on = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Company, material, description and location, for directory.search
+    search_text = models.TextField(blank=True, default="", editable=False)
 
     class Meta:
         ordering = ["-created_on"]
         verbose_name = "Surplus Listing"
         verbose_name_plural = "Surplus Listings"
+        indexes = [
+            # Moderation queue: pending listings, oldest first.
+            models.Index(fields=["created_on", "id"], condition=Q(reviewed_on__isnull=True), name="surplus_pending_idx"),
+        ]
 
     def __str__(self):
         return f"{self.company} – {self.material_type}"
 
+    def build_search_text(self):
+        return search_text(self.company, self.get_material_type_display(), self.description, self.location)
+
+    def save(self, *args, **kwargs):
+        self.search_text = self.build_search_text()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "search_text"}
+        super().save(*args, **kwargs)
+
 
 # ================================
 # Demand Listings (Requests / Use Cases)
@@ -63,16 +90,31 @@ class DemandListing(models.Model):
     quantity_needed = models.DecimalField(max_digits=10, decimal_places=2)
     intended_use = models.TextField(blank=True, null=True, help_text="Describe how the material will be used")
     approved = models.BooleanField(default=False, help_text="Admin approval before appearing publicly")
-    created_on = models.DateTimeField(auto_now_add=True)
+    reviewed_on = models.DateTimeField(null=True, blank=True, help_text="When a moderator approved or rejected it; empty while pending")
+    created_on = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Organisation, material, intended use and location, for directory.search
+    search_text = models.TextField(blank=True, default="", editable=False)
 
     class Meta:
         ordering = ["-created_on"]
         verbose_name = "Demand Listing"
         verbose_name_plural = "Demand Listings"
+        indexes = [
+            models.Index(fields=["created_on", "id"], condition=Q(reviewed_on__isnull=True), name="demand_pending_idx"),
+        ]
 
     def __str__(self):
         return f"{self.organisation or 'Anonymous'} needs {self.material_wanted}"
 
+    def build_search_text(self):
+        return search_text(self.organisation, self.get_material_wanted_display(), self.intended_use, self.location)
+
+    def save(self, *args, **kwargs):
+        self.search_text = self.build_search_text()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "search_text"}
+        super().save(*args, **kwargs)
+
 
 # ================================
 # Matches (Surplus ↔ Demand)
@@ -82,7 +124,11 @@ class Match(models.Model):
     demand = models.ForeignKey(DemandListing, on_delete=models.CASCADE, related_name="matches")
     suggested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, help_text="Admin or system user who suggested the match")
     notes = models.TextField(blank=True, null=True, help_text="Optional notes about this match")
-    created_on = models.DateTimeField(auto_now_add=True)
+    allocated_quantity = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True, editable=False,
+        help_text="Volume the allocation run (directory.allocation) routes through this match; empty until it has run",
+    )
+    created_on = models.DateTimeField(auto_now_add=True, db_index=True)
 
     class Meta:
         unique_together = ("surplus", "demand")
@@ -92,3 +138,89 @@ class Match(models.Model):
 
     def __str__(self):
         return f"{self.surplus.company} → {self.demand.organisation or 'Requester'}"
+
+
+# ================================
+# Moderation outbox
+# ================================
+class ModerationEvent(models.Model):
+    """
+    Follow-up work for a moderation decision, written in the same
+    transaction as the decision and processed in batches by
+    ``directory.moderation.process_batch``.
+    """
+    SURPLUS = "surplus"
+    DEMAND = "demand"
+    LISTING_CHOICES = [(SURPLUS, "Surplus"), (DEMAND, "Demand")]
+
+    listing_type = models.CharField(max_length=10, choices=LISTING_CHOICES)
+    listing_id = models.PositiveBigIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="moderation_events")
+    approved = models.BooleanField()
+    created_on = models.DateTimeField(auto_now_add=True)
+    processed_on = models.DateTimeField(null=True, blank=True)
+    # Set while a worker sends the batch; an expired lease is picked up again.
+    leased_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["id"], condition=Q(processed_on__isnull=True), name="moderation_unprocessed_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.listing_type} #{self.listing_id} {'approved' if self.approved else 'rejected'}"
+
+
+# ================================
+# Diverted material rollup
+# ================================
+class DivertedVolume(models.Model):
+    """
+    Matched volume per material, month and surplus location, kept current
+    by ``directory.metrics`` so impact figures never scan ``Match``.
+    A match diverts its allocated quantity, or before allocation has run
+    the smaller of the surplus's monthly volume and the quantity the
+    requester needs.
+    """
+    material_type = models.CharField(max_length=50, choices=SurplusListing.MATERIAL_CHOICES)
+    month = models.DateField(help_text="First day of the month the match was made, in the site time zone")
+    location = models.CharField(max_length=150)
+    match_count = models.IntegerField(default=0)
+    volume = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ["-month", "material_type", "location"]
+        constraints = [
+            models.UniqueConstraint(fields=["material_type", "month", "location"], name="diverted_volume_bucket"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_material_type_display()} {self.month:%Y-%m} {self.location}: {self.volume}"
+
+
+# ================================
+# Listing search (trigram side table)
+# ================================
+class ListingTrigram(models.Model):
+    """
+    One row per distinct trigram of a listing's ``search_text``, used by
+    ``directory.search`` on databases without pg_trgm (SQLite). PostgreSQL
+    searches ``search_text`` through a GIN trigram index instead.
+    """
+    SURPLUS = "surplus"
+    DEMAND = "demand"
+    LISTING_CHOICES = [(SURPLUS, "Surplus"), (DEMAND, "Demand")]
+
+    listing_type = models.CharField(max_length=10, choices=LISTING_CHOICES)
+    listing_id = models.PositiveBigIntegerField()
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["listing_type", "trigram", "listing_id"], name="listing_trigram_lookup_idx"),
+            models.Index(fields=["listing_type", "listing_id"], name="listing_trigram_owner_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.listing_type} #{self.listing_id} {self.trigram!r}"
@@ -0,0 +1,160 @@
+"""
+Bulk listing moderation.
+
+``decide`` approves or rejects a whole queryset with one UPDATE per
+``BATCH_SIZE`` listings (bounding the query parameters) and writes one
+``ModerationEvent`` per listing in the same transaction. The follow-up
+work (owner e-mails) is ``process_batch``: it leases the oldest pending
+events in a short transaction, then, holding no locks, groups them by
+owner and sends one message per owner over a single mail connection.
+After commit the deciding request processes one batch; the rest, and
+events whose mail failed or whose worker died mid-send (once the lease
+expires), are left to ``manage.py process_moderation_events`` (cron).
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from callsoso import autocomplete
+
+from . import similarity
+from .models import DemandListing, ModerationEvent, SurplusListing
+from .suggestions import LISTING_SOURCES
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+LEASE = timedelta(minutes=10)  # comfortably longer than sending one batch
+LISTING_MODELS = {
+    ModerationEvent.SURPLUS: SurplusListing,
+    ModerationEvent.DEMAND: DemandListing,
+}
+LISTING_TYPES = {model: listing_type for listing_type, model in LISTING_MODELS.items()}
+
+
+# ===========================
+# DECISIONS
+# ===========================
+def decide(queryset, approved):
+    """Approve or reject every listing in ``queryset``; returns how many changed."""
+    listing_type = LISTING_TYPES[queryset.model]
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(queryset.order_by().values_list("pk", "user_id"))
+        if not rows:
+            return 0
+        updated = 0
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = [pk for pk, _ in rows[start:start + BATCH_SIZE]]
+            updated += queryset.model.objects.filter(pk__in=batch).update(approved=approved, reviewed_on=now)
+        ModerationEvent.objects.bulk_create(
+            [
+                ModerationEvent(listing_type=listing_type, listing_id=pk, user_id=user_id, approved=approved)
+                for pk, user_id in rows
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        transaction.on_commit(process_batch, robust=True)
+        # The UPDATE skips the signals that keep the filter suggestions and
+        # the similarity index current.
+        transaction.on_commit(lambda: autocomplete.invalidate(*LISTING_SOURCES))
+        transaction.on_commit(similarity.invalidate)
+    return updated
+
+
+def approve(queryset):
+    return decide(queryset, approved=True)
+
+
+def reject(queryset):
+    return decide(queryset, approved=False)
+
+
+# ===========================
+# FOLLOW-UP
+# ===========================
+def _listings(events):
+    """``{(listing_type, pk): listing}`` for every listing the events mention, one query per type."""
+    ids = defaultdict(set)
+    for event in events:
+        ids[event.listing_type].add(event.listing_id)
+    return {
+        (listing_type, listing.pk): listing
+        for listing_type, pks in ids.items()
+        for listing in LISTING_MODELS[listing_type].objects.filter(pk__in=pks)
+    }
+
+
+def _message(user, events, listings):
+    lines = []
+    for event in events:
+        listing = listings.get((event.listing_type, event.listing_id))
+        if listing is None:
+            continue  # deleted since the decision
+        lines.append(f"- {listing}: {'approved' if event.approved else 'not approved'}")
+    if not lines or not user.email:
+        return None
+    return EmailMessage(
+        subject="Call Soso: your directory listings were reviewed",
+        body="Our moderators reviewed your listings:\n\n" + "\n".join(lines),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
+
+def _lease(batch_size):
+    """The oldest pending events no other worker holds, leased to this one."""
+    now = timezone.now()
+    # Row locks (PostgreSQL) keep concurrent workers off the same batch while it is leased.
+    with transaction.atomic():
+        events = list(
+            ModerationEvent.objects.filter(processed_on__isnull=True)
+            .filter(Q(leased_until__isnull=True) | Q(leased_until__lt=now))
+            .select_related("user")
+            .select_for_update(skip_locked=True, of=("self",))
+            .order_by("id")[:batch_size]
+        )
+        ModerationEvent.objects.filter(pk__in=[event.pk for event in events]).update(leased_until=now + LEASE)
+    return events
+
+
+def process_batch(batch_size=BATCH_SIZE):
+    """Send the e-mails for one batch of pending events; returns how many were processed."""
+    events = _lease(batch_size)
+    if not events:
+        return 0
+    pks = [event.pk for event in events]
+
+    by_user = defaultdict(list)
+    for event in events:
+        by_user[event.user].append(event)
+    listings = _listings(events)
+    messages = [
+        message
+        for user, user_events in by_user.items()
+        if (message := _message(user, user_events, listings))
+    ]
+    try:
+        get_connection().send_messages(messages)
+    except Exception:
+        logger.exception("Sending %d moderation e-mails failed; will retry", len(messages))
+        ModerationEvent.objects.filter(pk__in=pks).update(leased_until=None)
+        return 0
+
+    ModerationEvent.objects.filter(pk__in=pks).update(processed_on=timezone.now(), leased_until=None)
+    return len(events)
+
+
+def process_events(batch_size=BATCH_SIZE):
+    """Process batches until none is pending or one fails; returns how many events were processed."""
+    processed = 0
+    while batch := process_batch(batch_size):
+        processed += batch
+    return processed
@@ -0,0 +1,119 @@
+"""
+Typo-tolerant listing search.
+
+Listings store their searchable words in ``search_text`` (company or
+organisation, material, description or intended use, location). A query
+matches a listing when enough of the query's trigrams occur in it, the
+``word_similarity`` of pg_trgm: "hrare" still finds "Harare".
+
+- PostgreSQL: ``query <% search_text`` uses a GIN ``gin_trgm_ops`` index
+  and ``word_similarity`` ranks the rows.
+- Elsewhere (SQLite): ``ListingTrigram`` holds each listing's trigrams,
+  kept current by ``directory.signals``; the share of the query's
+  trigrams a listing has is its score.
+
+Either way ``search()`` is one query returning ranked listings.
+"""
+
+import re
+
+from django.db import connections, transaction
+from django.db.models import BooleanField, Count, F, FloatField, Func, OuterRef, Subquery, Value
+from django.db.models.functions import Cast
+
+from .models import DemandListing, ListingTrigram, SurplusListing, search_text
+
+# pg_trgm's default pg_trgm.word_similarity_threshold, used on both backends.
+SIMILARITY_THRESHOLD = 0.6
+LISTING_TYPES = {
+    SurplusListing: ListingTrigram.SURPLUS,
+    DemandListing: ListingTrigram.DEMAND,
+}
+BATCH_SIZE = 1000
+
+
+def trigrams(text):
+    """The distinct trigrams of ``text``, padded per word like pg_trgm."""
+    grams = set()
+    for word in re.findall(r"\w+", text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def uses_pg_trgm(using="default"):
+    return connections[using].vendor == "postgresql"
+
+
+# ===========================
+# SEARCHING
+# ===========================
+class WordSimilar(Func):
+    """``query <% document``: true when word_similarity passes the threshold; uses the GIN index."""
+    arg_joiner = " <%% "
+    template = "%(expressions)s"
+    output_field = BooleanField()
+
+
+def search(listings, query):
+    """``listings`` narrowed to those matching ``query``, best match first, with a ``similarity``."""
+    query = search_text(query)
+    if not query:
+        return listings
+    if uses_pg_trgm(listings.db):
+        return (
+            listings.filter(WordSimilar(Value(query), F("search_text")))
+            .annotate(similarity=Func(Value(query), F("search_text"), function="word_similarity", output_field=FloatField()))
+            .order_by("-similarity", "-created_on")
+        )
+
+    grams = trigrams(query)
+    matching = ListingTrigram.objects.filter(listing_type=LISTING_TYPES[listings.model], trigram__in=grams)
+    hits = matching.filter(listing_id=OuterRef("pk")).values("listing_id").annotate(hits=Count("*")).values("hits")
+    return (
+        listings.annotate(similarity=Cast(Subquery(hits), FloatField()) / len(grams))
+        .filter(similarity__gte=SIMILARITY_THRESHOLD)
+        .order_by("-similarity", "-created_on")
+    )
+
+
+# ===========================
+# SIDE TABLE (non-PostgreSQL)
+# ===========================
+def index_listing(listing):
+    """Replace the listing's trigram rows."""
+    listing_type = LISTING_TYPES[type(listing)]
+    with transaction.atomic():
+        ListingTrigram.objects.filter(listing_type=listing_type, listing_id=listing.pk).delete()
+        ListingTrigram.objects.bulk_create(
+            ListingTrigram(listing_type=listing_type, listing_id=listing.pk, trigram=gram)
+            for gram in trigrams(listing.search_text)
+        )
+
+
+def unindex_listing(listing):
+    ListingTrigram.objects.filter(listing_type=LISTING_TYPES[type(listing)], listing_id=listing.pk).delete()
+
+
+@transaction.atomic
+def rebuild():
+    """Recompute ``search_text`` and, without pg_trgm, every trigram row (after bulk writes)."""
+    for model, listing_type in LISTING_TYPES.items():
+        changed = []
+        for listing in model.objects.order_by("pk").iterator(chunk_size=BATCH_SIZE):
+            before = listing.search_text
+            listing.search_text = listing.build_search_text()
+            if listing.search_text != before:
+                changed.append(listing)
+        model.objects.bulk_update(changed, ["search_text"], batch_size=BATCH_SIZE)
+
+        if uses_pg_trgm():
+            continue
+        ListingTrigram.objects.filter(listing_type=listing_type).delete()
+        rows = (
+            ListingTrigram(listing_type=listing_type, listing_id=pk, trigram=gram)
+            for pk, text in model.objects.values_list("pk", "search_text").iterator(chunk_size=BATCH_SIZE)
+            for gram in trigrams(text)
+        )
+        ListingTrigram.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
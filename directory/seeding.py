@@ -0,0 +1,73 @@
+"""
+Synthetic directory data (surplus, demand and matches) for the benchmark
+commands. See ``website.seeding`` for the content side.
+"""
+
+import random
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from website.seeding import WORDS, _sentence
+
+from . import metrics, search, similarity
+from .models import DemandListing, Match, SurplusListing
+
+LOCATIONS = ["London", "Milton Keynes", "Harare", "Bristol", "Leeds", "Bulawayo", "Manchester"]
+MATERIALS = [choice for choice, _ in SurplusListing.MATERIAL_CHOICES]
+
+
+def seed_directory(users, surplus=200, demand=200, matches=100, seed=0):
+    """
+    Approved and pending surplus/demand listings owned by ``users`` and
+    ``matches`` distinct surplus ↔ demand pairs. Returns the row counts.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    surplus_rows = SurplusListing.objects.bulk_create(
+        SurplusListing(
+            user=rng.choice(users),
+            company=f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} Ltd {i}",
+            location=rng.choice(LOCATIONS),
+            material_type=rng.choice(MATERIALS),
+            description=_sentence(rng, 15),
+            monthly_volume=Decimal(rng.randint(1, 2000)),
+            contact_email=f"surplus-{i}@example.org",
+            approved=i % 4 != 3,
+            reviewed_on=None if i % 4 == 3 else now,
+        )
+        for i in range(surplus)
+    )
+    demand_rows = DemandListing.objects.bulk_create(
+        DemandListing(
+            user=rng.choice(users),
+            organisation=None if i % 10 == 9 else f"{rng.choice(WORDS).title()} Collective {i}",
+            location=rng.choice(LOCATIONS),
+            material_wanted=rng.choice(MATERIALS),
+            quantity_needed=Decimal(rng.randint(1, 800)),
+            intended_use=_sentence(rng, 15),
+            approved=i % 4 != 3,
+            reviewed_on=None if i % 4 == 3 else now,
+        )
+        for i in range(demand)
+    )
+
+    pairs = set()
+    limit = min(matches, len(surplus_rows) * len(demand_rows))
+    while len(pairs) < limit:
+        pairs.add((rng.choice(surplus_rows).pk, rng.choice(demand_rows).pk))
+    Match.objects.bulk_create(
+        Match(surplus_id=surplus_id, demand_id=demand_id, suggested_by=rng.choice(users))
+        for surplus_id, demand_id in pairs
+    )
+    # bulk_create skips save() and the signals that maintain the
+    # diverted-volume rollup, the search text and the similarity index.
+    metrics.rebuild()
+    search.rebuild()
+    transaction.on_commit(similarity.invalidate)
+    return {
+        "surplus_listings": len(surplus_rows),
+        "demand_listings": len(demand_rows),
+        "matches": len(pairs),
+    }
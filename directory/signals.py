@@ -0,0 +1,88 @@
+"""
+Keep ``DivertedVolume`` (``directory.metrics``) in step with matches and
+with edits to the listing fields a match's contribution depends on, and
+the search side table (``directory.search``) and the similarity index
+(``directory.similarity``) in step with listings.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import metrics, search, similarity
+from .models import DemandListing, Match, SurplusListing
+
+LISTING_FIELDS = {
+    SurplusListing: ("material_type", "location", "monthly_volume"),
+    DemandListing: ("quantity_needed",),
+}
+
+
+@receiver(post_save, sender=Match)
+def match_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        metrics.match_added(instance)
+
+
+@receiver(pre_delete, sender=Match)
+def match_deleted(sender, instance, **kwargs):
+    # pre_delete: the listings are still readable, also in a cascade.
+    metrics.apply(metrics.contributions(Match.objects.filter(pk=instance.pk)), -1)
+
+
+@receiver(pre_save, sender=SurplusListing)
+@receiver(pre_save, sender=DemandListing)
+def listing_changing(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk:
+        return
+    old = sender.objects.filter(pk=instance.pk).values(*LISTING_FIELDS[sender]).first()
+    if old and any(old[field] != getattr(instance, field) for field in LISTING_FIELDS[sender]):
+        instance._diverted_before = metrics.contributions(metrics.matches_of(instance))
+
+
+@receiver(post_save, sender=SurplusListing)
+@receiver(post_save, sender=DemandListing)
+def listing_changed(sender, instance, raw=False, **kwargs):
+    before = instance.__dict__.pop("_diverted_before", None)
+    if before is not None:
+        metrics.apply(before, -1)
+        metrics.apply(metrics.contributions(metrics.matches_of(instance)))
+
+
+# ===========================
+# SEARCH
+# ===========================
+@receiver(post_save, sender=SurplusListing)
+@receiver(post_save, sender=DemandListing)
+def listing_search_saved(sender, instance, raw=False, **kwargs):
+    if not raw and not search.uses_pg_trgm(kwargs["using"]):
+        search.index_listing(instance)
+
+
+@receiver(post_delete, sender=SurplusListing)
+@receiver(post_delete, sender=DemandListing)
+def listing_search_deleted(sender, instance, **kwargs):
+    if not search.uses_pg_trgm(kwargs["using"]):
+        search.unindex_listing(instance)
+
+
+# ===========================
+# SIMILARITY
+# ===========================
+@receiver(post_save, sender=SurplusListing)
+@receiver(post_save, sender=DemandListing)
+def listing_similarity_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: similarity.record_change(instance))
+
+
+@receiver(post_delete, sender=SurplusListing)
+@receiver(post_delete, sender=DemandListing)
+def listing_similarity_deleted(sender, instance, **kwargs):
+    pk = instance.pk  # cleared once the delete completes
+
+    def removed():
+        instance.pk = pk
+        similarity.record_change(instance, deleted=True)
+
+    transaction.on_commit(removed)
@@ -0,0 +1,293 @@
+"""
+Text similarity between surplus and demand listings.
+
+What a supplier has (``SurplusListing.description``) and what a requester
+wants it for (``DemandListing.intended_use``) are compared as TF-IDF
+vectors within each material: a wood surplus is only ever suggested to
+wood requests. Each worker holds the term counts of every approved
+listing, loaded in two queries, and per material the L2-normalized
+TF-IDF matrix of each side, built on first use after a change to that
+material. Scoring a listing against the other side is one sparse
+matrix product (SciPy when installed, an inverted index otherwise).
+
+Saves and deletes report the listing after commit (``directory.signals``):
+this worker updates its index in place and the others reload when the
+version stamp in the default cache moves, as with
+``callsoso.autocomplete``. Bulk updates call ``invalidate()``. There is
+one stamp, so any approved edit makes every other worker reload the whole
+index on its next read: two queries over all approved listings and
+re-tokenising their text, which is cheap while edits are occasional;
+per-material stamps would be the next step if they are not.
+"""
+
+import heapq
+import math
+import threading
+from collections import Counter, defaultdict
+
+from callsoso.cache import bump, version_stamp
+
+from .models import DemandListing, SurplusListing, search_text
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # SciPy is optional; the inverted index gives the same scores
+    np = sparse = None
+
+VERSION_KEY = "directory:similarity-version"
+SURPLUS = "surplus"
+DEMAND = "demand"
+OTHER_SIDE = {SURPLUS: DEMAND, DEMAND: SURPLUS}
+MODELS = {SURPLUS: SurplusListing, DEMAND: DemandListing}
+# (material field, text field) per side.
+FIELDS = {SURPLUS: ("material_type", "description"), DEMAND: ("material_wanted", "intended_use")}
+
+STOP_WORDS = frozenset(
+    "a about an and are as at be by can for from has have in into is it its of on or our per that the their "
+    "them these they this to up us use used we will with would".split()
+)
+
+
+def terms(text):
+    """Term counts of ``text``: accent-free lower-case words, stop words dropped, plurals folded."""
+    counts = Counter()
+    for word in search_text(text).split():
+        if len(word) < 2 or word in STOP_WORDS or word.isdigit():
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        counts[word] += 1
+    return counts
+
+
+# ===========================
+# MATERIAL BUCKETS
+# ===========================
+class Bucket:
+    """
+    One material's listings on both sides, with document frequencies over
+    both. ``add`` and ``discard`` run under the index's ``lock``, which
+    ``vectors`` also takes, so a rebuild never reads a half-applied change.
+    """
+
+    def __init__(self, lock):
+        self.docs = {SURPLUS: {}, DEMAND: {}}  # pk -> term counts
+        self.df = Counter()
+        self._vectors = None
+        self._lock = lock
+
+    def add(self, side, pk, counts):
+        self.discard(side, pk)
+        self.docs[side][pk] = counts
+        self.df.update(counts.keys())
+        self._vectors = None
+
+    def discard(self, side, pk):
+        counts = self.docs[side].pop(pk, None)
+        if counts is None:
+            return
+        for term in counts:
+            self.df[term] -= 1
+            if not self.df[term]:
+                del self.df[term]  # no listing uses it any more
+        self._vectors = None
+
+    def weights(self, counts):
+        """The L2-normalized TF-IDF vector of ``counts`` as ``{term: weight}``."""
+        documents = len(self.docs[SURPLUS]) + len(self.docs[DEMAND])
+        vector = {
+            term: (1 + math.log(count)) * (math.log((1 + documents) / (1 + self.df[term])) + 1)
+            for term, count in counts.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+    def vectors(self):
+        """Per side ``(pks, row of pk, matrix or postings)``; rebuilt after a change."""
+        vectors = self._vectors
+        if vectors is not None:
+            return vectors
+        with self._lock:
+            if self._vectors is None:
+                columns = {term: column for column, term in enumerate(self.df)}
+                self._vectors = {side: self._side(side, columns) for side in self.docs}
+            return self._vectors
+
+    def _side(self, side, columns):
+        pks = list(self.docs[side])
+        rows = [self.weights(self.docs[side][pk]) for pk in pks]
+        if sparse is not None:
+            indptr, indices, data = [0], [], []
+            for row in rows:
+                indices.extend(columns[term] for term in row)
+                data.extend(row.values())
+                indptr.append(len(indices))
+            matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(pks), len(columns)))
+            return pks, {pk: i for i, pk in enumerate(pks)}, matrix
+        postings = defaultdict(list)
+        for i, row in enumerate(rows):
+            for term, weight in row.items():
+                postings[term].append((i, weight))
+        return pks, {pk: i for i, pk in enumerate(pks)}, (rows, postings)
+
+    def rank(self, side, pks, limit):
+        """``{pk: [(other pk, score), ...]}``, best first, for ``side`` listings in this bucket."""
+        vectors = self.vectors()
+        own_pks, own_rows, own = vectors[side]
+        other_pks, _, other = vectors[OTHER_SIDE[side]]
+        pks = [pk for pk in pks if pk in own_rows]
+        if not pks or not other_pks:
+            return {pk: [] for pk in pks}
+        if sparse is not None:
+            # One product for all the listings asked about: (asked × terms) · (terms × other side).
+            scores = (own[[own_rows[pk] for pk in pks]] @ other.T).toarray()
+            ids = np.asarray(other_pks)
+            return {pk: _top(row, ids, limit) for pk, row in zip(pks, scores)}
+        rows, _ = own
+        _, postings = other
+        ranked = {}
+        for pk in pks:
+            totals = defaultdict(float)
+            for term, weight in rows[own_rows[pk]].items():
+                for i, other_weight in postings.get(term, ()):
+                    totals[i] += weight * other_weight
+            best = heapq.nsmallest(limit, ((-score, other_pks[i]) for i, score in totals.items() if score > 0))
+            ranked[pk] = [(other_pk, -score) for score, other_pk in best]
+        return ranked
+
+
+def _top(scores, ids, limit):
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > limit:
+        threshold = np.partition(scores[candidates], -limit)[-limit]
+        candidates = candidates[scores[candidates] >= threshold]
+    order = np.lexsort((ids[candidates], -scores[candidates]))[:limit]
+    return [(int(ids[i]), float(scores[i])) for i in candidates[order]]
+
+
+# ===========================
+# WORKER INDEX
+# ===========================
+class Index:
+    def __init__(self, version):
+        self.version = version
+        self._lock = threading.Lock()
+        self.buckets = defaultdict(lambda: Bucket(self._lock))
+        self.material = {}  # (side, pk) -> material it is indexed under
+
+    def put(self, side, pk, material=None, text=None):
+        """Index the listing under ``material``, or remove it when ``material`` is None."""
+        with self._lock:
+            old = self.material.pop((side, pk), None)
+            if old is not None:
+                self.buckets[old].discard(side, pk)
+            if material is not None:
+                self.buckets[material].add(side, pk, terms(text))
+                self.material[side, pk] = material
+
+    def document(self, side, pk):
+        material = self.material.get((side, pk))
+        return None if material is None else (material, self.buckets[material].docs[side][pk])
+
+
+_index = None
+_reload_lock = threading.Lock()
+
+
+def load(version):
+    index = Index(version)
+    for side, model in MODELS.items():
+        material_field, text_field = FIELDS[side]
+        rows = model.objects.filter(approved=True).order_by().values_list("pk", material_field, text_field)
+        for pk, material, text in rows.iterator():
+            index.put(side, pk, material, text)
+    return index
+
+
+def current_version():
+    return version_stamp(VERSION_KEY)
+
+
+def get():
+    """This worker's index, reloaded if the shared version has moved."""
+    global _index
+    version = current_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _reload_lock:
+        if _index is None or _index.version != version:
+            _index = load(version)
+        return _index
+
+
+def record_change(listing, deleted=False):
+    """Apply a committed save or delete of ``listing`` here and make the other workers reload."""
+    global _index
+    side = SURPLUS if isinstance(listing, SurplusListing) else DEMAND
+    material_field, text_field = FIELDS[side]
+    material = text = None
+    if listing.approved and not deleted:
+        material, text = getattr(listing, material_field), getattr(listing, text_field)
+
+    index = _index
+    up_to_date = index is not None and index.version == current_version()
+    if up_to_date and index.document(side, listing.pk) == (None if material is None else (material, terms(text))):
+        return  # e.g. an edit to the company name
+    version = bump(VERSION_KEY)
+    with _reload_lock:
+        if not up_to_date:
+            _index = None  # missed someone else's change; reload on next use
+            return
+        index.put(side, listing.pk, material, text)
+        index.version = version
+
+
+def invalidate():
+    """Reload everywhere, e.g. after a bulk update that skipped signals."""
+    global _index
+    _index = None
+    bump(VERSION_KEY)
+
+
+# ===========================
+# SUGGESTIONS
+# ===========================
+def suggestions(listing, limit=5):
+    """``[(other pk, score), ...]``: the other side's listings most similar to ``listing``."""
+    side = SURPLUS if isinstance(listing, SurplusListing) else DEMAND
+    return rank(side, [listing.pk], limit).get(listing.pk, [])
+
+
+def rank(side, pks, limit=5):
+    """``{pk: [(other pk, score), ...]}`` for ``side`` listings; pks not indexed are left out."""
+    index = get()
+    by_material = defaultdict(list)
+    for pk in pks:
+        material = index.material.get((side, pk))
+        if material is not None:
+            by_material[material].append(pk)
+    ranked = {}
+    for material, material_pks in by_material.items():
+        ranked.update(index.buckets[material].rank(side, material_pks, limit))
+    return ranked
+
+
+def attach(listings, limit=3):
+    """
+    Set ``similar`` on each listing to ``[(other listing, score), ...]``,
+    reading the other side's rows in one query.
+    """
+    listings = list(listings)
+    if not listings:
+        return listings
+    side = SURPLUS if isinstance(listings[0], SurplusListing) else DEMAND
+    ranked = rank(side, [listing.pk for listing in listings], limit)
+    wanted = {other_pk for pairs in ranked.values() for other_pk, _ in pairs}
+    others = MODELS[OTHER_SIDE[side]].objects.in_bulk(wanted) if wanted else {}
+    for listing in listings:
+        listing.similar = [
+            (others[other_pk], score) for other_pk, score in ranked.get(listing.pk, []) if other_pk in others
+        ]
+    return listings
@@ -0,0 +1,35 @@
+"""
+Typeahead sources for the directory filters (``callsoso.autocomplete``):
+company, organisation and location names of approved listings. Members
+only, like the rest of the directory.
+"""
+
+from callsoso import autocomplete
+
+from .models import DemandListing, SurplusListing
+
+LISTING_SOURCES = ("companies", "organisations", "locations")
+
+
+def _approved(model, field):
+    return model.objects.filter(approved=True).exclude(**{f"{field}__isnull": True}).values_list(field, flat=True)
+
+
+def _locations():
+    yield from _approved(SurplusListing, "location").iterator()
+    yield from _approved(DemandListing, "location").iterator()
+
+
+autocomplete.register("companies", lambda: _approved(SurplusListing, "company").iterator(), login_required=True)
+autocomplete.register("organisations", lambda: _approved(DemandListing, "organisation").iterator(), login_required=True)
+autocomplete.register("locations", _locations, login_required=True)
+
+
+def _is_approved(listing):
+    return listing.approved
+
+
+autocomplete.track(SurplusListing, "companies", "company", visible=_is_approved)
+autocomplete.track(DemandListing, "organisations", "organisation", visible=_is_approved)
+autocomplete.track(SurplusListing, "locations", "location", visible=_is_approved)
+autocomplete.track(DemandListing, "locations", "location", visible=_is_approved)
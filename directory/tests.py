@@ -1,3 +1,408 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from callsoso.testing import TEST_STORAGES, QueryBudgetTestCase
+from website.seeding import seed_users
+
+from . import allocation, metrics, moderation, search, similarity
+from .models import DemandListing, DivertedVolume, ListingTrigram, Match, ModerationEvent, SurplusListing
+from .seeding import seed_directory
+
+
+def seed_budget_data(test, scale):
+    users = [test.staff, *seed_users(3 * scale)]
+    seed_directory(users, surplus=10 * scale, demand=10 * scale, matches=15 * scale, seed=scale)
+
+
+class DirectoryQueryBudgetTests(QueryBudgetTestCase):
+    seed_func = seed_budget_data
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser("budget-staff", "staff@example.org", None)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_index(self):
+        self.assertQueryBudget(reverse("directory:directory_home"), 4)
+
+    def test_surplus_list(self):
+        # Cold: includes loading the similarity index (2) and the suggested requests.
+        self.assertQueryBudget(reverse("directory:surplus_list"), 6)
+
+    def test_demand_list(self):
+        self.assertQueryBudget(reverse("directory:demand_list"), 6)
+
+    def test_surplus_search(self):
+        self.assertQueryBudget(reverse("directory:surplus_list") + "?q=hrare", 6)
+
+    def test_match_list(self):
+        self.assertQueryBudget(reverse("directory:match_list"), 3)
+
+    def test_match_changelist(self):
+        self.assertQueryBudget(reverse("admin:directory_match_changelist"), 5)
+
+    def test_surplus_changelist(self):
+        self.assertQueryBudget(reverse("admin:directory_surpluslisting_changelist"), 5)
+
+    def test_demand_changelist(self):
+        self.assertQueryBudget(reverse("admin:directory_demandlisting_changelist"), 5)
+
+
+@override_settings(STORAGES=TEST_STORAGES, PERFORMANCE_INSTRUMENTATION=False)
+class BulkModerationTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_superuser("moderator", "mod@example.org", None)
+        self.client.force_login(self.staff)
+        users = seed_users(4)
+        seed_directory(users, surplus=20, demand=0, matches=0)
+        SurplusListing.objects.update(approved=False, reviewed_on=None)
+
+    def test_approve_is_constant_queries_and_one_mail_per_owner(self):
+        pks = list(SurplusListing.objects.values_list("pk", flat=True))
+        url = reverse("admin:directory_surpluslisting_changelist")
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(url, {"action": "approve_selected", "_selected_action": pks})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(SurplusListing.objects.filter(approved=False).exists())
+        self.assertFalse(SurplusListing.objects.filter(reviewed_on__isnull=True).exists())
+        self.assertLessEqual(len(queries), 15)
+        owners = set(SurplusListing.objects.values_list("user__email", flat=True))
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), sorted(owners))
+        self.assertFalse(ModerationEvent.objects.filter(processed_on__isnull=True).exists())
+
+    def test_large_selections_are_updated_in_batches(self):
+        with mock.patch.object(moderation, "BATCH_SIZE", 7), self.captureOnCommitCallbacks():
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(moderation.approve(SurplusListing.objects.all()), 20)
+        updates = [q["sql"] for q in queries.captured_queries if q["sql"].startswith('UPDATE "directory_surpluslisting"')]
+        self.assertEqual(len(updates), 3)
+        self.assertFalse(SurplusListing.objects.filter(approved=False).exists())
+
+    def test_mail_goes_out_one_batch_at_a_time_outside_the_transaction(self):
+        with self.captureOnCommitCallbacks():  # the decision commits; nothing is sent yet
+            moderation.approve(SurplusListing.objects.all())
+        depth, sent_at = len(connection.atomic_blocks), []
+        backend = mail.get_connection()
+
+        def send_messages(messages):
+            sent_at.append(len(connection.atomic_blocks))
+            return backend.send_messages(messages)
+
+        with mock.patch.object(moderation, "get_connection", return_value=mock.Mock(send_messages=send_messages)):
+            self.assertEqual(moderation.process_batch(batch_size=5), 5)
+        self.assertEqual(sent_at, [depth])
+        self.assertEqual(ModerationEvent.objects.filter(processed_on__isnull=True).count(), 15)
+
+        call_command("process_moderation_events", stdout=StringIO())
+        self.assertFalse(ModerationEvent.objects.filter(processed_on__isnull=True).exists())
+
+    def test_failed_mail_is_released_and_leased_events_are_skipped(self):
+        with self.captureOnCommitCallbacks():
+            moderation.approve(SurplusListing.objects.all())
+        with mock.patch.object(moderation, "get_connection", side_effect=OSError("smtp down")):
+            with self.assertLogs("directory.moderation", "ERROR"):
+                self.assertEqual(moderation.process_events(), 0)
+        self.assertFalse(ModerationEvent.objects.filter(leased_until__isnull=False).exists())
+
+        # Another worker is still sending these.
+        held = ModerationEvent.objects.order_by("id")[:3].values_list("pk", flat=True)
+        ModerationEvent.objects.filter(pk__in=list(held)).update(leased_until=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(moderation.process_events(), 17)
+        self.assertEqual(ModerationEvent.objects.filter(processed_on__isnull=True).count(), 3)
+
+    def test_pending_queue_is_oldest_first(self):
+        SurplusListing.objects.filter(pk=SurplusListing.objects.order_by("pk")[0].pk).update(reviewed_on=timezone.now())
+        response = self.client.get(reverse("admin:directory_surpluslisting_changelist"), {"status": "pending"})
+        listed = [obj.pk for obj in response.context["cl"].result_list]
+        expected = list(SurplusListing.objects.filter(reviewed_on__isnull=True).order_by("created_on", "id").values_list("pk", flat=True))
+        self.assertEqual(listed, expected[: len(listed)])
+
+
+class DivertedVolumeTests(TestCase):
+    def snapshot(self):
+        return sorted(
+            DivertedVolume.objects.filter(match_count__gt=0).values_list(
+                "material_type", "month", "location", "match_count", "volume"
+            )
+        )
+
+    def test_incremental_updates_match_a_full_rebuild(self):
+        users = seed_users(3)
+        seed_directory(users, surplus=6, demand=6, matches=0)
+        surpluses = list(SurplusListing.objects.order_by("pk"))
+        demands = list(DemandListing.objects.order_by("pk"))
+        for surplus, demand in zip(surpluses, demands):
+            Match.objects.create(surplus=surplus, demand=demand)
+        Match.objects.create(surplus=surpluses[0], demand=demands[1])
+
+        surpluses[0].location, surpluses[0].monthly_volume = "Harare", Decimal("3")
+        surpluses[0].save()
+        demands[2].quantity_needed = Decimal("1")
+        demands[2].save()
+        Match.objects.filter(pk=Match.objects.order_by("pk")[1].pk).delete()
+        surpluses[3].delete()
+
+        incremental = self.snapshot()
+        metrics.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(metrics.summary()["matches"], Match.objects.count())
+
+    @override_settings(STORAGES=TEST_STORAGES, PERFORMANCE_INSTRUMENTATION=False)
+    def test_export(self):
+        users = seed_users(2)
+        seed_directory(users, surplus=4, demand=4, matches=5)
+        self.client.force_login(users[0])
+        with self.assertNumQueries(3):  # session, user, rollup
+            response = self.client.get(reverse("website:impact_export"))
+            lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "month,material_type,location,matches,volume")
+        self.assertEqual(sum(int(line.split(",")[3]) for line in lines[1:]), 5)
+
+
+class ListingSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("searcher", "searcher@example.org", "pw")
+        listing = dict(user=cls.user, material_type="plastic", monthly_volume=Decimal("5"), contact_email="s@example.org")
+        cls.harare = SurplusListing.objects.create(company="Mbare Plastics", location="Harare", **listing)
+        cls.greater = SurplusListing.objects.create(company="Chitungwiza Recyclers", location="Greater Harare area", **listing)
+        cls.bristol = SurplusListing.objects.create(company="Avon Polymers", location="Bristol", **listing)
+        cls.needs = DemandListing.objects.create(
+            user=cls.user, organisation="Café Collective", material_wanted="food",
+            quantity_needed=Decimal("2"), intended_use="Soup kitchen", location="Bulawayo",
+        )
+
+    def test_tolerates_typos_and_accents(self):
+        found = list(search.search(SurplusListing.objects.all(), "hrare"))
+        self.assertEqual(set(found), {self.harare, self.greater})
+        self.assertEqual(list(search.search(DemandListing.objects.all(), "cafe colective")), [self.needs])
+        self.assertEqual(list(search.search(SurplusListing.objects.all(), "zzqx")), [])
+
+    def test_ranks_closer_matches_first(self):
+        found = list(search.search(SurplusListing.objects.all(), "mbare plastic"))
+        self.assertEqual(found[0], self.harare)
+
+    def test_side_table_follows_edits_and_rebuild(self):
+        self.bristol.location = "Harare"
+        self.bristol.save()
+        self.assertIn(self.bristol, search.search(SurplusListing.objects.all(), "harare"))
+        self.harare.delete()
+        self.assertFalse(ListingTrigram.objects.filter(listing_type="surplus", listing_id=self.harare.pk).exists())
+
+        before = sorted(ListingTrigram.objects.values_list("listing_type", "listing_id", "trigram"))
+        search.rebuild()
+        self.assertEqual(before, sorted(ListingTrigram.objects.values_list("listing_type", "listing_id", "trigram")))
+
+    @override_settings(STORAGES=TEST_STORAGES, PERFORMANCE_INSTRUMENTATION=False)
+    def test_list_views_search(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("directory:surplus_list"), {"q": "harrare"})
+        self.assertEqual(set(response.context["listings"]), {self.harare, self.greater})
+        response = self.client.get(reverse("directory:demand_list"), {"q": "colective"})
+        self.assertEqual(list(response.context["listings"]), [self.needs])
+
+    @override_settings(STORAGES=TEST_STORAGES, PERFORMANCE_INSTRUMENTATION=False)
+    def test_demand_search_matches_organisation(self):
+        # The demand search once filtered on a nonexistent 'org' field
+        other = DemandListing.objects.create(
+            user=self.user, organisation="Harare Builders", material_wanted="food",
+            quantity_needed=Decimal("1"), location="Harare",
+        )
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("directory:demand_list"), {"q": "Café Collective"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context["listings"]), [self.needs])
+        self.assertContains(response, "<strong>Café Collective</strong>")
+        response = self.client.get(reverse("directory:demand_list"), {"q": "builders"})
+        self.assertEqual(list(response.context["listings"]), [other])
+
+
+class AllocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("allocator", "allocator@example.org", "pw")
+
+    def surplus(self, location, volume, **extra):
+        return SurplusListing.objects.create(
+            user=self.user, company=f"Supplier {location}", location=location, material_type="wood",
+            monthly_volume=Decimal(volume), contact_email="s@example.org", **{"approved": True, **extra},
+        )
+
+    def demand(self, location, quantity, **extra):
+        return DemandListing.objects.create(
+            user=self.user, location=location, material_wanted="wood",
+            quantity_needed=Decimal(quantity), **{"approved": True, **extra},
+        )
+
+    def allocated(self):
+        return {
+            (match.surplus_id, match.demand_id): match.allocated_quantity
+            for match in Match.objects.exclude(allocated_quantity=0)
+        }
+
+    def test_splits_volume_and_prefers_the_same_location(self):
+        harare = self.surplus("Harare", "100")
+        leeds = self.surplus("Leeds", "30.50")
+        self.surplus("Harare", "10", approved=False)
+        workshop = self.demand("harare", "60")
+        school = self.demand("Leeds", "20")
+        farm = self.demand("Harare", "70")
+
+        result = allocation.allocate_all(["wood"])["wood"]
+
+        self.assertEqual(self.allocated(), {
+            (harare.pk, workshop.pk): Decimal("60.00"),
+            (harare.pk, farm.pk): Decimal("40.00"),
+            (leeds.pk, school.pk): Decimal("20.00"),
+            (leeds.pk, farm.pk): Decimal("10.50"),
+        })
+        self.assertEqual(result["allocated"], Decimal("130.50"))
+        self.assertEqual(result["cross_location"], Decimal("10.50"))
+        self.assertEqual(metrics.summary()["total_volume"], Decimal("130.50"))
+
+    def test_rerun_keeps_existing_matches_first(self):
+        supplier = self.surplus("Bristol", "50")
+        self.demand("Bristol", "50")
+        newer = self.demand("Bristol", "50")
+        Match.objects.create(surplus=supplier, demand=newer)
+
+        allocation.allocate_all(["wood"])
+        first = self.allocated()
+        self.assertEqual(first, {(supplier.pk, newer.pk): Decimal("50.00")})
+
+        with self.assertNumQueries(4):  # surplus, demand, matches, reset; nothing else to write
+            allocation.allocate("wood")
+        self.assertEqual(self.allocated(), first)
+
+    def test_withdrawn_listings_are_reset_and_only_their_material_rebuilt(self):
+        supplier = self.surplus("Bristol", "50")
+        requester = self.demand("Bristol", "50")
+        allocation.allocate_all(["wood"])
+        self.assertEqual(metrics.summary()["total_volume"], Decimal("50.00"))
+        other = DivertedVolume.objects.create(
+            material_type="plastic", month=timezone.localdate().replace(day=1), location="Leeds",
+            match_count=1, volume=Decimal("5"),
+        )
+
+        DemandListing.objects.filter(pk=requester.pk).update(approved=False)
+        result = allocation.allocate_all(["wood"])["wood"]
+
+        self.assertEqual(result["reset"], 1)
+        self.assertEqual(Match.objects.get(surplus=supplier).allocated_quantity, Decimal("0.00"))
+        self.assertEqual(DivertedVolume.objects.get(material_type="wood").volume, Decimal("0.00"))
+        self.assertTrue(DivertedVolume.objects.filter(pk=other.pk).exists())
+
+    def test_existing_cross_location_matches_do_not_take_local_volume(self):
+        supplier = self.surplus("Bristol", "50")
+        other = self.surplus("Leeds", "50")
+        near = self.demand("Bristol", "50")
+        far = self.demand("Leeds", "50")
+        Match.objects.create(surplus=supplier, demand=far)
+
+        result = allocation.allocate_all(["wood"])["wood"]
+
+        self.assertEqual(self.allocated(), {(supplier.pk, near.pk): Decimal("50.00"), (other.pk, far.pk): Decimal("50.00")})
+        self.assertEqual(result["cross_location"], Decimal("0.00"))
+        self.assertEqual(Match.objects.get(surplus=supplier, demand=far).allocated_quantity, Decimal("0.00"))
+
+    def test_sweeps_agree(self):
+        if allocation.np is None:
+            self.skipTest("NumPy is not installed")
+        supply, demand = [5, 0, 12, 3], [4, 4, 0, 9, 20]
+        self.assertEqual(list(allocation._sweep_numpy(supply, demand)), allocation._sweep_python(supply, demand))
+
+
+class SimilarityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("similar", "similar@example.org", "pw")
+        cls.oak = cls.surplus("wood", "Offcut oak boards and oak beams from our joinery")
+        cls.pallets = cls.surplus("wood", "Broken pallets, softwood only")
+        cls.steel = cls.surplus("metal", "Oak-coloured steel offcuts")
+        cls.workshop = cls.demand("wood", "Furniture workshop building tables from oak offcuts")
+        cls.firewood = cls.demand("wood", "Pallet wood for a community kiln")
+        cls.hidden = cls.demand("wood", "Oak offcuts for carving", approved=False)
+
+    @classmethod
+    def surplus(cls, material, description, approved=True):
+        return SurplusListing.objects.create(
+            user=cls.user, company="Supplier", location="Leeds", material_type=material, description=description,
+            monthly_volume=Decimal("10"), contact_email="s@example.org", approved=approved,
+        )
+
+    @classmethod
+    def demand(cls, material, intended_use, approved=True):
+        return DemandListing.objects.create(
+            user=cls.user, location="Leeds", material_wanted=material, intended_use=intended_use,
+            quantity_needed=Decimal("5"), approved=approved,
+        )
+
+    def setUp(self):
+        similarity.invalidate()
+
+    def ranked(self, listing):
+        return [pk for pk, _ in similarity.suggestions(listing)]
+
+    def test_ranks_within_the_material_and_skips_unapproved(self):
+        self.assertEqual(self.ranked(self.oak), [self.workshop.pk])
+        self.assertEqual(self.ranked(self.pallets), [self.firewood.pk])
+        self.assertEqual(self.ranked(self.workshop), [self.oak.pk])
+        self.assertEqual(self.ranked(self.steel), [])
+
+    def test_saves_update_the_index_in_place(self):
+        index = similarity.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pallets.description = "Oak offcuts from a furniture workshop"
+            self.pallets.save()
+            self.hidden.approved = True
+            self.hidden.save()
+            self.firewood.delete()
+        self.assertIs(similarity.get(), index)
+        self.assertEqual(self.ranked(self.pallets)[0], self.workshop.pk)
+        self.assertIn(self.oak.pk, self.ranked(self.hidden))
+        self.assertNotIn(self.firewood.pk, [pk for pk, _ in similarity.suggestions(self.pallets, limit=10)])
+
+        fresh = similarity.load("fresh")
+        for side, pk in index.material:
+            self.assertEqual(index.document(side, pk), fresh.document(side, pk))
+        self.assertEqual(set(index.material), set(fresh.material))
+
+    def test_scipy_and_inverted_index_agree(self):
+        if similarity.sparse is None:
+            self.skipTest("SciPy is not installed")
+        listings = [self.oak, self.pallets]
+        with_scipy = similarity.rank(similarity.SURPLUS, [listing.pk for listing in listings])
+        sparse, similarity.sparse = similarity.sparse, None
+        try:
+            similarity.invalidate()
+            without = similarity.rank(similarity.SURPLUS, [listing.pk for listing in listings])
+        finally:
+            similarity.sparse = sparse
+            similarity.invalidate()
+        self.assertEqual(with_scipy.keys(), without.keys())
+        for pk, pairs in with_scipy.items():
+            self.assertEqual([other for other, _ in pairs], [other for other, _ in without[pk]])
+            for (_, a), (_, b) in zip(pairs, without[pk]):
+                self.assertAlmostEqual(a, b)
+
+    @override_settings(STORAGES=TEST_STORAGES, PERFORMANCE_INSTRUMENTATION=False)
+    def test_list_view_shows_suggestions(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("directory:surplus_list"))
+        oak = next(listing for listing in response.context["listings"] if listing.pk == self.oak.pk)
+        self.assertEqual([demand for demand, _ in oak.similar], [self.workshop])
+        self.assertContains(response, reverse("directory:suggest_match", args=[self.oak.pk, self.workshop.pk]))
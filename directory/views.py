@@ -3,20 +3,28 @@ from django.contrib.auth.decorators import login_required
 from django.db.models import Q
 from .models import SurplusListing, DemandListing, Match
 from .forms import SurplusListingForm, DemandListingForm
+from .search import search
+from . import similarity
 from django.core.mail import send_mail
 from django.conf import settings
 
+from callsoso.cache import get_or_compute
+
 # ===============================
 # Directory Homepage
 # ===============================
+def _listing_counts():
+    return SurplusListing.objects.count(), DemandListing.objects.count()
+
+
 @login_required
 def index(request):
     """
     Directory landing page.
     Shows counts for Material & Edible Loops.
     """
-    surplus_count = SurplusListing.objects.count()
-    demand_count = DemandListing.objects.count()
+    # Two full-table counts; shared by every worker for a minute.
+    surplus_count, demand_count = get_or_compute('directory:index-counts', _listing_counts, timeout=60)
     # Optionally preview latest items
     latest_surpluses = SurplusListing.objects.order_by('-created_on')[:5]
     latest_demands = DemandListing.objects.order_by('-created_on')[:5]
@@ -44,17 +52,16 @@ def surplus_list(request):
     listings = SurplusListing.objects.filter(user=request.user)
 
     if query:
-        listings = listings.filter(
-            Q(company__icontains=query) |
-            Q(material_type__icontains=query)
-        )
+        # Typo-tolerant, ranked by similarity
+        listings = search(listings, query)
     if material_type:
         listings = listings.filter(material_type=material_type)
     if location:
         listings = listings.filter(location__icontains=location)
 
     return render(request, 'directory/surplus_list.html', {
-        'surpluses': listings,
+        # Each approved listing with its closest requests by description
+        'listings': similarity.attach(listings),
         'query': query,
         'material_type': material_type,
         'location': location,
@@ -72,7 +79,7 @@ def surplus_create(request):
             listing = form.save(commit=False)
             listing.user = request.user
             listing.save()
-            return redirect('surplus_list')
+            return redirect('directory:surplus_list')
     else:
         form = SurplusListingForm()
     return render(request, 'directory/surplus_form.html', {'form': form})
@@ -93,17 +100,15 @@ def demand_list(request):
     listings = DemandListing.objects.filter(user=request.user)
 
     if query:
-        listings = listings.filter(
-            Q(org__icontains=query) |
-            Q(material_wanted__icontains=query)
-        )
+        listings = search(listings, query)
     if material_wanted:
         listings = listings.filter(material_wanted=material_wanted)
     if location:
         listings = listings.filter(location__icontains=location)
 
     return render(request, 'directory/demand_list.html', {
-        'demands': listings,
+        # Each approved listing with its closest surpluses by description
+        'listings': similarity.attach(listings),
         'query': query,
         'material_wanted': material_wanted,
         'location': location,
@@ -121,7 +126,7 @@ def demand_create(request):
             listing = form.save(commit=False)
             listing.user = request.user
             listing.save()
-            return redirect('demand_list')
+            return redirect('directory:demand_list')
     else:
         form = DemandListingForm()
     return render(request, 'directory/demand_form.html', {'form': form})
@@ -138,17 +143,20 @@ def suggest_match(request, surplus_id, demand_id):
     """
     surplus = get_object_or_404(SurplusListing, pk=surplus_id)
     demand = get_object_or_404(DemandListing, pk=demand_id)
-    Match.objects.create(surplus=surplus, demand=demand, suggested_by=request.user)
-
-    # Send notification emails (silent fail)
-    send_mail(
-        subject="Call Soso: Potential Match Found!",
-        message=f"A match has been suggested between surplus from {surplus.company} and demand from {demand.org}.",
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[surplus.contact_email, demand.user.email],
-        fail_silently=True,
+    match, created = Match.objects.get_or_create(
+        surplus=surplus, demand=demand, defaults={'suggested_by': request.user}
     )
-    return redirect('match_list')
+
+    # Send notification emails (silent fail), once per pair
+    if created:
+        send_mail(
+            subject="Call Soso: Potential Match Found!",
+            message=f"A match has been suggested between surplus from {surplus.company} and demand from {demand.organisation or 'a requester'}.",
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[surplus.contact_email, demand.user.email],
+            fail_silently=True,
+        )
+    return redirect('directory:match_list')
 
 
 @login_required
@@ -157,10 +165,9 @@ def match_list(request):
     List matches visible to the user.
     Admins see all matches.
     """
-    if request.user.is_staff:
-        matches = Match.objects.all()
-    else:
-        matches = Match.objects.filter(
+    matches = Match.objects.select_related('surplus', 'demand', 'suggested_by')
+    if not request.user.is_staff:
+        matches = matches.filter(
             Q(surplus__user=request.user) | Q(demand__user=request.user)
         )
     return render(request, 'directory/match_list.html', {'matches': matches})
@@ -0,0 +1,76 @@
+"""
+gunicorn configuration for Call Soso (picked up automatically from the
+project root; start with plain ``gunicorn``).
+
+Everything is tunable from the environment:
+
+    GUNICORN_WORKER_CLASS   sync (default) | gthread | uvicorn
+    WEB_CONCURRENCY         worker processes (default 2 * CPUs + 1)
+    GUNICORN_THREADS        threads per gthread worker (default 4)
+    GUNICORN_MAX_REQUESTS   recycle a worker after this many requests (0 = never)
+    GUNICORN_MAX_REQUESTS_JITTER
+    GUNICORN_TIMEOUT, GUNICORN_KEEPALIVE, PORT
+
+The app is preloaded and warmed (URL resolvers, templates, bundle manifest)
+in the master before forking, so fresh workers - after a deploy or a
+max_requests recycle - serve their first request without that cost.
+"""
+
+import multiprocessing
+import os
+
+WORKER_CLASSES = {
+    "sync": "sync",
+    "gthread": "gthread",
+    "uvicorn": "uvicorn.workers.UvicornWorker",
+}
+
+_worker = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+if _worker not in WORKER_CLASSES:
+    raise RuntimeError(f"GUNICORN_WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}, not {_worker!r}")
+
+worker_class = WORKER_CLASSES[_worker]
+wsgi_app = "callsoso.asgi:application" if _worker == "uvicorn" else "callsoso.wsgi:application"
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4")) if _worker == "gthread" else 1
+
+# Load Django once in the master; workers are forked with it in memory.
+preload_app = True
+
+# Recycle workers to bound memory growth; the jitter keeps them from all
+# restarting at the same moment.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", str(max_requests // 10)))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = timeout
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Heartbeat files on tmpfs: a slow or overlay disk cannot stall workers.
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported, before fork.
+    if server.cfg.preload_app:
+        from callsoso.warmup import warm_up
+        warm_up()
+
+
+def post_worker_init(worker):
+    # Without preloading each worker has to warm itself.
+    if not worker.cfg.preload_app:
+        from callsoso.warmup import warm_up
+        warm_up()
+
+
+def worker_exit(server, worker):
+    # Write founders-list signups still buffered in this worker.
+    from website.founders import flush
+    flush()
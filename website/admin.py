@@ -1,4 +1,11 @@
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import StreamingHttpResponse
+from django.urls import path
+
+from callsoso.pagination import LargeTableAdmin
+
+from . import founders
 from .models import (
     Article,
     Resource,
@@ -9,7 +16,7 @@ from .models import (
     MagazineIssue, 
     PopularArticle
 )
- 
+
 
 # ===========================
 # CATEGORY
@@ -25,10 +32,10 @@ class CategoryAdmin(admin.ModelAdmin):
 # MAGAZINE ISSUE
 # ===========================
 @admin.register(MagazineIssue)
-class MagazineIssueAdmin(admin.ModelAdmin):
+class MagazineIssueAdmin(LargeTableAdmin):
     list_display = ("title", "published_date", "is_featured", "is_published")
     list_filter = ("is_featured", "is_published", "published_date", "categories")
-    search_fields = ("title", "description")
+    search_fields = ("^title", "=slug")
     filter_horizontal = ("categories",)
     prepopulated_fields = {"slug": ("title",)}
     date_hierarchy = "published_date"
@@ -51,9 +58,9 @@ class MagazineIssueAdmin(admin.ModelAdmin):
 # POPULAR ARTICLES
 # ===========================
 @admin.register(PopularArticle)
-class PopularArticleAdmin(admin.ModelAdmin):
+class PopularArticleAdmin(LargeTableAdmin):
     list_display = ("title", "date")
-    search_fields = ("title",)
+    search_fields = ("^title",)
     ordering = ("-date",)
 
 
@@ -61,7 +68,7 @@ class PopularArticleAdmin(admin.ModelAdmin):
 # ARTICLE / NEWS
 # ===========================
 @admin.register(Article)
-class ArticleAdmin(admin.ModelAdmin):
+class ArticleAdmin(LargeTableAdmin):
     list_display = (
         "title",
         "published_date",
@@ -75,13 +82,12 @@ class ArticleAdmin(admin.ModelAdmin):
         "categories",
     )
     search_fields = (
-        "title",
-        "body",
-        "excerpt",
-        "summary",
+        "^title",
+        "=slug",
     )
     prepopulated_fields = {"slug": ("title",)}
     filter_horizontal = ("categories",)
+    raw_id_fields = ("author",)
     date_hierarchy = "published_date"
     ordering = ("-published_date",)
 
@@ -109,7 +115,7 @@ class ArticleAdmin(admin.ModelAdmin):
 # RESOURCE (Knowledge Center)
 # ===========================
 @admin.register(Resource)
-class ResourceAdmin(admin.ModelAdmin):
+class ResourceAdmin(LargeTableAdmin):
     list_display = (
         "title",
         "resource_type",
@@ -123,10 +129,7 @@ class ResourceAdmin(admin.ModelAdmin):
         "is_featured",
         "categories",
     )
-    search_fields = (
-        "title",
-        "description",
-    )
+    search_fields = ("^title",)
     filter_horizontal = ("categories",)
     ordering = ("-created_at",)
 
@@ -160,10 +163,11 @@ class ResourceAdmin(admin.ModelAdmin):
 # COLLABORATION
 # ===========================
 @admin.register(Collaboration)
-class CollaborationAdmin(admin.ModelAdmin):
+class CollaborationAdmin(LargeTableAdmin):
     list_display = ("name", "organisation", "growth_stage", "is_active", "planted_date")
     list_filter = ("growth_stage", "is_active")
-    search_fields = ("name", "organisation", "description")
+    search_fields = ("^name", "^organisation", "=contact_email")
+    raw_id_fields = ("user",)
     ordering = ("-planted_date",)
 
 
@@ -171,10 +175,12 @@ class CollaborationAdmin(admin.ModelAdmin):
 # CONTRIBUTION
 # ===========================
 @admin.register(Contribution)
-class ContributionAdmin(admin.ModelAdmin):
+class ContributionAdmin(LargeTableAdmin):
     list_display = ("contributor_name", "source", "amount", "date")
+    list_select_related = ("user",)  # __str__ falls back to the username
     list_filter = ("source", "date")
-    search_fields = ("contributor_name", "email", "message")
+    search_fields = ("^contributor_name", "=email")
+    raw_id_fields = ("user",)
     ordering = ("-date",)
 
 
@@ -182,7 +188,24 @@ class ContributionAdmin(admin.ModelAdmin):
 # FOUNDERS LIST
 # ===========================
 @admin.register(FoundersList)
-class FoundersListAdmin(admin.ModelAdmin):
+class FoundersListAdmin(LargeTableAdmin):
     list_display = ("email", "joined")
-    search_fields = ("email",)
+    search_fields = ("^email",)
     ordering = ("-joined",)
+    change_list_template = "admin/website/founderslist/change_list.html"
+
+    def get_urls(self):
+        export = path(
+            "export.csv",
+            self.admin_site.admin_view(self.export_csv),
+            name="website_founderslist_export",
+        )
+        return [export, *super().get_urls()]
+
+    def export_csv(self, request):
+        """Stream the whole list as CSV without loading it into memory."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        response = StreamingHttpResponse(founders.export_rows(), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = 'attachment; filename="founders-list.csv"'
+        return response
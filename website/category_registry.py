@@ -0,0 +1,132 @@
+"""
+Process-local Category registry.
+
+Categories are a handful of rows read by nearly every public page
+(filters, sidebars, the insights buckets, the categories page). Each
+worker keeps them in memory together with published-item counts, loaded
+in one query, and reuses them until the version stamp in the cache
+changes.
+
+The stamp is bumped (``bump_version``) after any transaction that saves
+or deletes a category, changes an item's category links, or saves or
+deletes an article, issue or resource (their published flags move the
+counts). Workers read the stamp through the default cache, whose L1
+keeps it for ``L1_TIMEOUT`` seconds, so another worker's change shows
+up within that long; the worker that made it reloads immediately.
+"""
+
+import threading
+from collections import namedtuple
+
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from callsoso.cache import bump, version_stamp
+
+from .models import Article, Category, MagazineIssue, Resource
+
+VERSION_KEY = "website:category-version"
+
+CategoryEntry = namedtuple("CategoryEntry", "id slug name article_count issue_count resource_count")
+
+# (model, published flag) per count column.
+COUNTED = {
+    "article_count": (Article, "is_published"),
+    "issue_count": (MagazineIssue, "is_published"),
+    "resource_count": (Resource, "published"),
+}
+
+
+class Registry:
+    def __init__(self, version, entries):
+        self.version = version
+        self.entries = tuple(entries)  # ordered by name
+        self.by_id = {entry.id: entry for entry in self.entries}
+        self.by_slug = {entry.slug: entry for entry in self.entries}
+
+    def names(self, ids):
+        return [self.by_id[pk].name for pk in ids if pk in self.by_id]
+
+
+_registry = None
+_lock = threading.Lock()
+
+
+def _published_count(model, flag):
+    through = model.categories.through
+    item = model._meta.model_name
+    links = (
+        through.objects.filter(category=OuterRef("pk"), **{f"{item}__{flag}": True})
+        .order_by()
+        .values("category")
+        .annotate(n=Count("*"))
+        .values("n")
+    )
+    return Coalesce(Subquery(links, output_field=IntegerField()), Value(0))
+
+
+def load():
+    """Every category with its published-item counts, in one query."""
+    rows = Category.objects.annotate(
+        **{column: _published_count(model, flag) for column, (model, flag) in COUNTED.items()}
+    ).order_by("name", "id")
+    return [
+        CategoryEntry(row.id, row.slug, row.name, row.article_count, row.issue_count, row.resource_count)
+        for row in rows
+    ]
+
+
+def current_version():
+    return version_stamp(VERSION_KEY)
+
+
+def get():
+    """The registry, reloaded if the shared version has moved."""
+    global _registry
+    version = current_version()
+    registry = _registry
+    if registry is not None and registry.version == version:
+        return registry
+    with _lock:
+        if _registry is None or _registry.version != version:
+            _registry = Registry(version, load())
+        return _registry
+
+
+def invalidate_local():
+    """Drop this worker's copy, so its next read reloads."""
+    global _registry
+    _registry = None
+
+
+def bump_version():
+    """Make every worker reload on its next read; call after the change commits."""
+    invalidate_local()
+    bump(VERSION_KEY)
+
+
+def attach(items, queryset=None):
+    """
+    Set ``category_ids`` and ``category_names`` on each article, issue or
+    resource in ``items``, reading only the link table. Pass the
+    ``queryset`` the items came from to select the links with a subquery
+    instead of a list of ids.
+    """
+    items = list(items)
+    if not items:
+        return items
+    model = type(items[0])
+    item = model._meta.model_name
+    selected = [obj.pk for obj in items] if queryset is None else queryset.order_by().values("pk")
+    links = {}
+    for item_id, category_id in (
+        model.categories.through.objects.filter(**{f"{item}__in": selected})
+        .order_by("id")
+        .values_list(f"{item}_id", "category_id")
+    ):
+        links.setdefault(item_id, []).append(category_id)
+    registry = get()
+    for obj in items:
+        obj.category_ids = [pk for pk in links.get(obj.pk, []) if pk in registry.by_id]
+        obj.category_names = registry.names(obj.category_ids)
+    return items
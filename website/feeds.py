@@ -0,0 +1,79 @@
+"""
+RSS and Atom feeds for news and magazine issues, written to files by
+``website.syndication`` instead of being rendered per request.
+"""
+
+from datetime import datetime, time
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.urls import reverse_lazy
+from django.utils import timezone
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+from .models import Article, MagazineIssue
+
+
+def _as_datetime(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class LatestNewsFeed(Feed):
+    title = "Call Soso – News"
+    link = reverse_lazy("website:news")
+    description = "Latest stories from the Call Soso circular economy community."
+
+    def items(self):
+        return Article.objects.filter(is_published=True).order_by("-published_date", "-created_at")[:settings.FEED_ITEMS]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.excerpt or item.summary or Truncator(strip_tags(item.body or "")).words(60)
+
+    def item_pubdate(self, item):
+        return _as_datetime(item.published_date)
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+
+class LatestNewsAtomFeed(LatestNewsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestNewsFeed.description
+
+
+class MagazineIssuesFeed(Feed):
+    title = "Call Soso – Magazine"
+    link = reverse_lazy("website:magazine")
+    description = "New issues of the Call Soso magazine."
+
+    def items(self):
+        return MagazineIssue.objects.filter(is_published=True).order_by("-published_date", "-created_at")[:settings.FEED_ITEMS]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.description or ""
+
+    def item_pubdate(self, item):
+        return _as_datetime(item.published_date)
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+
+class MagazineIssuesAtomFeed(MagazineIssuesFeed):
+    feed_type = Atom1Feed
+    subtitle = MagazineIssuesFeed.description
+
+
+# File name under feeds/ -> feed class, grouped by the content they list.
+FEEDS = {
+    "articles": {"news.rss": LatestNewsFeed, "news.atom": LatestNewsAtomFeed},
+    "magazine": {"magazine.rss": MagazineIssuesFeed, "magazine.atom": MagazineIssuesAtomFeed},
+}
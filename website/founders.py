@@ -0,0 +1,122 @@
+"""
+Founders-list signup ingestion.
+
+The homepage form calls ``add_signup``, which normalises and validates the
+address and puts it in a per-process buffer instead of touching the
+database. The buffer is written with a single
+``bulk_create(ignore_conflicts=True)`` (duplicates are dropped by the
+unique index) when it reaches ``FOUNDERS_BUFFER_SIZE``, when
+``FOUNDERS_FLUSH_SECONDS`` have passed since the first buffered signup,
+and when the process exits (gunicorn's ``worker_exit`` hook and atexit).
+A process killed outright loses its buffer, which the small defaults
+bound to about a second of signups.
+"""
+
+import atexit
+import csv
+import logging
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connections
+
+from .models import FoundersList
+
+logger = logging.getLogger(__name__)
+
+_buffer = {}  # normalised email -> None; dict keeps arrival order
+_lock = threading.Lock()
+_timer = None
+
+
+# ===========================
+# INGESTION
+# ===========================
+def normalize_email(raw):
+    """Lower-cased, trimmed address, or None if it is not a valid e-mail."""
+    email = (raw or "").strip().lower()
+    if len(email) > FoundersList._meta.get_field("email").max_length:
+        return None
+    try:
+        validate_email(email)
+    except ValidationError:
+        return None
+    return email
+
+
+def add_signup(raw_email):
+    """Buffer a signup; returns False if the address is invalid."""
+    global _timer
+    email = normalize_email(raw_email)
+    if email is None:
+        return False
+    with _lock:
+        _buffer[email] = None
+        full = len(_buffer) >= settings.FOUNDERS_BUFFER_SIZE
+        if not full and _timer is None:
+            _timer = threading.Timer(settings.FOUNDERS_FLUSH_SECONDS, _flush_from_timer)
+            _timer.daemon = True
+            _timer.start()
+    if full:
+        flush()
+    return True
+
+
+def flush():
+    """Write every buffered signup; returns how many addresses were sent."""
+    global _timer
+    with _lock:
+        emails = list(_buffer)
+        _buffer.clear()
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+    if not emails:
+        return 0
+    try:
+        FoundersList.objects.bulk_create(
+            [FoundersList(email=email) for email in emails],
+            ignore_conflicts=True,
+        )
+    except Exception:
+        logger.exception("Could not store %d founders-list signups; keeping them buffered", len(emails))
+        with _lock:
+            for email in emails:
+                _buffer.setdefault(email, None)
+        return 0
+    return len(emails)
+
+
+def _flush_from_timer():
+    try:
+        flush()
+    finally:
+        # The timer thread has its own connection; don't leave it open.
+        connections.close_all()
+
+
+atexit.register(flush)
+
+
+# ===========================
+# EXPORT
+# ===========================
+class _Echo:
+    """File-like object whose write() hands the row back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(chunk_size=2000):
+    """CSV lines for the whole list, read from the database in chunks."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(["email", "joined"])
+    rows = FoundersList.objects.order_by("pk").values_list("email", "joined").iterator(chunk_size=chunk_size)
+    for email, joined in rows:
+        # Keep spreadsheet apps from evaluating addresses like "=cmd@x.org".
+        if email.startswith(("=", "+", "-", "@")):
+            email = "'" + email
+        yield writer.writerow([email, joined.isoformat()])
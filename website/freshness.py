@@ -0,0 +1,147 @@
+"""
+Freshness helpers for conditional GET on the public content pages.
+
+Each content view gets an ETag function that derives freshness from the
+relevant rows with a single aggregate query, so an unchanged page answers
+304 before any template rendering happens.
+
+There is no Last-Modified: the newest ``updated_at`` does not move when a
+row is deleted, a category link changes or the sidebar changes, so an
+If-Modified-Since check would answer 304 for a page that has changed.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import Count, Max, Q
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from . import category_registry
+from .models import Article, MagazineIssue, PopularArticle
+
+
+def _is_cacheable(request):
+    # Pending flash messages are rendered once; never 304 them away.
+    return request.method in ("GET", "HEAD") and not len(messages.get_messages(request))
+
+
+def _fingerprint(request, *parts):
+    # The header changes with the auth state, so it is part of the tag.
+    parts = (request.user.is_authenticated,) + parts
+    return hashlib.md5("|".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def _cacheable_only(compute):
+    """Skip the freshness query for requests that must not be answered 304."""
+    @wraps(compute)
+    def wrapped(request, *args, **kwargs):
+        return compute(request, *args, **kwargs) if _is_cacheable(request) else None
+    return wrapped
+
+
+# ---------------------------
+# Article Detail
+# ---------------------------
+@_cacheable_only
+def _article_detail_freshness(request, slug):
+    # The page shows the article plus related articles sharing a category.
+    stats = Article.objects.filter(is_published=True).filter(
+        Q(slug=slug) | Q(categories__article__slug=slug)
+    ).aggregate(
+        updated=Max("updated_at"),
+        total=Count("id", distinct=True),
+        found=Count("id", filter=Q(slug=slug)),
+    )
+    if not stats["found"]:
+        return None
+    # Category links (and so the related list) change without touching updated_at.
+    stats["categories"] = category_registry.current_version()
+    return stats
+
+
+def article_detail_etag(request, slug):
+    stats = _article_detail_freshness(request, slug)
+    return stats and _fingerprint(
+        request, "article", slug, stats["updated"], stats["total"], stats["categories"]
+    )
+
+
+# ---------------------------
+# News
+# ---------------------------
+@_cacheable_only
+def _news_freshness(request):
+    stats = Article.objects.filter(is_published=True).aggregate(
+        updated=Max("updated_at"),
+        total=Count("id"),
+    )
+    # Category filters and links change without touching updated_at.
+    stats["categories"] = category_registry.current_version()
+    return stats
+
+
+def news_etag(request):
+    stats = _news_freshness(request)
+    return stats and _fingerprint(request, "news", stats["updated"], stats["total"], stats["categories"])
+
+
+# ---------------------------
+# Magazine
+# ---------------------------
+@_cacheable_only
+def _magazine_freshness(request):
+    query = request.GET.get("q", "").strip()
+    category_slug = request.GET.get("category", "").strip()
+
+    # Same filters as the view (views.magazine_issues).
+    issues = MagazineIssue.objects.filter(is_published=True).search(query)
+    if category_slug:
+        category = category_registry.get().by_slug.get(category_slug)
+        issues = issues.in_category(category.id) if category else issues.none()
+    stats = issues.aggregate(
+        updated=Max("updated_at"),
+        total=Count("id"),
+    )
+    # The sidebar lists popular articles, which only carry a date.
+    sidebar = PopularArticle.objects.aggregate(latest=Max("id"), total=Count("id"))
+    stats["sidebar"] = (sidebar["latest"], sidebar["total"])
+    stats["categories"] = category_registry.current_version()
+    return stats
+
+
+def magazine_etag(request):
+    stats = _magazine_freshness(request)
+    return stats and _fingerprint(
+        request, "magazine", stats["updated"], stats["total"], stats["sidebar"], stats["categories"]
+    )
+
+
+# ---------------------------
+# Cache-Control
+# ---------------------------
+def content_cache_control(view):
+    """
+    Emit Cache-Control headers a reverse proxy or CDN can honour.
+
+    Anonymous responses are public with a short browser max-age and a longer
+    shared-cache s-maxage; signed-in responses stay private and revalidate.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.method not in ("GET", "HEAD") or response.status_code not in (200, 304):
+            return response
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+        else:
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=settings.CONTENT_CACHE_MAX_AGE,
+                s_maxage=settings.CONTENT_CACHE_S_MAXAGE,
+            )
+        patch_vary_headers(response, ("Cookie",))
+        return response
+    return wrapped
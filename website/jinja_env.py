@@ -0,0 +1,44 @@
+"""
+Jinja2 environment for the public website templates.
+
+Only used when ``settings.WEBSITE_TEMPLATE_ENGINE`` is ``"jinja2"`` (or by
+``manage.py bench_templates``). The ports live in ``website/jinja2/`` and
+get the same helpers the Django templates use: ``static``, ``url``, the
+CSS bundle tag and Django's own filters, so output stays identical.
+"""
+
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import dateformat, timezone
+from jinja2 import Environment
+
+from .templatetags.assets import stylesheet_bundle
+
+
+def url(viewname, *args, **kwargs):
+    return reverse(viewname, args=args or None, kwargs=kwargs or None)
+
+
+def now(format_string):
+    return dateformat.format(timezone.localtime(), format_string)
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({
+        "static": static,
+        "url": url,
+        "now": now,
+        "stylesheet_bundle": stylesheet_bundle,
+    })
+    env.filters.update({
+        "date": defaultfilters.date,
+        "truncatewords": defaultfilters.truncatewords,
+        "truncatechars": defaultfilters.truncatechars,
+        "striptags": defaultfilters.striptags,
+        "slugify": defaultfilters.slugify,
+        "urlencode": defaultfilters.urlencode,
+        "linebreaks": defaultfilters.linebreaks_filter,
+    })
+    return env
@@ -0,0 +1,249 @@
+import json
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from itertools import product
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.shortcuts import resolve_url
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, reverse
+
+from callsoso.warmup import sample_kwargs
+from directory import urls as directory_urls
+from directory.models import DemandListing, Match, SurplusListing
+from directory.seeding import seed_directory
+from website import urls as website_urls
+from website.models import Article, MagazineIssue
+from website.seeding import seed_community, seed_content, seed_users
+
+# (namespace, patterns) for every URL the benchmark drives.
+URLCONFS = (
+    (None, website_urls.auth_urlpatterns),
+    ("website", website_urls.urlpatterns),
+    ("directory", directory_urls.urlpatterns),
+)
+
+
+def _body_size(response):
+    """Bytes in the body; reads (and closes) streaming responses such as files and CSV exports."""
+    if not response.streaming:
+        return len(response.content)
+    try:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    finally:
+        response.close()
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset and drive every website and directory URL "
+        "through the test client, reporting latency, query counts and memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--articles", type=int, default=500)
+        parser.add_argument("--categories", type=int, default=12)
+        parser.add_argument("--resources", type=int, default=200)
+        parser.add_argument("--issues", type=int, default=120)
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--listings", type=int, default=500, help="Surplus and demand listings each.")
+        parser.add_argument("--matches", type=int, default=300)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded rows.")
+
+    def handle(self, *args, **options):
+        # Files built from the seeded rows (sitemaps, feeds, pre-rendered
+        # pages) go to a scratch directory; the rows are rolled back.
+        scratch = tempfile.TemporaryDirectory(prefix="callsoso-bench-")
+        test_settings = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+            PERFORMANCE_INSTRUMENTATION=False,
+            SYNDICATION_ROOT=Path(scratch.name) / "syndication",
+            PRERENDER_ROOT=Path(scratch.name) / "prerendered",
+        )
+        with scratch, test_settings, transaction.atomic():
+            dataset = self.seed(options)
+            self.stdout.write(f"Seeded {dataset}")
+            results = [self.bench_url(*target, options["iterations"]) for target in self.targets()]
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "django": django.get_version(),
+                "python": platform.python_version(),
+                "database": connection.vendor,
+                "iterations": options["iterations"],
+                "dataset": dataset,
+            },
+            "results": results,
+        }
+        self.print_table(results)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+    # ---------------------------
+    # Dataset
+    # ---------------------------
+    def seed(self, options):
+        self.staff = User.objects.create(username="bench-staff", is_staff=True, is_superuser=True)
+        users = seed_users(options["users"])
+        dataset = seed_content(
+            articles=options["articles"],
+            categories=options["categories"],
+            resources=options["resources"],
+            issues=options["issues"],
+        )
+        dataset["users"] = len(users) + 1
+        dataset.update(seed_community(users))
+        dataset.update(seed_directory(
+            [self.staff, *users],
+            surplus=options["listings"],
+            demand=options["listings"],
+            matches=options["matches"],
+        ))
+        return dataset
+
+    # ---------------------------
+    # URLs
+    # ---------------------------
+    def targets(self):
+        """
+        Yield ``(view_name, path_factory)`` for every pattern. Parametrised
+        routes get seeded objects where ``route_kwargs`` knows them and
+        placeholder values otherwise; suggest_match needs a fresh pair per call.
+        """
+        known = self.route_kwargs()
+        for namespace, patterns in URLCONFS:
+            for pattern in patterns:
+                if not isinstance(pattern, URLPattern) or not pattern.name:
+                    continue
+                view_name = f"{namespace}:{pattern.name}" if namespace else pattern.name
+                if pattern.name == "suggest_match":
+                    pairs = self.unmatched_pairs()
+                    yield view_name, lambda view_name=view_name: reverse(view_name, args=next(pairs))
+                    continue
+                kwargs = known.get(view_name, sample_kwargs(pattern))
+                path = reverse(view_name, kwargs=kwargs or None)
+                yield view_name, lambda path=path: path
+
+    def route_kwargs(self):
+        """
+        ``reverse()`` kwargs naming seeded objects, per view name. With
+        nothing seeded (``--articles 0``) a route keeps its placeholders.
+        """
+        known = {
+            "website:feed": {"name": "news.rss"},
+            "website:autocomplete": {"source": "articles"},
+        }
+        article = Article.objects.filter(is_published=True).order_by("-published_date").first()
+        if article is not None:
+            known["website:article_detail"] = {"slug": article.slug}
+            known["website:sitemap_section"] = {"section": f"articles-{article.pk // settings.SITEMAP_SHARD_SIZE}"}
+        issue = MagazineIssue.objects.filter(is_published=True).order_by("-published_date").first()
+        if issue is not None:
+            known["website:magazine_detail"] = {"slug": issue.slug}
+        return known
+
+    def unmatched_pairs(self):
+        matched = set(Match.objects.values_list("surplus_id", "demand_id"))
+        surplus_ids = SurplusListing.objects.values_list("pk", flat=True)
+        demand_ids = DemandListing.objects.values_list("pk", flat=True)
+        return (pair for pair in product(surplus_ids, demand_ids) if pair not in matched)
+
+    def client_for(self, view_name, path):
+        """
+        Anonymous client, unless the view sends anonymous users to the
+        login page; logout gets a throwaway session on every call.
+        """
+        client = Client(raise_request_exception=False)
+        if view_name == "logout":
+            client.force_login(self.staff)
+            return client
+        response = client.get(path, secure=True)
+        if response.status_code == 302 and response.url.startswith(resolve_url(settings.LOGIN_URL)):
+            client.force_login(self.staff)
+        return client
+
+    # ---------------------------
+    # Measurement
+    # ---------------------------
+    def bench_url(self, view_name, make_path, iterations):
+        path = make_path()
+        client = self.client_for(view_name, path)
+        authenticated = "_auth_user_id" in client.session
+        _body_size(client.get(path, secure=True))  # warm up
+
+        samples, queries, status = [], [], None
+        for _ in range(iterations):
+            if view_name == "logout":
+                client.force_login(self.staff)
+            path = make_path()
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                response = client.get(path, secure=True)
+                size = _body_size(response)
+                samples.append((time.perf_counter() - start) * 1000)
+            queries.append(counter.count)
+            status = response.status_code
+
+        if view_name == "logout":
+            client.force_login(self.staff)
+        tracemalloc.start()
+        _body_size(client.get(make_path(), secure=True))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            "view": view_name,
+            "path": path,
+            "authenticated": authenticated,
+            "status": status,
+            "p50_ms": round(statistics.median(samples), 2),
+            "p95_ms": round(_percentile(samples, 95), 2),
+            "max_ms": round(max(samples), 2),
+            "queries": max(queries),
+            "peak_memory_kb": round(peak / 1024, 1),
+            "response_bytes": size,
+        }
+
+    def print_table(self, results):
+        header = f"{'view':<28}{'status':>7}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'peak KB':>10}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for row in results:
+            line = (
+                f"{row['view']:<28}{row['status']:>7}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                f"{row['queries']:>9}{row['peak_memory_kb']:>10.1f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row["status"] >= 500 else line)
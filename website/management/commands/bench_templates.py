@@ -0,0 +1,88 @@
+import statistics
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.query import QuerySet
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from website import views
+from website.seeding import seed_content
+
+PAGES = (
+    ("news", "/news/"),
+    ("insights", "/insights/"),
+    ("knowledge_center", "/knowledge/"),
+    ("magazine", "/magazine/"),
+)
+
+
+class Command(BaseCommand):
+    help = "Compare Django and Jinja2 render times of the public templates on seeded data."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--articles", type=int, default=500)
+        parser.add_argument("--resources", type=int, default=200)
+        parser.add_argument("--issues", type=int, default=120)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded rows.")
+
+    def handle(self, *args, **options):
+        templates = list(settings.TEMPLATES)
+        if not any(t.get("NAME") == "jinja2" for t in templates):
+            templates.append(settings.JINJA2_TEMPLATES_BACKEND)
+
+        with override_settings(TEMPLATES=templates), transaction.atomic():
+            counts = seed_content(
+                articles=options["articles"],
+                resources=options["resources"],
+                issues=options["issues"],
+            )
+            self.stdout.write(f"Seeded {counts}")
+            self.stdout.write(f"{'page':<18}{'django ms':>12}{'jinja2 ms':>12}{'speedup':>10}")
+            for view_name, path in PAGES:
+                django_ms, jinja_ms = self.bench_page(view_name, path, options["repeat"])
+                self.stdout.write(
+                    f"{view_name:<18}{django_ms:>12.2f}{jinja_ms:>12.2f}{django_ms / jinja_ms:>9.2f}x"
+                )
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+    def bench_page(self, view_name, path, repeat):
+        request = RequestFactory().get(path)
+        request.user = AnonymousUser()
+
+        # Run the view once to capture the template context it builds.
+        captured = {}
+
+        def capture(request, template_name, context=None, using=None):
+            captured.update(template_name=template_name, context=context)
+            return HttpResponse()
+
+        with mock.patch.object(views, "render", capture):
+            getattr(views, view_name)(request)
+
+        # Evaluate querysets up front so both engines render the same rows.
+        context = {
+            key: list(value) if isinstance(value, QuerySet) else value
+            for key, value in captured["context"].items()
+        }
+        return tuple(
+            self.time_render(engines[alias].get_template(captured["template_name"]), context, request, repeat)
+            for alias in ("django", "jinja2")
+        )
+
+    def time_render(self, template, context, request, repeat):
+        template.render(dict(context), request)  # warm caches
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            template.render(dict(context), request)
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
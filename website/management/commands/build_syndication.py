@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from website.syndication import build_all, build_pending
+
+
+class Command(BaseCommand):
+    help = "Regenerate every pre-built sitemap and feed file (run after deploys or bulk imports)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pending", action="store_true",
+            help="Only rebuild the shards marked by content changes that no request has rebuilt yet.",
+        )
+
+    def handle(self, *args, **options):
+        if options["pending"]:
+            rebuilt = build_pending()
+            self.stdout.write(f"Rebuilt {rebuilt} pending sitemap shards in {settings.SYNDICATION_ROOT}")
+            return
+        build_all()
+        self.stdout.write(f"Sitemaps and feeds written to {settings.SYNDICATION_ROOT}")
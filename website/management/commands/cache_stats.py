@@ -0,0 +1,22 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from callsoso.cache import TwoTierCache
+
+
+class Command(BaseCommand):
+    help = "Show the two-tier cache hit/miss counters summed over all workers (flushed once a minute)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--alias", default="default")
+        parser.add_argument("--reset", action="store_true", help="Zero the counters after printing them.")
+
+    def handle(self, *args, **options):
+        backend = caches[options["alias"]]
+        if not isinstance(backend, TwoTierCache):
+            raise CommandError(f"Cache {options['alias']!r} is not a TwoTierCache.")
+        for stat, value in backend.stats().items():
+            self.stdout.write(f"{stat:<18}{value:.1%}" if stat == "hit_rate" else f"{stat:<18}{value}")
+        if options["reset"]:
+            backend.reset_stats()
+            self.stdout.write("Counters reset")
@@ -0,0 +1,198 @@
+import importlib.util
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from callsoso.loadtest import DEFAULT_MIX, run_load
+
+HOST = "127.0.0.1"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def _parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise CommandError(f"Unknown scenario {name!r}; choose from {', '.join(DEFAULT_MIX)}.")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch SQLite database, serve the project with gunicorn on "
+        "localhost and replay a weighted mix of page views, logins, listing "
+        "creations and match suggestions at a fixed concurrency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=16, help="Virtual users (requests in flight).")
+        parser.add_argument("--duration", type=float, default=30, help="Measured seconds.")
+        parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before measuring.")
+        parser.add_argument("--workers", type=int, default=(os.cpu_count() or 1) * 2 + 1)
+        parser.add_argument("--threads", type=int, default=1, help="gunicorn threads per worker (gthread).")
+        parser.add_argument("--asgi", action="store_true", help="Serve callsoso.asgi with uvicorn workers.")
+        parser.add_argument(
+            "--mix",
+            type=_parse_mix,
+            default=DEFAULT_MIX,
+            help="Scenario weights, e.g. browse=70,login=10,create_listing=10,suggest_match=10",
+        )
+        parser.add_argument("--articles", type=int, default=500)
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--listings", type=int, default=500)
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the request mix.")
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+        parser.add_argument("--keep", action="store_true", help="Keep the scratch directory (DB, logs).")
+
+    def handle(self, *args, **options):
+        if options["asgi"] and importlib.util.find_spec("uvicorn") is None:
+            raise CommandError("--asgi needs uvicorn installed (pip install uvicorn).")
+
+        workdir = Path(tempfile.mkdtemp(prefix="callsoso-loadtest-"))
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "callsoso.settings",
+            "DJANGO_DB_ENGINE": "django.db.backends.sqlite3",
+            "DJANGO_DB_NAME": str(workdir / "db.sqlite3"),
+            "DJANGO_STATIC_ROOT": str(workdir / "static"),
+            "DJANGO_CACHE_LOCATION": str(workdir / "cache"),
+            "DJANGO_DEBUG": "False",
+            "DJANGO_ALLOWED_HOSTS": f"{HOST},localhost",
+            "DJANGO_TRUST_X_FORWARDED_PROTO": "True",
+            "DJANGO_PERFORMANCE_INSTRUMENTATION": "False",
+            # Every virtual user shares 127.0.0.1; throttling would turn the run into 429s.
+            "DJANGO_THROTTLE_ENABLED": "False",
+            "DJANGO_EMAIL_BACKEND": "django.core.mail.backends.dummy.EmailBackend",
+        }
+        try:
+            data = self.prepare(workdir, env, options)
+            report = self.serve_and_load(workdir, env, data, options)
+        finally:
+            if options["keep"]:
+                self.stdout.write(f"Scratch files kept in {workdir}")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        self.print_report(report)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+    def manage(self, env, *arguments):
+        subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / "manage.py"), *arguments],
+            env=env, check=True, stdout=subprocess.DEVNULL,
+        )
+
+    def prepare(self, workdir, env, options):
+        self.stdout.write(f"Preparing scratch database in {workdir}")
+        manifest = workdir / "seed.json"
+        self.manage(env, "migrate", "--noinput", "-v0")
+        self.manage(
+            env, "seed",
+            "--articles", str(options["articles"]),
+            "--users", str(options["users"]),
+            "--listings", str(options["listings"]),
+            "--manifest", str(manifest),
+        )
+        self.manage(env, "collectstatic", "--noinput", "-v0")
+        return json.loads(manifest.read_text())
+
+    def serve_and_load(self, workdir, env, data, options):
+        port = _free_port()
+        command = [
+            sys.executable, "-m", "gunicorn",
+            "--config", str(settings.BASE_DIR / "gunicorn.conf.py"),
+            "--bind", f"{HOST}:{port}",
+            "--workers", str(options["workers"]),
+            "--chdir", str(settings.BASE_DIR),
+            "--error-logfile", str(workdir / "gunicorn.log"),
+        ]
+        if options["asgi"]:
+            command += ["--worker-class", "uvicorn.workers.UvicornWorker", "callsoso.asgi:application"]
+        else:
+            if options["threads"] > 1:
+                command += ["--worker-class", "gthread", "--threads", str(options["threads"])]
+            command.append("callsoso.wsgi:application")
+
+        server = subprocess.Popen(command, env=env)
+        try:
+            self.wait_until_ready(server, port, workdir)
+            self.stdout.write(
+                f"Loading {HOST}:{port} ({options['workers']} workers) with {options['concurrency']} "
+                f"virtual users for {options['duration']:g}s after {options['warmup']:g}s warm-up"
+            )
+            results = run_load(
+                HOST, port, data, server.pid,
+                concurrency=options["concurrency"],
+                duration=options["duration"],
+                warmup=options["warmup"],
+                mix=options["mix"],
+                seed=options["seed"],
+            )
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+        results["meta"] = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "server": "gunicorn+uvicorn (asgi)" if options["asgi"] else "gunicorn (wsgi)",
+            "workers": options["workers"],
+            "threads": options["threads"],
+            "concurrency": options["concurrency"],
+            "warmup_seconds": options["warmup"],
+            "mix": options["mix"],
+            "dataset": data["counts"],
+            "cpu_count": os.cpu_count(),
+        }
+        return results
+
+    def wait_until_ready(self, server, port, workdir, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                log = (workdir / "gunicorn.log").read_text(errors="replace")[-2000:]
+                raise CommandError(f"gunicorn exited with status {server.returncode}:\n{log}")
+            try:
+                socket.create_connection((HOST, port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"gunicorn did not start listening on port {port} within {timeout}s.")
+
+    def print_report(self, report):
+        header = f"{'endpoint':<40}{'reqs':>7}{'rps':>9}{'err %':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for label, row in [*report["endpoints"].items(), ("TOTAL", report["total"])]:
+            if not row["requests"]:
+                continue
+            line = (
+                f"{label:<40}{row['requests']:>7}{row['rps']:>9.1f}{row['error_rate'] * 100:>7.1f}"
+                f"{row['p50_ms']:>9.1f}{row['p90_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row["errors"] else line)
+        for worker in report["workers"]:
+            self.stdout.write(
+                f"worker {worker['pid']}: {worker['cpu_percent']:.1f}% CPU, {worker['peak_rss_mb']:.1f} MB peak RSS"
+            )
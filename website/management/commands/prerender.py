@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from website.prerender import build_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the anonymous public pages (about, categories, insights, knowledge, "
+        "magazine, article and issue pages) to static HTML with gzip/Brotli variants."
+    )
+
+    def handle(self, *args, **options):
+        written = build_all()
+        self.stdout.write(f"Pre-rendered {written} pages into {settings.PRERENDER_ROOT}")
+        if not settings.PRERENDER_PAGES:
+            self.stdout.write(self.style.WARNING(
+                "PRERENDER_PAGES is off, so these files are not served until it is enabled."
+            ))
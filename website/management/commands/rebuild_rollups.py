@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from directory import metrics
+from website import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the contribution, collaboration and diverted-material rollups (run after bulk imports or raw SQL edits)."
+
+    def handle(self, *args, **options):
+        rollups.rebuild()
+        metrics.rebuild()
+        self.stdout.write("Rollups rebuilt")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from website.models import Article
+
+
+class Command(BaseCommand):
+    help = "Render article bodies whose stored HTML is missing or stale (after upgrades, raw SQL or bulk imports)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Re-render every article, not just stale ones.")
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        articles = Article.objects.only("pk", "body", "body_hash").order_by("pk")
+        batch, rendered = [], 0
+        for article in articles.iterator(chunk_size=options["batch_size"]):
+            if options["force"]:
+                article.body_hash = ""
+            if article.render_body():
+                batch.append(article)
+            if len(batch) >= options["batch_size"]:
+                rendered += self._save(batch)
+        rendered += self._save(batch)
+        self.stdout.write(f"Rendered {rendered} article(s)")
+
+    def _save(self, batch):
+        # update(), not save(): leaves updated_at (and the pages' freshness) alone.
+        Article.objects.bulk_update(batch, ["body_html", "toc", "body_hash"])
+        count = len(batch)
+        batch.clear()
+        return count
@@ -0,0 +1,59 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from directory.models import DemandListing, SurplusListing
+from directory.seeding import seed_directory
+from website.models import Article
+from website.seeding import seed_community, seed_content, seed_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the configured database with synthetic content, users and "
+        "directory listings (for load tests; never run against production)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--articles", type=int, default=500)
+        parser.add_argument("--categories", type=int, default=12)
+        parser.add_argument("--resources", type=int, default=200)
+        parser.add_argument("--issues", type=int, default=120)
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--password", default="loadtest-pass", help="Password shared by the seeded users.")
+        parser.add_argument("--listings", type=int, default=500, help="Surplus and demand listings each.")
+        parser.add_argument("--matches", type=int, default=300)
+        parser.add_argument("--manifest", help="Write usernames, slugs and listing ids to this JSON file.")
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        users = seed_users(options["users"], password=options["password"])
+        counts = seed_content(
+            articles=options["articles"],
+            categories=options["categories"],
+            resources=options["resources"],
+            issues=options["issues"],
+        )
+        counts.update(seed_community(users))
+        counts.update(seed_directory(
+            users,
+            surplus=options["listings"],
+            demand=options["listings"],
+            matches=options["matches"],
+        ))
+        self.stdout.write(f"Seeded {counts}")
+
+        if options["manifest"]:
+            manifest = {
+                "counts": counts,
+                "password": options["password"],
+                "usernames": [user.username for user in users],
+                "article_slugs": list(
+                    Article.objects.filter(is_published=True).values_list("slug", flat=True)
+                ),
+                "surplus_ids": list(SurplusListing.objects.values_list("pk", flat=True)),
+                "demand_ids": list(DemandListing.objects.values_list("pk", flat=True)),
+            }
+            with open(options["manifest"], "w", encoding="utf-8") as handle:
+                json.dump(manifest, handle)
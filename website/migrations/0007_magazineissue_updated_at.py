@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0006_populararticle_magazineissue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='magazineissue',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
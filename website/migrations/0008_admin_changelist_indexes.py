@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:39
+
+import django.utils.timezone
+from django.db import migrations, models
+
+from callsoso.migrations_utils import pattern_indexes
+
+
+# Expression indexes for the admin's ^field / =field searches on PostgreSQL
+# (see callsoso.migrations_utils.pattern_indexes).
+PATTERN_INDEXES = {
+    "website_article_title_upper_like": ("website_article", "title"),
+    "website_article_slug_upper_like": ("website_article", "slug"),
+    "website_magazineissue_title_upper_like": ("website_magazineissue", "title"),
+    "website_magazineissue_slug_upper_like": ("website_magazineissue", "slug"),
+    "website_populararticle_title_upper_like": ("website_populararticle", "title"),
+    "website_resource_title_upper_like": ("website_resource", "title"),
+    "website_collaboration_name_upper_like": ("website_collaboration", "name"),
+    "website_collaboration_org_upper_like": ("website_collaboration", "organisation"),
+    "website_collaboration_email_upper_like": ("website_collaboration", "contact_email"),
+    "website_contribution_name_upper_like": ("website_contribution", "contributor_name"),
+    "website_contribution_email_upper_like": ("website_contribution", "email"),
+    "website_founderslist_email_upper_like": ("website_founderslist", "email"),
+}
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0007_magazineissue_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='article',
+            name='published_date',
+            field=models.DateField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='collaboration',
+            name='planted_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='contribution',
+            name='date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        pattern_indexes(PATTERN_INDEXES),
+    ]
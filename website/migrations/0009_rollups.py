@@ -0,0 +1,65 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:46
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+def populate_rollups(apps, schema_editor):
+    Contribution = apps.get_model("website", "Contribution")
+    Collaboration = apps.get_model("website", "Collaboration")
+    ContributionRollup = apps.get_model("website", "ContributionRollup")
+    CollaborationRollup = apps.get_model("website", "CollaborationRollup")
+    rows = Contribution.objects.annotate(month=TruncMonth("date")).values("source", "month").annotate(
+        total=Sum("amount"), count=Count("id")
+    ).order_by()
+    ContributionRollup.objects.bulk_create(
+        ContributionRollup(
+            source=row["source"],
+            month=timezone.localtime(row["month"]).date(),
+            total_amount=row["total"] or 0,
+            contribution_count=row["count"],
+        )
+        for row in rows
+    )
+    CollaborationRollup.objects.bulk_create(
+        CollaborationRollup(growth_stage=row["growth_stage"], collaboration_count=row["count"])
+        for row in Collaboration.objects.values("growth_stage").annotate(count=Count("id")).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0008_admin_changelist_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollaborationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('growth_stage', models.IntegerField(choices=[(1, 'Seed'), (2, 'Sprout'), (3, 'Growth'), (4, 'Bloom'), (5, 'Harvest')], unique=True)),
+                ('collaboration_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['growth_stage'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ContributionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('donation', 'Donation'), ('sponsorship', 'Sponsorship'), ('grant', 'Grant'), ('material', 'Material Support'), ('other', 'Other')], max_length=50)),
+                ('month', models.DateField(help_text='First day of the month, in the site time zone')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('contribution_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-month', 'source'],
+                'constraints': [models.UniqueConstraint(fields=('source', 'month'), name='contribution_rollup_source_month')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0009_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='magazineissue',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-published_date', '-id'], name='magazine_listing_idx'),
+        ),
+    ]
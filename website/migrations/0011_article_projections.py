@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:58
+
+from django.db import migrations, models
+
+from website import projections
+
+
+def populate_projections(apps, schema_editor):
+    Article = apps.get_model("website", "Article")
+    articles = Article.objects.only("pk", "excerpt", "summary", "body").order_by("pk")
+    changed = []
+    for article in articles.iterator():
+        article.teaser = projections.teaser(article.excerpt, article.summary, article.body)
+        article.reading_time = projections.reading_time(article.body)
+        changed.append(article)
+    Article.objects.bulk_update(changed, ["teaser", "reading_time"], batch_size=500)
+    projections.refresh_category_labels(Article)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0010_magazine_listing_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='category_labels',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='teaser',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(populate_projections, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,8 @@ from django.utils.text import slugify
 from django.utils import timezone
 from django.templatetags.static import static
 
+from . import projections, rendering
+
 # ===========================
 # CATEGORY (shared)
 # ===========================
@@ -26,6 +28,16 @@ class Category(models.Model):
 # ===========================
 # MAGAZINE ISSUE
 # ===========================
+class MagazineIssueQuerySet(models.QuerySet):
+    def search(self, query):
+        return self.filter(title__icontains=query) if query else self
+
+    def in_category(self, category_id):
+        """Issues linked to the category, as an EXISTS on the link table (no join, no duplicates)."""
+        links = MagazineIssue.categories.through.objects.filter(magazineissue=models.OuterRef("pk"), category=category_id)
+        return self.filter(models.Exists(links))
+
+
 class MagazineIssue(models.Model):
     title = models.CharField(max_length=250)
     slug = models.SlugField(unique=True, blank=True)
@@ -38,9 +50,20 @@ class MagazineIssue(models.Model):
     is_featured = models.BooleanField(default=False)
     is_published = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = MagazineIssueQuerySet.as_manager()
 
     class Meta:
         ordering = ["-published_date", "-created_at"]
+        indexes = [
+            # The magazine listing walks published issues newest first by (published_date, id).
+            models.Index(
+                fields=["-published_date", "-id"],
+                name="magazine_listing_idx",
+                condition=models.Q(is_published=True),
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -58,7 +81,7 @@ class MagazineIssue(models.Model):
 
     def get_absolute_url(self):
         try:
-            return reverse("magazine_detail", kwargs={"slug": self.slug})
+            return reverse("website:magazine_detail", kwargs={"slug": self.slug})
         except Exception:
             return "#"
 
@@ -112,7 +135,7 @@ class Collaboration(models.Model):
     description = models.TextField()
     organisation = models.CharField(max_length=200, blank=True, null=True)
     contact_email = models.EmailField(blank=True, null=True)
-    planted_date = models.DateTimeField(auto_now_add=True)
+    planted_date = models.DateTimeField(auto_now_add=True, db_index=True)
     growth_stage = models.IntegerField(choices=GROWTH_STAGE_CHOICES, default=1)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     is_active = models.BooleanField(default=True)
@@ -139,7 +162,7 @@ class Contribution(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     source = models.CharField(max_length=50, choices=SOURCE_CHOICES)
     message = models.TextField(blank=True, null=True)
-    date = models.DateTimeField(auto_now_add=True)
+    date = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         name = self.contributor_name or (self.user.username if self.user else "Anonymous")
@@ -160,6 +183,15 @@ class FoundersList(models.Model):
 # ===========================
 # ARTICLE / NEWS (KEEPING)
 # ===========================
+class ArticleQuerySet(models.QuerySet):
+    # Read only by the detail page; cards use the stored projections.
+    HEAVY_FIELDS = ("excerpt", "summary", "body", "body_html", "toc")
+
+    def for_lists(self):
+        """Published articles without the long text columns."""
+        return self.filter(is_published=True).defer(*self.HEAVY_FIELDS)
+
+
 class Article(models.Model):
     title = models.CharField(max_length=250)
     slug = models.SlugField(max_length=270, unique=True, blank=True)
@@ -170,7 +202,7 @@ class Article(models.Model):
     image = models.ImageField(upload_to="articles/images/", blank=True, null=True)
     image_url = models.URLField(blank=True, null=True)
 
-    published_date = models.DateField(default=timezone.now)
+    published_date = models.DateField(default=timezone.now, db_index=True)
     author = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
@@ -184,15 +216,40 @@ class Article(models.Model):
     is_featured = models.BooleanField(default=False)
     is_published = models.BooleanField(default=True)
 
+    # List-page projections (website.projections)
+    teaser = models.TextField(blank=True, default="", editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=1, editable=False)
+    category_labels = models.CharField(max_length=255, blank=True, default="", editable=False)
+
+    # Sanitized body and table of contents, rendered on save (website.rendering)
+    body_html = models.TextField(blank=True, default="", editable=False)
+    toc = models.JSONField(default=list, blank=True, editable=False)
+    body_hash = models.CharField(max_length=64, blank=True, default="", editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ArticleQuerySet.as_manager()
+
     class Meta:
         ordering = ["-published_date", "-created_at"]
 
     def __str__(self):
         return self.title
 
+    def refresh_projections(self):
+        self.teaser = projections.teaser(self.excerpt, self.summary, self.body)
+        self.reading_time = projections.reading_time(self.body)
+
+    def render_body(self):
+        """Re-render ``body_html`` and ``toc`` if the body or renderer changed; returns whether it did."""
+        digest = rendering.body_hash(self.body)
+        if digest == self.body_hash:
+            return False
+        self.body_html, self.toc = rendering.render(self.body)
+        self.body_hash = digest
+        return True
+
     def save(self, *args, **kwargs):
         if not self.slug:
             base_slug = slugify(self.title)[:250]
@@ -202,11 +259,17 @@ class Article(models.Model):
                 slug = f"{base_slug}-{i}"
                 i += 1
             self.slug = slug
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"excerpt", "summary", "body"} & set(update_fields):
+            self.refresh_projections()
+            self.render_body()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "teaser", "reading_time", "body_html", "toc", "body_hash"}
         super().save(*args, **kwargs)
 
     def get_absolute_url(self):
         try:
-            return reverse("article_detail", kwargs={"slug": self.slug})
+            return reverse("website:article_detail", kwargs={"slug": self.slug})
         except Exception:
             return "#"
 
@@ -271,3 +334,33 @@ class Resource(models.Model):
         if self.image_url:
             return self.image_url
         return static("images/placeholder.jpg")
+
+
+# ===========================
+# ROLLUPS (maintained by website.rollups)
+# ===========================
+class ContributionRollup(models.Model):
+    source = models.CharField(max_length=50, choices=Contribution.SOURCE_CHOICES)
+    month = models.DateField(help_text="First day of the month, in the site time zone")
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    contribution_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-month", "source"]
+        constraints = [
+            models.UniqueConstraint(fields=["source", "month"], name="contribution_rollup_source_month"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_source_display()} {self.month:%Y-%m}: {self.total_amount}"
+
+
+class CollaborationRollup(models.Model):
+    growth_stage = models.IntegerField(choices=Collaboration.GROWTH_STAGE_CHOICES, unique=True)
+    collaboration_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["growth_stage"]
+
+    def __str__(self):
+        return f"{self.get_growth_stage_display()}: {self.collaboration_count}"
@@ -0,0 +1,280 @@
+"""
+Static pre-rendering of public pages.
+
+Pages that are identical for every anonymous visitor are rendered through
+the normal view stack and written to ``settings.PRERENDER_ROOT`` as
+``<url path>/index.html`` plus ``.gz`` and ``.br`` variants:
+
+    about/  categories/  insights/  knowledge/  magazine/
+    news/<slug>/         (published articles)
+    magazine/<slug>/     (published issues)
+
+``PrerenderedPageMiddleware`` serves those files to requests without a
+session or messages cookie and without a query string; everything else,
+and any page without a file, falls through to the dynamic view. A front
+proxy can do the same, e.g. nginx::
+
+    if ($http_cookie !~ "sessionid|messages") { set $pre /prerendered$uri/index.html; }
+    try_files $pre @django;
+
+Files are refreshed after content changes (``website.signals``); a page
+that no longer renders with status 200 has its files removed.
+"""
+
+import gzip
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.base import BaseHandler
+from django.db import transaction
+from django.http import FileResponse, HttpResponseNotModified
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from callsoso import deferred
+
+from .models import Article, MagazineIssue
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always written
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.html"
+# Sent by the renderer so the middleware never answers its own requests.
+RENDER_HEADER = "HTTP_X_CALLSOSO_PRERENDER"
+# A pending flash message means the page is not the anonymous default.
+MESSAGES_COOKIE = "messages"
+STATIC_PAGES = (
+    "website:about",
+    "website:categories",
+    "website:insights",
+    "website:knowledge",
+    "website:magazine",
+)
+
+
+# ===========================
+# PAGES
+# ===========================
+def article_path(slug):
+    return reverse("website:article_detail", args=[slug])
+
+
+def issue_path(slug):
+    return reverse("website:magazine_detail", args=[slug])
+
+
+def all_pages():
+    pages = {reverse(name) for name in STATIC_PAGES}
+    pages.update(map(article_path, Article.objects.filter(is_published=True).values_list("slug", flat=True)))
+    pages.update(map(issue_path, MagazineIssue.objects.filter(is_published=True).values_list("slug", flat=True)))
+    return pages
+
+
+def pages_for_article(article, old_slug=None):
+    """The article's own page, its old URL, listings and articles that show it as related."""
+    pages = {article_path(article.slug), reverse("website:insights"), reverse("website:categories")}
+    if old_slug and old_slug != article.slug:
+        pages.add(article_path(old_slug))
+    if article.pk:
+        related = (
+            Article.objects.filter(is_published=True, categories__article=article)
+            .exclude(pk=article.pk)
+            .values_list("slug", flat=True)
+            .distinct()
+        )
+        pages.update(map(article_path, related))
+    return pages
+
+
+def pages_for_issue(issue, old_slug=None):
+    pages = {issue_path(issue.slug), reverse("website:magazine"), reverse("website:categories")}
+    if old_slug and old_slug != issue.slug:
+        pages.add(issue_path(old_slug))
+    return pages
+
+
+def pages_for_resource(resource):
+    return {reverse("website:knowledge")}
+
+
+def pages_for_popular():
+    """The magazine page's "Most Popular" sidebar."""
+    return {reverse("website:magazine")}
+
+
+def pages_for_category(category):
+    """Listings (sidebars, filters) and every article or issue filed under it."""
+    pages = {reverse(name) for name in STATIC_PAGES}
+    if category.pk:
+        pages.update(map(article_path, category.article_set.filter(is_published=True).values_list("slug", flat=True)))
+        pages.update(map(issue_path, category.magazineissue_set.filter(is_published=True).values_list("slug", flat=True)))
+    return pages
+
+
+# ===========================
+# FILES
+# ===========================
+def page_file(url_path):
+    """File for ``url_path``, or None if the path could escape the root."""
+    relative = url_path.strip("/")
+    if ".." in relative.split("/") or "\\" in relative:
+        return None
+    return settings.PRERENDER_ROOT / relative / INDEX_FILE
+
+
+def _write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "wb") as handle:
+        handle.write(content)
+    os.replace(tmp, path)
+
+
+def _variants(path):
+    return [path, path.with_name(path.name + ".gz"), path.with_name(path.name + ".br")]
+
+
+def write_page(url_path, content):
+    path = page_file(url_path)
+    _write(path, content)
+    _write(_variants(path)[1], gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write(_variants(path)[2], brotli.compress(content))
+
+
+def remove_page(url_path):
+    for variant in _variants(page_file(url_path)):
+        variant.unlink(missing_ok=True)
+
+
+# ===========================
+# RENDERING
+# ===========================
+def render_pages(url_paths):
+    """
+    Render each path as an anonymous HTTPS visitor would see it and store
+    the result; paths that do not answer 200 are removed instead.
+    Returns the number of pages written.
+    """
+    from django.test import RequestFactory  # request plumbing only; no test database involved
+
+    # The handler is called directly, without request_started/finished, so
+    # rendering never disturbs work deferred on the request that saved.
+    handler = BaseHandler()
+    handler.load_middleware()
+    factory = RequestFactory(HTTP_HOST=settings.SITE_DOMAIN, **{RENDER_HEADER: "1"})
+    written = 0
+    for url_path in sorted(url_paths):
+        # A view error answers 500 (logged by django.request) and drops that page's files.
+        response = handler.get_response(factory.get(url_path, secure=True))
+        if response.status_code == 200 and not response.cookies:
+            write_page(url_path, response.content)
+            written += 1
+        else:
+            remove_page(url_path)
+    return written
+
+
+def build_all():
+    """Render every pre-renderable page and drop files for pages that are gone."""
+    pages = all_pages()
+    written = render_pages(pages)
+    keep = {page_file(page) for page in pages}
+    for path in settings.PRERENDER_ROOT.rglob(INDEX_FILE):
+        if path not in keep:
+            for variant in _variants(path):
+                variant.unlink(missing_ok=True)
+    return written
+
+
+def schedule(url_paths):
+    """
+    Re-render pages once the current transaction commits, after the
+    response has been sent (``callsoso.deferred``; every page the
+    request's saves touched is rendered once). The paths travel with the
+    commit callback, so another thread's commit never renders them early
+    from data this transaction has not committed yet; a rollback drops
+    them. A failure is logged and never reaches the request that saved.
+    """
+    url_paths = set(url_paths)
+    if not url_paths:
+        return
+
+    def rerender():
+        deferred.after_response(flush, url_paths)
+
+    transaction.on_commit(rerender, robust=True)
+
+
+def flush(url_paths):
+    written = render_pages(url_paths)
+    logger.info("Re-rendered %d of %d static pages", written, len(url_paths))
+
+
+# ===========================
+# SERVING
+# ===========================
+class PrerenderedPageMiddleware:
+    """
+    Serve pre-rendered pages to anonymous visitors. Enabled by
+    ``PRERENDER_PAGES``; keep it last in MIDDLEWARE so the security
+    headers are still applied to the responses.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PRERENDER_PAGES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.serve(request) or self.get_response(request)
+
+    def serve(self, request):
+        if (
+            request.method not in ("GET", "HEAD")
+            or request.META.get("QUERY_STRING")
+            or RENDER_HEADER in request.META
+            or settings.SESSION_COOKIE_NAME in request.COOKIES
+            or MESSAGES_COOKIE in request.COOKIES
+            or not request.path_info.endswith("/")
+        ):
+            return None
+        path = page_file(request.path_info)
+        if path is None:
+            return None
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+
+        if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            accepted = request.META.get("HTTP_ACCEPT_ENCODING", "")
+            _, gz, br = _variants(path)
+            chosen, encoding = path, None
+            for variant, name in ((br, "br"), (gz, "gzip")):
+                if name in accepted and variant.exists():
+                    chosen, encoding = variant, name
+                    break
+            response = FileResponse(chosen.open("rb"), content_type="text/html; charset=utf-8")
+            if encoding:
+                response["Content-Encoding"] = encoding
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        patch_vary_headers(response, ("Accept-Encoding", "Cookie"))
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.CONTENT_CACHE_MAX_AGE,
+            s_maxage=settings.CONTENT_CACHE_S_MAXAGE,
+        )
+        return response
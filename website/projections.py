@@ -0,0 +1,62 @@
+"""
+List-page projections of an article.
+
+Cards on the news, insights and home pages show a short plain-text
+teaser, a reading time and the category names. These are stored on the
+article (``Article.teaser``, ``reading_time``, ``category_labels``) so list
+queries can defer ``body`` and templates never strip or truncate it:
+
+- ``teaser`` and ``reading_time`` are set in ``Article.save()``;
+- ``category_labels`` follows category links and renames
+  (``website.signals``).
+"""
+
+import html
+import math
+
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+TEASER_WORDS = 40
+WORDS_PER_MINUTE = 200
+LABEL_SEPARATOR = " / "
+
+
+def plain_text(markup):
+    return " ".join(html.unescape(strip_tags(markup or "")).split())
+
+
+def teaser(excerpt, summary, body):
+    """The first ``TEASER_WORDS`` words of the excerpt, else the summary, else the body."""
+    text = plain_text(excerpt) or plain_text(summary) or plain_text(body)
+    return Truncator(text).words(TEASER_WORDS)
+
+
+def reading_time(body):
+    """Minutes to read the body, at least one."""
+    return max(1, math.ceil(len(plain_text(body).split()) / WORDS_PER_MINUTE))
+
+
+def category_labels(names, max_length=255):
+    return Truncator(LABEL_SEPARATOR.join(names)).chars(max_length)
+
+
+def refresh_category_labels(article_model, article_ids=None, batch_size=500):
+    """
+    Recompute ``category_labels`` for the given articles (all if None).
+    Takes the model so data migrations can pass their historical one.
+    """
+    articles = article_model.objects.order_by()
+    if article_ids is not None:
+        articles = articles.filter(pk__in=list(article_ids))
+    names = {}
+    links = article_model.categories.through.objects.filter(article__in=articles.values("pk"))
+    for article_id, name in links.order_by("category__name", "category_id").values_list("article_id", "category__name"):
+        names.setdefault(article_id, []).append(name)
+    changed = []
+    for article in articles.only("pk", "category_labels").iterator():
+        labels = category_labels(names.get(article.pk, []))
+        if labels != article.category_labels:
+            article.category_labels = labels
+            changed.append(article)
+    article_model.objects.bulk_update(changed, ["category_labels"], batch_size=batch_size)
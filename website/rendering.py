@@ -0,0 +1,174 @@
+"""
+Article body rendering.
+
+``Article.body`` is HTML written in the admin (or plain text). It is
+rendered once, when the article is saved, into ``body_html``:
+
+- sanitized against an allowlist of tags, attributes and URL schemes
+  (scripts, styles, event handlers and ``javascript:`` links are dropped);
+- ``<h2>``/``<h3>`` headings get ids and make up the table of contents
+  (``Article.toc``);
+- images load lazily, and links to other sites open with ``rel="noopener"``.
+
+``body_hash`` covers the body and ``RENDERER_VERSION``; bump the version
+when the output changes and run ``manage.py render_articles``.
+"""
+
+import hashlib
+import re
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.utils.html import linebreaks
+from django.utils.text import slugify
+
+RENDERER_VERSION = 2
+
+ALLOWED_TAGS = {
+    "a", "abbr", "b", "blockquote", "br", "caption", "code", "em", "figcaption", "figure",
+    "h2", "h3", "h4", "h5", "h6", "hr", "i", "img", "li", "ol", "p", "pre", "small", "span",
+    "strong", "sub", "sup", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "u", "ul",
+}
+VOID_TAGS = {"br", "hr", "img"}
+# Dropped together with everything inside them.
+DROPPED_CONTENT = {"script", "style", "iframe", "object", "template", "noscript", "svg", "math"}
+# Dropped, but void: they have no content or end tag to wait for.
+DROPPED_VOID = {"embed", "param", "source", "track"}
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "img": {"src", "alt", "title", "width", "height"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan", "scope"},
+    "abbr": {"title"},
+}
+URL_ATTRIBUTES = {"href", "src"}
+ALLOWED_SCHEMES = {"", "http", "https", "mailto"}
+# <h1> is the page title; headings in the body start one level down.
+HEADING_REMAP = {"h1": "h2"}
+TOC_LEVELS = {"h2": 2, "h3": 3}
+
+TAG_RE = re.compile(r"<[a-zA-Z/!]")
+
+
+def body_hash(body):
+    return hashlib.sha256(f"{RENDERER_VERSION}\n{body or ''}".encode("utf-8")).hexdigest()
+
+
+def _safe_url(value):
+    value = value.strip()
+    try:
+        scheme = urlsplit(value).scheme.lower()
+    except ValueError:
+        return None
+    return value if scheme in ALLOWED_SCHEMES else None
+
+
+def _is_external(href):
+    return urlsplit(href).scheme in ("http", "https")
+
+
+class _Renderer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.toc = []
+        self.open_tags = []
+        self.dropping = 0
+        self.heading = None  # (index in out, tag, text parts) while inside an h2/h3
+        self.ids = set()
+
+    # Opening and closing tags
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_VOID:
+            return
+        if tag in DROPPED_CONTENT:
+            self.dropping += 1
+            return
+        tag = HEADING_REMAP.get(tag, tag)
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        kept = []
+        for name, value in attrs:
+            if name not in ALLOWED_ATTRIBUTES.get(tag, ()) or value is None:
+                continue
+            if name in URL_ATTRIBUTES:
+                value = _safe_url(value)
+                if value is None:
+                    continue
+            kept.append((name, value))
+        if tag == "img":
+            kept += [("loading", "lazy"), ("decoding", "async")]
+        if tag == "a" and any(name == "href" and _is_external(value) for name, value in kept):
+            kept.append(("rel", "noopener noreferrer"))
+        markup = "<" + tag + "".join(f' {name}="{escape(value)}"' for name, value in kept) + ">"
+        if tag in TOC_LEVELS and self.heading is None:
+            self.heading = (len(self.out), tag, [])
+            self.out.append(None)  # filled in with the id once the text is known
+        else:
+            self.out.append(markup)
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in DROPPED_CONTENT or tag in DROPPED_VOID:
+            return  # <svg/>: nothing inside to drop
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and HEADING_REMAP.get(tag, tag) in self.open_tags:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_VOID:
+            return
+        if tag in DROPPED_CONTENT:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        tag = HEADING_REMAP.get(tag, tag)
+        if self.dropping or tag not in self.open_tags:
+            return
+        # Close anything left open inside this element first.
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.out.append(f"</{open_tag}>")
+            if open_tag in TOC_LEVELS and self.heading and self.heading[1] == open_tag:
+                self._finish_heading()
+            if open_tag == tag:
+                break
+
+    def _finish_heading(self):
+        index, tag, parts = self.heading
+        self.heading = None
+        text = " ".join("".join(parts).split())
+        anchor = base = slugify(text) or "section"
+        suffix = 2
+        while anchor in self.ids:
+            anchor = f"{base}-{suffix}"
+            suffix += 1
+        self.ids.add(anchor)
+        self.out[index] = f'<{tag} id="{anchor}">'
+        if text:
+            self.toc.append({"level": TOC_LEVELS[tag], "id": anchor, "title": text})
+
+    # Content
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        if self.heading is not None:
+            self.heading[2].append(data)
+        self.out.append(escape(data, quote=False))
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.handle_endtag(self.open_tags[-1])
+        return "".join(self.out), self.toc
+
+
+def render(body):
+    """``(html, toc)`` for an article body; ``toc`` is a list of ``{level, id, title}``."""
+    body = body or ""
+    if body.strip() and not TAG_RE.search(body):
+        body = linebreaks(body, autoescape=True)  # plain text: paragraphs and line breaks
+    renderer = _Renderer()
+    renderer.feed(body)
+    return renderer.close()
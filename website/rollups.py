@@ -0,0 +1,123 @@
+"""
+Rollup tables behind the impact tracker and support pages.
+
+``ContributionRollup`` holds the total and count per (source, month) and
+``CollaborationRollup`` the count per growth stage. Saves and deletes
+apply the difference in the same transaction (``website.signals``), so
+the pages read a handful of rows however large the base tables get.
+Bulk writes skip model signals; run ``rebuild()``
+(``manage.py rebuild_rollups``) after them.
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Collaboration, CollaborationRollup, Contribution, ContributionRollup
+
+
+def month_of(moment):
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def contribution_key(contribution):
+    """``(source, month, amount)`` the contribution counts towards, or None if unsaved."""
+    if contribution is None or contribution.date is None:
+        return None
+    return contribution.source, month_of(contribution.date), contribution.amount or Decimal(0)
+
+
+# ===========================
+# INCREMENTAL UPDATES
+# ===========================
+def add_contribution(key, sign=1):
+    if key is None:
+        return
+    source, month, amount = key
+    row, _ = ContributionRollup.objects.get_or_create(source=source, month=month)
+    ContributionRollup.objects.filter(pk=row.pk).update(
+        total_amount=F("total_amount") + sign * amount,
+        contribution_count=F("contribution_count") + sign,
+    )
+
+
+def move_contribution(old_key, new_key):
+    if old_key != new_key:
+        add_contribution(old_key, -1)
+        add_contribution(new_key)
+
+
+def add_collaboration(growth_stage, sign=1):
+    if growth_stage is None:
+        return
+    row, _ = CollaborationRollup.objects.get_or_create(growth_stage=growth_stage)
+    CollaborationRollup.objects.filter(pk=row.pk).update(collaboration_count=F("collaboration_count") + sign)
+
+
+def move_collaboration(old_stage, new_stage):
+    if old_stage != new_stage:
+        add_collaboration(old_stage, -1)
+        add_collaboration(new_stage)
+
+
+# ===========================
+# FULL REBUILD
+# ===========================
+@transaction.atomic
+def rebuild():
+    """Recompute both rollups from the base tables."""
+    ContributionRollup.objects.all().delete()
+    contribution_rows = (
+        Contribution.objects.annotate(month=TruncMonth("date"))
+        .values("source", "month")
+        .annotate(total=Sum("amount"), count=Count("id"))
+        .order_by()
+    )
+    ContributionRollup.objects.bulk_create(
+        ContributionRollup(
+            source=row["source"],
+            month=month_of(row["month"]),
+            total_amount=row["total"] or 0,
+            contribution_count=row["count"],
+        )
+        for row in contribution_rows
+    )
+
+    CollaborationRollup.objects.all().delete()
+    stage_rows = Collaboration.objects.values("growth_stage").annotate(count=Count("id")).order_by()
+    CollaborationRollup.objects.bulk_create(
+        CollaborationRollup(growth_stage=row["growth_stage"], collaboration_count=row["count"])
+        for row in stage_rows
+    )
+
+
+# ===========================
+# READING
+# ===========================
+def stage_summary():
+    """``{"stage_1": n, ..., "stage_5": n}`` for the impact tracker, one query."""
+    counts = dict(CollaborationRollup.objects.values_list("growth_stage", "collaboration_count"))
+    return {f"stage_{stage}": counts.get(stage, 0) for stage, _ in Collaboration.GROWTH_STAGE_CHOICES}
+
+
+def contribution_summary(months=12):
+    """Totals per source and per recent month for the support page, one query."""
+    labels = dict(Contribution.SOURCE_CHOICES)
+    by_source, by_month = {}, {}
+    rows = ContributionRollup.objects.values_list("source", "month", "total_amount", "contribution_count")
+    for source, month, total, count in rows:
+        source_total = by_source.setdefault(source, {"label": labels.get(source, source), "total": 0, "count": 0})
+        source_total["total"] += total
+        source_total["count"] += count
+        month_total = by_month.setdefault(month, {"month": month, "total": 0, "count": 0})
+        month_total["total"] += total
+        month_total["count"] += count
+    return {
+        "by_source": sorted(by_source.values(), key=lambda row: row["total"], reverse=True),
+        "by_month": sorted(by_month.values(), key=lambda row: row["month"], reverse=True)[:months],
+        "total": sum(row["total"] for row in by_source.values()),
+        "count": sum(row["count"] for row in by_source.values()),
+    }
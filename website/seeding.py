@@ -0,0 +1,180 @@
+"""
+Synthetic content used by the benchmark commands.
+
+Everything is inserted with ``bulk_create`` so that seeding thousands of
+rows takes seconds. Callers normally run inside ``transaction.atomic()``
+and roll back afterwards, leaving the real database untouched.
+"""
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from . import category_registry, projections, rollups
+from .models import (
+    Article,
+    Category,
+    Collaboration,
+    Contribution,
+    FoundersList,
+    MagazineIssue,
+    PopularArticle,
+    Resource,
+)
+
+WORDS = (
+    "circular surplus material reuse upcycling community timber textile "
+    "offcut workshop compost harvest loop maker design repair value waste "
+    "resource network culture local supply chain creative studio food"
+).split()
+
+
+def _sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _body(rng, paragraphs):
+    return "\n".join(
+        f"<h2>{_sentence(rng, 4)}</h2><p>{' '.join(_sentence(rng) for _ in range(6))}</p>"
+        for _ in range(paragraphs)
+    )
+
+
+def seed_content(articles=200, categories=12, resources=100, issues=60, popular=10, seed=0):
+    """
+    Create categories, articles, resources, magazine issues and popular
+    articles with random category assignments. Returns the row counts.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+
+    cats = Category.objects.bulk_create(
+        Category(name=f"{WORDS[i % len(WORDS)].title()} {i}", slug=f"bench-category-{i}")
+        for i in range(categories)
+    )
+
+    article_rows = [
+        Article(
+            title=f"{_sentence(rng, 6)[:-1]} {i}",
+            slug=f"bench-article-{i}",
+            excerpt=_sentence(rng, 30) if i % 3 else None,
+            summary=_sentence(rng, 20) if i % 5 == 0 else None,
+            body=_body(rng, rng.randint(3, 12)),
+            published_date=today - timedelta(days=i),
+            is_featured=i % 10 == 0,
+            is_published=i % 20 != 19,
+        )
+        for i in range(articles)
+    ]
+    for article in article_rows:
+        # bulk_create skips save()
+        article.refresh_projections()
+        article.render_body()
+    article_rows = Article.objects.bulk_create(article_rows)
+    resource_rows = Resource.objects.bulk_create(
+        Resource(
+            title=f"Resource {_sentence(rng, 4)[:-1]} {i}",
+            description=_sentence(rng, 40),
+            resource_type=rng.choice(Resource.RESOURCE_TYPES)[0],
+            link="https://example.org/resource",
+            is_featured=i % 8 == 0,
+            published=i % 15 != 14,
+        )
+        for i in range(resources)
+    )
+    issue_rows = MagazineIssue.objects.bulk_create(
+        MagazineIssue(
+            title=f"Circular {_sentence(rng, 3)[:-1]} {i}",
+            slug=f"bench-issue-{i}",
+            description=_sentence(rng, 30),
+            published_date=today - timedelta(days=30 * i),
+            is_featured=i % 6 == 0,
+        )
+        for i in range(issues)
+    )
+    PopularArticle.objects.bulk_create(
+        PopularArticle(title=_sentence(rng, 8), url="https://example.org/popular")
+        for _ in range(popular)
+    )
+
+    if cats:
+        for model, rows, fk in (
+            (Article, article_rows, "article_id"),
+            (Resource, resource_rows, "resource_id"),
+            (MagazineIssue, issue_rows, "magazineissue_id"),
+        ):
+            through = model.categories.through
+            through.objects.bulk_create(
+                through(**{fk: row.pk, "category_id": cat.pk})
+                for row in rows
+                for cat in rng.sample(cats, rng.randint(0, min(3, len(cats))))
+            )
+
+        projections.refresh_category_labels(Article, [row.pk for row in article_rows])
+
+    # bulk_create skips the signals that keep the category registry current.
+    category_registry.invalidate_local()
+    transaction.on_commit(category_registry.bump_version)
+
+    return {
+        "categories": len(cats),
+        "articles": len(article_rows),
+        "resources": len(resource_rows),
+        "magazine_issues": len(issue_rows),
+        "popular_articles": popular,
+    }
+
+
+def seed_users(count=20, prefix="bench-user", password=None):
+    """
+    Users sharing one password hash (unusable unless ``password`` is given,
+    so seeding pays the hashing cost at most once). Returns the users.
+    """
+    encoded = make_password(password)
+    return User.objects.bulk_create(
+        User(username=f"{prefix}-{i}", email=f"{prefix}-{i}@example.org", password=encoded)
+        for i in range(count)
+    )
+
+
+def seed_community(users, collaborations=100, contributions=200, founders=200, seed=0):
+    """
+    Collaborations, contributions and founders-list signups spread over
+    the given users. Returns the row counts.
+    """
+    rng = random.Random(seed)
+    Collaboration.objects.bulk_create(
+        Collaboration(
+            name=f"Collaboration {_sentence(rng, 3)[:-1]} {i}",
+            description=_sentence(rng, 25),
+            organisation=f"Org {i % 37}",
+            growth_stage=rng.randint(1, 5),
+            user=rng.choice(users) if users and i % 3 else None,
+            is_active=i % 9 != 8,
+        )
+        for i in range(collaborations)
+    )
+    Contribution.objects.bulk_create(
+        Contribution(
+            user=rng.choice(users) if users and i % 2 else None,
+            contributor_name=None if i % 4 else f"Supporter {i}",
+            amount=Decimal(rng.randint(5, 500)),
+            source=rng.choice(Contribution.SOURCE_CHOICES)[0],
+            message=_sentence(rng, 10),
+        )
+        for i in range(contributions)
+    )
+    FoundersList.objects.bulk_create(
+        FoundersList(email=f"founder-{i}@example.org") for i in range(founders)
+    )
+    # bulk_create skips the signals that keep the rollups current.
+    rollups.rebuild()
+    return {
+        "collaborations": collaborations,
+        "contributions": contributions,
+        "founders": founders,
+    }
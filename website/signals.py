@@ -0,0 +1,199 @@
+"""
+Keep pre-built artefacts in step with content changes:
+
+- sitemaps and feeds (``website.syndication``): the shard, index and feeds
+  the changed row belongs to, rebuilt after the response is sent;
+- pre-rendered pages (``website.prerender``): every page that shows the
+  changed row, when ``PRERENDER_PAGES`` is on, re-rendered after the
+  response is sent;
+- contribution and collaboration rollups (``website.rollups``);
+- article category labels (``website.projections``);
+- the in-process category registry (``website.category_registry``).
+
+File rebuilds run after the transaction commits; rollups are updated
+inside it.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import category_registry, prerender, projections, rollups, syndication
+from .models import Article, Category, Collaboration, Contribution, MagazineIssue, PopularArticle, Resource
+
+SECTIONS = {
+    Article: "articles",
+    MagazineIssue: "magazine",
+}
+
+
+# ===========================
+# SITEMAPS & FEEDS
+# ===========================
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=MagazineIssue)
+@receiver(post_delete, sender=MagazineIssue)
+def rebuild_syndication(sender, instance, **kwargs):
+    if kwargs.get("raw"):
+        return  # loaddata
+    syndication.schedule(SECTIONS[sender], instance.pk)
+
+
+# ===========================
+# PRE-RENDERED PAGES
+# ===========================
+def _pages_for(instance, old_slug=None):
+    if isinstance(instance, Article):
+        return prerender.pages_for_article(instance, old_slug)
+    if isinstance(instance, MagazineIssue):
+        return prerender.pages_for_issue(instance, old_slug)
+    if isinstance(instance, Category):
+        return prerender.pages_for_category(instance)
+    return prerender.pages_for_resource(instance)
+
+
+@receiver(pre_save, sender=Article)
+@receiver(pre_save, sender=MagazineIssue)
+def remember_slug(sender, instance, raw=False, **kwargs):
+    # A renamed slug leaves a page behind at the old URL; note it so it is removed.
+    if settings.PRERENDER_PAGES and not raw and instance.pk:
+        instance._prerender_old_slug = (
+            sender.objects.filter(pk=instance.pk).values_list("slug", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=MagazineIssue)
+@receiver(post_save, sender=Resource)
+@receiver(pre_delete, sender=Article)
+@receiver(pre_delete, sender=MagazineIssue)
+@receiver(pre_delete, sender=Resource)
+def rerender_pages(sender, instance, raw=False, **kwargs):
+    # pre_delete, not post_delete: related articles are found through
+    # category links that the delete removes.
+    if settings.PRERENDER_PAGES and not raw:
+        prerender.schedule(_pages_for(instance, getattr(instance, "_prerender_old_slug", None)))
+
+
+@receiver(m2m_changed, sender=Article.categories.through)
+@receiver(m2m_changed, sender=MagazineIssue.categories.through)
+@receiver(m2m_changed, sender=Resource.categories.through)
+def rerender_category_pages(sender, instance, action, **kwargs):
+    # Before removals (old related articles) and after additions (new ones).
+    if settings.PRERENDER_PAGES and action in ("pre_remove", "pre_clear", "post_add"):
+        prerender.schedule(_pages_for(instance))
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def rerender_category(sender, instance, raw=False, **kwargs):
+    if settings.PRERENDER_PAGES and not raw:
+        prerender.schedule(prerender.pages_for_category(instance))
+
+
+@receiver(post_save, sender=PopularArticle)
+@receiver(post_delete, sender=PopularArticle)
+def rerender_popular(sender, raw=False, **kwargs):
+    if settings.PRERENDER_PAGES and not raw:
+        prerender.schedule(prerender.pages_for_popular())
+
+
+# ===========================
+# ROLLUPS
+# ===========================
+@receiver(pre_save, sender=Contribution)
+@receiver(pre_save, sender=Collaboration)
+def remember_rollup_key(sender, instance, raw=False, **kwargs):
+    # The rollup row the instance counted towards before this save.
+    if raw or not instance.pk:
+        return
+    old = sender.objects.filter(pk=instance.pk).first()
+    if sender is Contribution:
+        instance._rollup_old_key = rollups.contribution_key(old)
+    else:
+        instance._rollup_old_key = old.growth_stage if old else None
+
+
+@receiver(post_save, sender=Contribution)
+def update_contribution_rollup(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        old_key = None if created else getattr(instance, "_rollup_old_key", None)
+        rollups.move_contribution(old_key, rollups.contribution_key(instance))
+
+
+@receiver(post_delete, sender=Contribution)
+def remove_contribution_rollup(sender, instance, **kwargs):
+    rollups.add_contribution(rollups.contribution_key(instance), -1)
+
+
+@receiver(post_save, sender=Collaboration)
+def update_collaboration_rollup(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        old_stage = None if created else getattr(instance, "_rollup_old_key", None)
+        rollups.move_collaboration(old_stage, instance.growth_stage)
+
+
+@receiver(post_delete, sender=Collaboration)
+def remove_collaboration_rollup(sender, instance, **kwargs):
+    rollups.add_collaboration(instance.growth_stage, -1)
+
+
+# ===========================
+# ARTICLE CATEGORY LABELS
+# ===========================
+@receiver(m2m_changed, sender=Article.categories.through)
+def relabel_linked_articles(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            projections.refresh_category_labels(Article, [instance.pk])
+    elif action == "pre_clear":
+        instance._relabel_articles = list(instance.article_set.values_list("pk", flat=True))
+    elif action in ("post_add", "post_remove"):
+        projections.refresh_category_labels(Article, pk_set)
+    elif action == "post_clear":
+        projections.refresh_category_labels(Article, instance.__dict__.pop("_relabel_articles", []))
+
+
+@receiver(post_save, sender=Category)
+def relabel_renamed_category(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        projections.refresh_category_labels(Article, instance.article_set.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_articles(sender, instance, **kwargs):
+    instance._relabel_articles = list(instance.article_set.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def relabel_after_category_delete(sender, instance, **kwargs):
+    projections.refresh_category_labels(Article, instance.__dict__.pop("_relabel_articles", []))
+
+
+# ===========================
+# CATEGORY REGISTRY
+# ===========================
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=MagazineIssue)
+@receiver(post_delete, sender=MagazineIssue)
+@receiver(post_save, sender=Resource)
+@receiver(post_delete, sender=Resource)
+def category_registry_changed(sender, raw=False, **kwargs):
+    if raw:
+        return
+    # This worker rereads at once; the others once the change is committed.
+    category_registry.invalidate_local()
+    transaction.on_commit(category_registry.bump_version)
+
+
+@receiver(m2m_changed, sender=Article.categories.through)
+@receiver(m2m_changed, sender=MagazineIssue.categories.through)
+@receiver(m2m_changed, sender=Resource.categories.through)
+def category_links_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        category_registry_changed(sender)
@@ -0,0 +1,73 @@
+"""
+Sitemaps for the public site, rendered to files by ``website.syndication``.
+
+Content sitemaps are sharded by primary-key range (``SITEMAP_SHARD_SIZE``
+ids per shard) rather than by position, so saving one article only
+changes the shard that holds it.
+"""
+
+from django.conf import settings
+from django.contrib.sitemaps import Sitemap
+from django.urls import reverse
+
+from .models import Article, MagazineIssue
+
+
+class StaticViewSitemap(Sitemap):
+    changefreq = "weekly"
+    priority = 0.6
+
+    def items(self):
+        return [
+            "website:home",
+            "website:about",
+            "website:contact",
+            "website:news",
+            "website:insights",
+            "website:knowledge",
+            "website:magazine",
+        ]
+
+    def location(self, item):
+        return reverse(item)
+
+
+class ShardedSitemap(Sitemap):
+    model = None
+    changefreq = "weekly"
+
+    def __init__(self, shard=0):
+        self.shard = shard
+        self.limit = settings.SITEMAP_SHARD_SIZE
+
+    def queryset(self):
+        return self.model.objects.filter(is_published=True)
+
+    def items(self):
+        start = self.shard * self.limit
+        return (
+            self.queryset()
+            .filter(pk__gte=start, pk__lt=start + self.limit)
+            .only("pk", "slug", "updated_at")
+            .order_by("pk")
+        )
+
+    def lastmod(self, item):
+        return item.updated_at
+
+
+class ArticleSitemap(ShardedSitemap):
+    model = Article
+    priority = 0.8
+
+
+class MagazineIssueSitemap(ShardedSitemap):
+    model = MagazineIssue
+    priority = 0.7
+
+
+# Section name in the file name -> sitemap class.
+SHARDED_SITEMAPS = {
+    "articles": ArticleSitemap,
+    "magazine": MagazineIssueSitemap,
+}
@@ -0,0 +1,33 @@
+// Typeahead for inputs marked with data-autocomplete="<suggestions URL>".
+// Suggestions fill a <datalist>, so the browser renders and keys them.
+document.addEventListener('DOMContentLoaded', function () {
+  document.querySelectorAll('input[data-autocomplete]').forEach(function (input, i) {
+    const list = document.createElement('datalist');
+    list.id = 'autocomplete-list-' + i;
+    input.setAttribute('list', list.id);
+    input.setAttribute('autocomplete', 'off');
+    input.after(list);
+
+    let timer = null;
+    let controller = null;
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      const q = input.value.trim();
+      if (q.length < 2) { list.replaceChildren(); return; }
+      timer = setTimeout(function () {
+        if (controller) controller.abort();
+        controller = new AbortController();
+        fetch(input.dataset.autocomplete + '?q=' + encodeURIComponent(q), { signal: controller.signal })
+          .then(function (response) { return response.ok ? response.json() : { results: [] }; })
+          .then(function (data) {
+            list.replaceChildren(...data.results.map(function (value) {
+              const option = document.createElement('option');
+              option.value = value;
+              return option;
+            }));
+          })
+          .catch(function () {});
+      }, 150);
+    });
+  });
+});
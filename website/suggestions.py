@@ -0,0 +1,21 @@
+"""
+Typeahead sources for the public pages (``callsoso.autocomplete``):
+published article and magazine issue titles, and category names.
+"""
+
+from callsoso import autocomplete
+
+from .models import Article, Category, MagazineIssue
+
+
+def _published_titles(model):
+    return lambda: model.objects.filter(is_published=True).values_list("title", flat=True).iterator()
+
+
+autocomplete.register("articles", _published_titles(Article))
+autocomplete.register("issues", _published_titles(MagazineIssue))
+autocomplete.register("categories", lambda: Category.objects.values_list("name", flat=True).iterator())
+
+autocomplete.track(Article, "articles", "title", visible=lambda article: article.is_published)
+autocomplete.track(MagazineIssue, "issues", "title", visible=lambda issue: issue.is_published)
+autocomplete.track(Category, "categories", "name")
@@ -0,0 +1,207 @@
+"""
+Pre-built sitemaps and feeds.
+
+Everything under ``settings.SYNDICATION_ROOT`` is generated here and served
+as static files by ``views.sitemap_index`` / ``sitemap_section`` / ``feed``:
+
+    sitemap.xml                   index of every file below
+    sitemap-static.xml            fixed pages
+    sitemap-articles-<n>.xml      one per SITEMAP_SHARD_SIZE article ids
+    sitemap-magazine-<n>.xml      one per SITEMAP_SHARD_SIZE issue ids
+    feeds/news.rss, news.atom, magazine.rss, magazine.atom
+
+A save or delete (``website.signals``) only marks the shard holding the
+changed row as pending once the transaction commits. The marked shards,
+the index and their sections' feeds are rebuilt once per request, after
+the response has gone out, or straight away outside a request
+(``callsoso.deferred``); a failure is logged and never reaches the
+request that saved. ``build_all``
+regenerates everything and ``build_pending`` whatever is still marked
+(``manage.py build_syndication [--pending]``).
+"""
+
+import io
+import logging
+import os
+import tempfile
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.sitemaps.views import SitemapIndexItem
+from django.db import transaction
+from django.db.models import F, Max
+from django.http import HttpRequest
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from callsoso import deferred
+
+from .feeds import FEEDS
+from .sitemaps import SHARDED_SITEMAPS, StaticViewSitemap
+
+logger = logging.getLogger(__name__)
+
+PENDING_DIR = ".pending"  # one empty marker file per "<section>-<shard>" to rebuild
+
+CONTENT_TYPES = {
+    ".xml": "application/xml; charset=utf-8",
+    ".rss": "application/rss+xml; charset=utf-8",
+    ".atom": "application/atom+xml; charset=utf-8",
+}
+
+
+class _BuildRequest(HttpRequest):
+    """Stand-in request so feeds build absolute links for the public site."""
+
+    def __init__(self):
+        super().__init__()
+        self.META = {"HTTP_HOST": settings.SITE_DOMAIN, "SERVER_PORT": "443"}
+
+    def _get_scheme(self):
+        return settings.SITE_PROTOCOL
+
+
+# ===========================
+# FILES
+# ===========================
+def file_path(name):
+    return settings.SYNDICATION_ROOT / name
+
+
+def _write(name, content):
+    # Write-then-rename so concurrent readers never see a partial file.
+    path = file_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "wb") as handle:
+        handle.write(content)
+    os.replace(tmp, path)
+
+
+def _absolute(path):
+    return f"{settings.SITE_PROTOCOL}://{settings.SITE_DOMAIN}{path}"
+
+
+# ===========================
+# SITEMAPS
+# ===========================
+def _render_sitemap(sitemap):
+    site = SimpleNamespace(domain=settings.SITE_DOMAIN)
+    urls = sitemap.get_urls(site=site, protocol=settings.SITE_PROTOCOL)
+    return render_to_string("sitemap.xml", {"urlset": urls}).encode("utf-8")
+
+
+def _shards(section):
+    """``{shard: last modified}`` for every non-empty shard of ``section``."""
+    sitemap_class = SHARDED_SITEMAPS[section]
+    rows = (
+        sitemap_class().queryset()
+        .order_by()
+        .annotate(shard=F("pk") / settings.SITEMAP_SHARD_SIZE)
+        .values("shard")
+        .annotate(last_mod=Max("updated_at"))
+    )
+    return {row["shard"]: row["last_mod"] for row in rows}
+
+
+def build_sitemap_shard(section, shard):
+    sitemap = SHARDED_SITEMAPS[section](shard)
+    name = f"sitemap-{section}-{shard}.xml"
+    if sitemap.items().exists():
+        _write(name, _render_sitemap(sitemap))
+    else:
+        file_path(name).unlink(missing_ok=True)
+
+
+def build_static_sitemap():
+    _write("sitemap-static.xml", _render_sitemap(StaticViewSitemap()))
+
+
+def build_sitemap_index():
+    items = [SitemapIndexItem(_absolute(reverse("website:sitemap_section", args=["static"])), None)]
+    for section in SHARDED_SITEMAPS:
+        for shard, last_mod in sorted(_shards(section).items()):
+            location = reverse("website:sitemap_section", args=[f"{section}-{shard}"])
+            items.append(SitemapIndexItem(_absolute(location), last_mod))
+    _write("sitemap.xml", render_to_string("sitemap_index.xml", {"sitemaps": items}).encode("utf-8"))
+
+
+# ===========================
+# FEEDS
+# ===========================
+def build_feeds(section):
+    request = _BuildRequest()
+    for name, feed_class in FEEDS[section].items():
+        request.path = reverse("website:feed", args=[name])
+        buffer = io.BytesIO()
+        feed_class().get_feed(None, request).write(buffer, "utf-8")
+        _write(f"feeds/{name}", buffer.getvalue())
+
+
+# ===========================
+# PENDING CHANGES
+# ===========================
+def schedule(section, pk):
+    """Mark the shard holding row ``pk`` of ``section`` once the current transaction commits."""
+    change = (section, pk // settings.SITEMAP_SHARD_SIZE)
+
+    def changed():
+        mark_pending({change})
+        deferred.after_response(build_pending)
+
+    transaction.on_commit(changed, robust=True)
+
+
+def mark_pending(changes):
+    pending = file_path(PENDING_DIR)
+    pending.mkdir(parents=True, exist_ok=True)
+    for section, shard in changes:
+        (pending / f"{section}-{shard}").touch()
+
+
+def build_pending():
+    """Rebuild every marked shard, the index and the marked sections' feeds; returns the shard count."""
+    pending = file_path(PENDING_DIR)
+    changes = set()
+    for marker in pending.glob("*-*") if pending.is_dir() else ():
+        # Unmark before building: a change committed meanwhile marks it again.
+        marker.unlink(missing_ok=True)
+        section, shard = marker.name.rsplit("-", 1)
+        changes.add((section, int(shard)))
+    if not changes:
+        return 0
+    for section, shard in sorted(changes):
+        build_sitemap_shard(section, shard)
+    build_sitemap_index()
+    for section in sorted({section for section, _ in changes}):
+        build_feeds(section)
+    return len(changes)
+
+
+# ===========================
+# ENTRY POINTS
+# ===========================
+def build_all():
+    # Everything is rebuilt below, so nothing marked before now stays pending.
+    for marker in file_path(PENDING_DIR).glob("*-*"):
+        marker.unlink(missing_ok=True)
+    build_static_sitemap()
+    for section in SHARDED_SITEMAPS:
+        shards = _shards(section)
+        for shard in shards:
+            build_sitemap_shard(section, shard)
+        # Drop shards left over from deleted rows or a smaller shard size.
+        for path in settings.SYNDICATION_ROOT.glob(f"sitemap-{section}-*.xml"):
+            if int(path.stem.rsplit("-", 1)[1]) not in shards:
+                path.unlink()
+        build_feeds(section)
+    build_sitemap_index()
+    logger.info("Rebuilt sitemaps and feeds in %s", settings.SYNDICATION_ROOT)
+
+
+def ensure_built(name):
+    """Path of a pre-built file, building everything first if it is missing."""
+    path = file_path(name)
+    if not path.exists() and not settings.SYNDICATION_ROOT.joinpath("sitemap.xml").exists():
+        build_all()
+    return path
@@ -0,0 +1,36 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from callsoso.assets import SHARED_BUNDLE, load_bundle_manifest
+
+register = template.Library()
+
+
+@register.simple_tag
+def stylesheet_bundle(name):
+    """
+    Link the shared minified stylesheet bundle and the one for a page
+    family, preceded by preload hints for the fonts they reference.
+
+    Falls back to the individual source stylesheets in DEBUG or when
+    collectstatic has not built the bundles yet.
+    """
+    names = list(dict.fromkeys([SHARED_BUNDLE, name]))
+    manifest = load_bundle_manifest()
+    entries = [manifest.get(bundle) for bundle in names]
+    if settings.DEBUG or None in entries:
+        return format_html_join(
+            "\n", '<link rel="stylesheet" href="{}">',
+            ((static(path),) for bundle in names for path in settings.STATIC_BUNDLES[bundle]),
+        )
+
+    links = [
+        format_html('<link rel="preload" href="{}" as="{}" crossorigin>', static(path), kind)
+        for entry in entries
+        for path, kind in entry["preload"]
+    ]
+    links += [format_html('<link rel="stylesheet" href="{}">', static(entry["file"])) for entry in entries]
+    return mark_safe("\n".join(links))
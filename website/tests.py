@@ -1,3 +1,842 @@
-from django.test import TestCase
+import http.client
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.management import call_command
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+
+from callsoso import deferred, loadtest
+from callsoso.assets import load_bundle_manifest, minify_css, rebase_urls
+from callsoso.autocomplete import PrefixIndex
+from callsoso.cache import TwoTierCache, get_or_compute
+from callsoso.instrumentation import RequestMetrics
+from callsoso.testing import TEST_STORAGES, QueryBudgetTestCase
+
+from . import category_registry, founders, prerender, rollups, syndication, throttling
+from .models import (
+    Article,
+    Category,
+    Collaboration,
+    CollaborationRollup,
+    Contribution,
+    ContributionRollup,
+    FoundersList,
+    MagazineIssue,
+    PopularArticle,
+)
+from .rendering import render
+from .seeding import seed_community, seed_content, seed_users
+from .views import JINJA2_TEMPLATES
+
+
+def seed_budget_data(test, scale):
+    seed_content(
+        articles=10 * scale,
+        categories=3 * scale,
+        resources=5 * scale,
+        issues=3 * scale,
+        popular=5,
+        seed=scale,
+    )
+    seed_community(
+        seed_users(2 * scale),
+        collaborations=5 * scale,
+        contributions=5 * scale,
+        founders=5 * scale,
+        seed=scale,
+    )
+
+
+class QueryBudgetMixin:
+    seed_func = seed_budget_data
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser("budget-staff", "staff@example.org", None)
+
+
+class PublicViewQueryBudgetTests(QueryBudgetMixin, QueryBudgetTestCase):
+    def test_home(self):
+        self.assertQueryBudget(reverse("website:home"), 1)
+
+    def test_news(self):
+        self.assertQueryBudget(reverse("website:news"), 6)
+
+    def test_article_detail(self):
+        self.assertQueryBudget(reverse("website:article_detail", args=["bench-article-0"]), 3)
+
+    def test_insights(self):
+        # Cold: includes loading the category registry.
+        self.assertQueryBudget(reverse("website:insights"), 3)
+
+    def test_knowledge_center(self):
+        self.assertQueryBudget(reverse("website:knowledge"), 5)
+
+    def test_magazine(self):
+        # Freshness (2), the issues in one query, the category registry, popular articles.
+        self.assertQueryBudget(reverse("website:magazine"), 5)
+
+
+class MemberViewQueryBudgetTests(QueryBudgetMixin, QueryBudgetTestCase):
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_impact_tracker(self):
+        self.assertQueryBudget(reverse("website:impact_tracker"), 5)
+
+    def test_support(self):
+        self.assertQueryBudget(reverse("website:support"), 4)
+
+
+class AdminChangelistQueryBudgetTests(QueryBudgetMixin, QueryBudgetTestCase):
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_article_changelist(self):
+        self.assertQueryBudget(reverse("admin:website_article_changelist"), 8)
+
+    def test_resource_changelist(self):
+        self.assertQueryBudget(reverse("admin:website_resource_changelist"), 6)
+
+    def test_contribution_changelist(self):
+        self.assertQueryBudget(reverse("admin:website_contribution_changelist"), 5)
+
+
+@override_settings(FOUNDERS_BUFFER_SIZE=3, FOUNDERS_FLUSH_SECONDS=60)
+class FoundersSignupTests(TestCase):
+    def tearDown(self):
+        founders.flush()
+
+    def test_signups_are_normalised_buffered_and_deduplicated(self):
+        FoundersList.objects.create(email="existing@example.org")
+        self.assertFalse(founders.add_signup("not-an-email"))
+        with self.assertNumQueries(0):
+            self.assertTrue(founders.add_signup("  New@Example.org "))
+            self.assertTrue(founders.add_signup("new@example.org"))
+            self.assertTrue(founders.add_signup("EXISTING@example.org"))
+        with self.assertNumQueries(1):
+            self.assertTrue(founders.add_signup("other@example.org"))
+        self.assertEqual(
+            sorted(FoundersList.objects.values_list("email", flat=True)),
+            ["existing@example.org", "new@example.org", "other@example.org"],
+        )
+
+    @override_settings(FOUNDERS_FLUSH_SECONDS=0.01)
+    def test_a_partial_buffer_is_flushed_on_a_timer(self):
+        flushed = threading.Event()
+        with mock.patch.object(founders, "flush", side_effect=lambda: flushed.set()):
+            self.assertTrue(founders.add_signup("early@example.org"))
+            self.assertTrue(flushed.wait(5))
+
+    @override_settings(STORAGES=TEST_STORAGES, PERFORMANCE_INSTRUMENTATION=False)
+    def test_admin_csv_export_streams(self):
+        FoundersList.objects.bulk_create(FoundersList(email=f"f{i}@example.org") for i in range(5))
+        self.client.force_login(User.objects.create_superuser("staff", "staff@example.org", None))
+        response = self.client.get(reverse("admin:website_founderslist_export"))
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "email,joined")
+        self.assertEqual(len(lines), 6)
+
+
+@override_settings(
+    STORAGES=TEST_STORAGES,
+    PERFORMANCE_INSTRUMENTATION=False,
+    THROTTLE_ENABLED=True,
+    THROTTLE_RATES={"login:ip": "4/m", "login:username": "2/m", "contact:ip": "1/m"},
+)
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_over_limit_login_is_rejected_before_hashing(self):
+        url = reverse("login")
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, {"username": "Alice", "password": "x"}).status_code, 200)
+        with mock.patch("django.contrib.auth.hashers.PBKDF2PasswordHasher.encode") as encode:
+            response = self.client.post(url, {"username": "alice ", "password": "x"})
+        encode.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        # Another username still has IP budget left; the IP bucket is then empty.
+        self.assertEqual(self.client.post(url, {"username": "bob", "password": "x"}).status_code, 200)
+        self.assertEqual(self.client.post(url, {"username": "carol", "password": "x"}).status_code, 429)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_bucket_refills(self):
+        bucket = throttling.TokenBucket("2/m")
+        self.assertEqual(bucket.consume("k", now=0), 0)
+        self.assertEqual(bucket.consume("k", now=0), 0)
+        self.assertAlmostEqual(bucket.consume("k", now=0), 30)
+        self.assertEqual(bucket.consume("k", now=30), 0)
+
+    def test_falls_back_to_local_memory(self):
+        shared = caches[settings.THROTTLE_CACHE]
+        with mock.patch.object(shared, "get", side_effect=ConnectionError), mock.patch.object(
+            shared, "set", side_effect=ConnectionError
+        ):
+            data = {"email": "a@example.org", "message": "hi"}
+            with self.assertLogs("website.throttling", "WARNING"):
+                self.assertEqual(self.client.post(reverse("website:contact"), data).status_code, 302)
+                self.assertEqual(self.client.post(reverse("website:contact"), data).status_code, 429)
+
+
+class RollupTests(TestCase):
+    def snapshot(self):
+        return (
+            sorted(ContributionRollup.objects.filter(contribution_count__gt=0).values_list(
+                "source", "month", "total_amount", "contribution_count"
+            )),
+            sorted(CollaborationRollup.objects.filter(collaboration_count__gt=0).values_list(
+                "growth_stage", "collaboration_count"
+            )),
+        )
+
+    def test_incremental_updates_match_a_full_rebuild(self):
+        first = Contribution.objects.create(source="donation", amount=Decimal("10.00"))
+        second = Contribution.objects.create(source="grant", amount=Decimal("25.50"))
+        Contribution.objects.create(source="donation", amount=None)
+        first.source, first.amount = "grant", Decimal("12.00")
+        first.save()
+        second.delete()
+        seed = Collaboration.objects.create(name="Seed", description="x")
+        Collaboration.objects.create(name="Tree", description="x", growth_stage=5)
+        seed.growth_stage = 3
+        seed.save()
+
+        incremental = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(rollups.stage_summary()["stage_3"], 1)
+        self.assertEqual(rollups.contribution_summary()["total"], Decimal("12.00"))
+
+
+@override_settings(STORAGES=TEST_STORAGES, PERFORMANCE_INSTRUMENTATION=False, PRERENDER_PAGES=False)
+class FreshnessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.plastics = Category.objects.create(name="Plastics")
+        cls.article = Article.objects.create(title="Bottles", slug="bottles", body="<p>PET</p>")
+        cls.article.categories.add(cls.plastics)
+        MagazineIssue.objects.create(title="Spring", slug="spring")
+        cls.user = User.objects.create_user("member", password="pw")
+
+    def setUp(self):
+        cache.clear()
+        category_registry.invalidate_local()
+        self.urls = [reverse("website:news"), reverse("website:magazine"), self.article.get_absolute_url()]
+
+    def test_unchanged_pages_answer_304(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn("Last-Modified", response)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_deletes_are_not_answered_304(self):
+        Article.objects.create(title="Cans", slug="cans", body="<p>Tin</p>")
+        url = reverse("website:news")
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Article.objects.get(slug="cans").delete()
+        # The newest updated_at is unchanged, so a date check alone would say 304.
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date()).status_code, 200)
+
+    def test_anonymous_pages_are_public_and_member_pages_private(self):
+        anonymous = {url: self.client.get(url) for url in self.urls}
+        self.client.force_login(self.user)
+        for url in self.urls:
+            with self.subTest(url=url):
+                public, private = anonymous[url], self.client.get(url)
+                self.assertIn("public", public["Cache-Control"])
+                self.assertIn(f"s-maxage={settings.CONTENT_CACHE_S_MAXAGE}", public["Cache-Control"])
+                self.assertIn("private", private["Cache-Control"])
+                self.assertNotIn("public", private["Cache-Control"])
+                self.assertIn("Cookie", public["Vary"])
+                self.assertIn("Cookie", private["Vary"])
+                # A shared cache must never answer a member with the anonymous copy.
+                self.assertNotEqual(public["ETag"], private["ETag"])
+
+    def test_category_link_changes_move_the_article_etag(self):
+        url = self.article.get_absolute_url()
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.categories.add(Category.objects.create(name="Glass"))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(STORAGES=TEST_STORAGES, PERFORMANCE_INSTRUMENTATION=False)
+class CategoryRegistryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category_registry.invalidate_local()
+
+    def test_warm_pages_do_not_query_categories(self):
+        Category.objects.create(name="Plastics")
+        self.client.get(reverse("website:magazine"))
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse("website:magazine") + "?category=plastics")
+        self.assertContains(response, "Plastics")
+        self.assertFalse([q["sql"] for q in captured.captured_queries if '"website_category"' in q["sql"]])
+
+    def test_changes_bump_the_shared_version(self):
+        plastics = Category.objects.create(name="Plastics")
+        self.assertEqual(category_registry.get().by_slug["plastics"].article_count, 0)
+        stale = category_registry.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(title="Bottles", slug="bottles", body="x")
+            article.categories.add(plastics)
+        # Another worker holding the old copy sees the new stamp and reloads.
+        self.assertNotEqual(category_registry.current_version(), stale.version)
+        self.assertEqual(category_registry.get().by_slug["plastics"].article_count, 1)
+
+
+@override_settings(STORAGES=TEST_STORAGES, PERFORMANCE_INSTRUMENTATION=False)
+class ArticleRenderingTests(TestCase):
+    def test_body_is_sanitized_with_a_table_of_contents(self):
+        article = Article.objects.create(title="Boards", body=(
+            '<h2>Sourcing</h2><p onclick="x()">Ask <a href="javascript:alert(1)">here</a>'
+            '<script>steal()</script></p><img src="/oak.jpg"><h2>Sourcing</h2>'
+        ))
+        self.assertEqual(article.body_html, (
+            '<h2 id="sourcing">Sourcing</h2><p>Ask <a>here</a></p>'
+            '<img src="/oak.jpg" loading="lazy" decoding="async"><h2 id="sourcing-2">Sourcing</h2>'
+        ))
+        self.assertEqual([entry["id"] for entry in article.toc], ["sourcing", "sourcing-2"])
+
+        response = self.client.get(article.get_absolute_url())
+        self.assertContains(response, '<a href="#sourcing-2">Sourcing</a>', html=True)
+        self.assertNotContains(response, "steal()")
+
+    def test_content_after_dropped_void_or_self_closing_tags_is_kept(self):
+        html, toc = render(
+            '<p>Intro</p><embed src="a.swf"><p>Middle</p><svg/><p>Rest</p>'
+            '<svg><text>drawn</text></svg><h2>Next</h2>'
+        )
+        self.assertEqual(html, '<p>Intro</p><p>Middle</p><p>Rest</p><h2 id="next">Next</h2>')
+        self.assertEqual([entry["id"] for entry in toc], ["next"])
+
+    def test_backfill_renders_stale_rows(self):
+        article = Article.objects.create(title="Boards", body="Plain text")
+        Article.objects.filter(pk=article.pk).update(body_html="", body_hash="")
+        call_command("render_articles", stdout=StringIO())
+        article.refresh_from_db()
+        self.assertEqual(article.body_html, "<p>Plain text</p>")
+
+
+@override_settings(PERFORMANCE_INSTRUMENTATION=False)
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_prefix_index(self):
+        index = PrefixIndex(["Greater Harare", "Harare", "Harare", "Bulawayo", "Hāra Works"])
+        self.assertEqual(index.complete("har"), ["Harare", "Hāra Works", "Greater Harare"])
+        index.discard("Harare")
+        self.assertIn("Harare", index.complete("har"))  # another row still has it
+        index.discard("Harare")
+        index.add("Harbour Lane")
+        self.assertEqual(index.complete("har"), ["Hāra Works", "Harbour Lane", "Greater Harare"])
+        self.assertEqual(index.complete(""), [])
+
+    def test_endpoint_follows_published_titles(self):
+        url = reverse("website:autocomplete", args=["issues"])
+        with self.captureOnCommitCallbacks(execute=True):
+            issue = MagazineIssue.objects.create(title="Circular Textiles", slug="textiles")
+            MagazineIssue.objects.create(title="Circular Draft", slug="draft", is_published=False)
+        self.assertEqual(self.client.get(url, {"q": "circ"}).json(), {"results": ["Circular Textiles"]})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            issue.title = "Textile Loops"
+            issue.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, {"q": "circ"}).json(), {"results": []})
+            self.assertEqual(self.client.get(url, {"q": "loo"}).json(), {"results": ["Textile Loops"]})
+
+    def test_directory_sources_need_login(self):
+        url = reverse("website:autocomplete", args=["locations"])
+        self.assertEqual(self.client.get(url, {"q": "ha"}).status_code, 403)
+        self.assertEqual(self.client.get(reverse("website:autocomplete", args=["nope"])).status_code, 404)
+
+
+class ArticleProjectionTests(TestCase):
+    def test_projections_follow_body_and_categories(self):
+        article = Article.objects.create(title="Boards", body="<p>Offcut &amp; oak " + "word " * 400 + "</p>")
+        self.assertTrue(article.teaser.startswith("Offcut & oak word"))
+        self.assertEqual(article.reading_time, 3)
+
+        oak, pine = Category.objects.create(name="Oak"), Category.objects.create(name="Pine")
+        article.categories.add(pine, oak)
+        article.refresh_from_db()
+        self.assertEqual(article.category_labels, "Oak / Pine")
+        pine.name = "Birch"
+        pine.save()
+        article.refresh_from_db()
+        self.assertEqual(article.category_labels, "Birch / Oak")
+        oak.delete()
+        article.refresh_from_db()
+        self.assertEqual(article.category_labels, "Birch")
+
+    def test_list_queries_do_not_read_body(self):
+        Article.objects.create(title="Boards", excerpt="Short.", body="Long " * 1000)
+        card = Article.objects.for_lists().get()
+        self.assertIn("body", card.get_deferred_fields())
+        self.assertEqual(card.teaser, "Short.")
+
+
+# response.context is only recorded for Django templates.
+@override_settings(STORAGES=TEST_STORAGES, PERFORMANCE_INSTRUMENTATION=False, WEBSITE_TEMPLATE_ENGINE="django")
+class MagazineListingTests(TestCase):
+    def test_cursor_pages_cover_every_regular_issue_once(self):
+        day = date(2024, 1, 1)
+        for i in range(30):
+            # Pairs share a date so the cursor has to break ties on id.
+            MagazineIssue.objects.create(
+                title=f"Issue {i}", slug=f"issue-{i}", published_date=day + timedelta(days=i // 2), is_featured=i % 5 == 0
+            )
+        featured = list(MagazineIssue.objects.filter(is_featured=True).order_by("-published_date", "-id")[:4])
+        expected = [issue for issue in MagazineIssue.objects.order_by("-published_date", "-id") if issue not in featured]
+
+        seen, url = [], reverse("website:magazine")
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.context["featured_issues"], featured)
+            seen += response.context["regular_issues"]
+            cursor = response.context["next_cursor"]
+            url = cursor and reverse("website:magazine") + f"?after={cursor}"
+        self.assertEqual(seen, expected)
+
+
+def page_content(html):
+    """The links and visible words of a page, for comparing two renders of it."""
+    html = re.sub(r"(?s)<(script|style)\b.*?</\1>", "", html)
+    return re.findall(r'href="([^"]*)"', html), re.sub(r"<[^>]+>", " ", html).split()
+
+
+@override_settings(
+    STORAGES=TEST_STORAGES,
+    PERFORMANCE_INSTRUMENTATION=False,
+    PRERENDER_PAGES=False,
+    TEMPLATES=[t for t in settings.TEMPLATES if t.get("NAME") != "jinja2"] + [settings.JINJA2_TEMPLATES_BACKEND],
+)
+class JinjaTemplateTests(TestCase):
+    PAGES = {
+        "website/news.html": "website:news",
+        "website/insights.html": "website:insights",
+        "website/knowledge_center.html": "website:knowledge",
+        "website/magazine.html": "website:magazine",
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_content(articles=12, resources=6, issues=10)
+
+    def test_every_port_is_covered(self):
+        self.assertEqual(set(self.PAGES), JINJA2_TEMPLATES)
+
+    def test_ports_render_the_same_content(self):
+        for template_name, view_name in self.PAGES.items():
+            with self.subTest(template_name):
+                rendered = {}
+                for engine in ("django", "jinja2"):
+                    with override_settings(WEBSITE_TEMPLATE_ENGINE=engine):
+                        response = self.client.get(reverse(view_name))
+                    self.assertEqual(response.status_code, 200)
+                    rendered[engine] = response
+                # Only the Django engine records its templates, so this shows which one ran.
+                self.assertEqual(rendered["django"].templates[0].name, template_name)
+                self.assertEqual(rendered["jinja2"].templates, [])
+                self.assertEqual(
+                    page_content(rendered["jinja2"].content.decode()),
+                    page_content(rendered["django"].content.decode()),
+                )
+
+
+class BenchTemplatesCommandTests(TestCase):
+    @override_settings(STORAGES=TEST_STORAGES)
+    def test_times_both_engines_and_rolls_back(self):
+        out = StringIO()
+        call_command("bench_templates", articles=5, resources=3, issues=3, repeat=1, stdout=out)
+        for page in ("news", "insights", "knowledge_center", "magazine"):
+            self.assertRegex(out.getvalue(), rf"\n{page} +[\d.]+ +[\d.]+ +[\d.]+x")
+        self.assertFalse(Article.objects.exists())
+
+
+class StaticAssetTests(SimpleTestCase):
+    def test_minifier_keeps_strings_descendant_selectors_and_calc(self):
+        css = """
+        /* dropped */
+        /*! kept */
+        .nav a :hover { color: red ; }
+        .box { width: calc(100% - 2rem); content: "a  ;  b"; }
+        """
+        self.assertEqual(
+            minify_css(css),
+            '/*! kept */ .nav a :hover{color:red}.box{width:calc(100% - 2rem);content:"a  ;  b"}',
+        )
+
+    def test_urls_are_rebased_to_the_bundle(self):
+        css, referenced = rebase_urls(
+            'a{background:url("../images/x.png")} b{src:url(/static/y.woff2)} c{mask:url(data:image/png;base64,AA)}',
+            "css/style.css", "bundles/site.css",
+        )
+        self.assertIn('url("../images/x.png")', css)
+        self.assertIn("url(/static/y.woff2)", css)
+        self.assertEqual(referenced, ["images/x.png"])
+
+    def test_collectstatic_builds_a_shared_bundle_and_one_per_page(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.addCleanup(load_bundle_manifest.cache_clear)
+        root = Path(scratch.name)
+        with override_settings(STATIC_ROOT=root, DEBUG=False):
+            with self.assertLogs("callsoso.assets", "WARNING"):  # images the stylesheets miss
+                call_command("collectstatic", interactive=False, verbosity=0, ignore_patterns=["admin"])
+            load_bundle_manifest.cache_clear()
+            manifest = load_bundle_manifest()
+            self.assertEqual(set(manifest), set(settings.STATIC_BUNDLES))
+            self.assertEqual(manifest["news"]["sources"], ["css/news.css"])
+            # Page bundles carry only their own rules; the shared CSS is in "site" alone.
+            news = (root / manifest["news"]["file"]).read_text()
+            site = (root / manifest["site"]["file"]).read_text()
+            self.assertNotIn(site[:200], news)
+
+            links = Template('{% load assets %}{% stylesheet_bundle "news" %}').render(Context())
+        hrefs = re.findall(r'<link rel="stylesheet" href="/static/bundles/(\w+)\.\w+\.css">', links)
+        self.assertEqual(hrefs, ["site", "news"])
+        self.assertNotIn('as="style"', links)
+
+    def test_pages_link_declared_bundles_only(self):
+        used = set()
+        for app in ("website", "directory"):
+            for template in (Path(settings.BASE_DIR) / app).glob("*/**/*.html"):
+                text = template.read_text(encoding="utf-8")
+                self.assertNotIn("extra_css", text, template)
+                used.update(re.findall(r'stylesheet_bundle[ (]"(\w+)"', text))
+        self.assertIn("magazine", used)
+        self.assertLessEqual(used, set(settings.STATIC_BUNDLES))
+
+    @override_settings(STORAGES=TEST_STORAGES, DEBUG=True)
+    def test_debug_links_the_source_stylesheets(self):
+        links = Template('{% load assets %}{% stylesheet_bundle "news" %}').render(Context())
+        self.assertEqual(
+            re.findall(r'href="([^"]+)"', links),
+            ["/static/css/style.css", "/static/css/base.css", "/static/css/news.css"],
+        )
+
+
+@override_settings(STORAGES=TEST_STORAGES, PERFORMANCE_INSTRUMENTATION=True, PRERENDER_PAGES=False)
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category_registry.invalidate_local()
+        for i in range(3):
+            Article.objects.create(title=f"Article {i}", slug=f"article-{i}", body="x")
+
+    def test_server_timing_and_log_line_count_the_queries(self):
+        with self.assertLogs("callsoso.performance", "INFO") as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse("website:news"))
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record["view"], "website:news")
+        self.assertEqual(record["status"], 200)
+        self.assertEqual(record["db_queries"], len(queries))
+        self.assertEqual(record["response_bytes"], len(response.content))
+        self.assertGreater(record["template_ms"], 0)
+
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, rf'^db;dur=[\d.]+;desc="{len(queries)} queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+
+    def test_repeated_query_shapes_are_flagged(self):
+        metrics = RequestMetrics()
+        for ids in ("%s", "%s, %s", "%s, %s, %s"):
+            metrics.record_query(f"SELECT * FROM t WHERE id IN ({ids})", 0.001)
+        metrics.record_query("SELECT * FROM u", 0.001)
+        self.assertEqual(metrics.query_count, 4)
+        self.assertEqual(metrics.repeated_queries(3), [{"count": 3, "sql": "SELECT * FROM t WHERE id IN (%s…)"}])
+        self.assertEqual(metrics.repeated_queries(4), [])
+
+    @override_settings(PERFORMANCE_INSTRUMENTATION=False)
+    def test_off_adds_no_header(self):
+        self.assertNotIn("Server-Timing", self.client.get(reverse("website:news")))
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_l1_is_a_bounded_lru(self):
+        backend = TwoTierCache("lru-test", {"OPTIONS": {"L2": "shared", "L1_MAX_ENTRIES": 2}})
+        backend.clear()
+        for key in ("a", "b"):
+            backend.set(key, key)
+        backend.get("a")  # "a" is now most recent; "b" is evicted next
+        backend.set("c", "c")
+        self.assertEqual(list(backend._l1), [backend.make_key("a"), backend.make_key("c")])
+        self.assertEqual(backend.get("b"), "b")  # still served from L2
+        self.assertGreaterEqual(backend._stats["l2_hits"], 1)
+
+    def test_only_one_thread_recomputes_a_cold_key(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_compute("stampede", compute, timeout=60)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["value"] * 8)
+        self.assertEqual(len(calls), 1)
+
+    def test_refreshes_before_expiry(self):
+        get_or_compute("early", lambda: "old", timeout=60)
+        value, delta, expiry = cache.get("early")
+        # A value that took long to compute is refreshed well before it expires.
+        cache.set("early", (value, 1000, expiry), 120)
+        with mock.patch("callsoso.cache.random.random", return_value=0.5):
+            self.assertEqual(get_or_compute("early", lambda: "new", timeout=60), "new")
+        self.assertEqual(get_or_compute("early", lambda: "newer", timeout=60), "new")
+
+    def test_file_backed_add_takes_a_lock_file(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        files = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": scratch.name}
+        with override_settings(CACHES={**settings.CACHES, "files": files}):
+            backend = TwoTierCache("file-lock-test", {"OPTIONS": {"L2": "files"}})
+            write = FileBasedCache.set
+
+            def slow_write(*args, **kwargs):
+                time.sleep(0.05)  # every unlocked add would pass has_key before the first write
+                return write(*args, **kwargs)
+
+            results = []
+            with mock.patch.object(FileBasedCache, "set", slow_write):
+                threads = [threading.Thread(target=lambda: results.append(backend.add("once", 1))) for _ in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            self.assertEqual(sorted(results), [False, False, False, True])
+
+            # A lock left by a worker that died holding it is broken.
+            lock = backend.l2._key_to_file("stale") + ".lock"
+            Path(lock).touch()
+            os.utime(lock, (time.time() - 60, time.time() - 60))
+            self.assertTrue(backend.add("stale", 1))
+            self.assertFalse(os.path.exists(lock))
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class BenchCommandTests(TestCase):
+    def test_drives_every_route(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = f"{tmp}/bench.json"
+            call_command(
+                "bench", articles=3, categories=2, resources=2, issues=3, users=2, listings=3, matches=2,
+                iterations=1, output=output, stdout=StringIO(),
+            )
+            with open(output, encoding="utf-8") as handle:
+                results = {row["view"]: row for row in json.load(handle)["results"]}
+        # /tiers/ renders directory/tiers.html, which the tree does not ship.
+        errors = {view: row["status"] for view, row in results.items() if row["status"] >= 500}
+        self.assertEqual(errors, {"website:tiers": 500})
+        for view in (
+            "website:article_detail", "website:magazine_detail", "website:autocomplete",
+            "website:sitemap", "website:sitemap_section", "website:feed", "website:impact_export",
+        ):
+            self.assertEqual(results[view]["status"], 200, view)
+            self.assertGreater(results[view]["response_bytes"], 0, view)
+
+    def test_runs_without_articles_or_issues(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = f"{tmp}/bench.json"
+            call_command(
+                "bench", articles=0, categories=1, resources=1, issues=0, users=1, listings=2, matches=1,
+                iterations=1, output=output, stdout=StringIO(),
+            )
+            with open(output, encoding="utf-8") as handle:
+                results = {row["view"]: row for row in json.load(handle)["results"]}
+        self.assertEqual(results["website:article_detail"]["status"], 404)
+        self.assertEqual(results["website:magazine_detail"]["status"], 404)
+
+
+class LoadTestTests(SimpleTestCase):
+    def test_malformed_responses_are_error_samples(self):
+        recorder = loadtest.Recorder()
+        recorder.start_measuring()
+        user = loadtest.VirtualUser(0, "127.0.0.1", 1, {"article_slugs": ["a"]}, recorder)
+        with mock.patch.object(loadtest.Session, "request", side_effect=http.client.IncompleteRead(b"")):
+            user.run({"browse": 1}, time.monotonic() + 0.05)
+        errors = [status for statuses in recorder.errors.values() for status in statuses]
+        self.assertEqual(set(errors), {"IncompleteRead"})
+
+
+class PrerenderTests(TestCase):
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.root = Path(scratch.name)
+        settings_override = override_settings(
+            STORAGES=TEST_STORAGES, PERFORMANCE_INSTRUMENTATION=False, PRERENDER_PAGES=True, PRERENDER_ROOT=self.root,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_saved_article_is_rendered_and_served_to_anonymous_visitors(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(title="Oak Boards", slug="oak", body="<p>Offcuts</p>")
+        self.assertTrue((self.root / "news" / "oak" / "index.html").exists())
+        self.assertTrue((self.root / "news" / "oak" / "index.html.gz").exists())
+
+        response = self.client.get(article.get_absolute_url(), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("public", response["Cache-Control"])
+        response.close()
+        # A query string or a session falls through to the view.
+        self.assertFalse(self.client.get(article.get_absolute_url(), {"ref": "x"}).streaming)
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = "anything"
+        self.assertFalse(self.client.get(article.get_absolute_url()).streaming)
+
+    def test_pages_travel_with_their_transaction(self):
+        # Another transaction's commit must not render pages this one queued.
+        with self.captureOnCommitCallbacks():
+            prerender.schedule({"/about/"})
+        with self.captureOnCommitCallbacks(execute=True):
+            prerender.schedule({"/insights/"})
+        self.assertTrue((self.root / "insights" / "index.html").exists())
+        self.assertFalse((self.root / "about" / "index.html").exists())
+
+    def test_render_errors_stay_out_of_the_saving_request(self):
+        with mock.patch.object(prerender, "render_pages", side_effect=RuntimeError("boom")):
+            with self.assertLogs("callsoso.deferred", "ERROR"):
+                with self.captureOnCommitCallbacks(execute=True):
+                    prerender.schedule({"/about/"})
+
+    def test_rendering_leaves_the_current_request_alone(self):
+        later = mock.Mock(__qualname__="later")
+        deferred.start_request()
+        deferred.after_response(later)
+        self.assertEqual(prerender.render_pages({"/about/"}), 1)
+        later.assert_not_called()
+        deferred.finish_request()
+        later.assert_called_once_with()
+
+    def test_popular_articles_refresh_the_magazine_page(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            PopularArticle.objects.create(title="Most read", url="https://example.org/read")
+        self.assertTrue((self.root / "magazine" / "index.html").exists())
+
+
+class AdminSaveRebuildTests(TransactionTestCase):
+    """Real commits, so the rebuilds run where production runs them: after the admin response."""
+
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.root = Path(scratch.name)
+        settings_override = override_settings(
+            STORAGES=TEST_STORAGES,
+            PERFORMANCE_INSTRUMENTATION=False,
+            PRERENDER_PAGES=True,
+            PRERENDER_ROOT=self.root / "prerendered",
+            SYNDICATION_ROOT=self.root / "syndication",
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(User.objects.create_superuser("editor", "editor@example.org", None))
+
+    def test_saved_article_reaches_the_feed_and_its_pre_rendered_page(self):
+        with mock.patch.object(prerender, "render_pages", side_effect=prerender.render_pages) as render_pages:
+            response = self.client.post(reverse("admin:website_article_add"), {
+                "title": "Oak Boards", "slug": "oak", "body": "<p>Offcuts</p>",
+                "published_date": "2024-01-02", "is_published": "on",
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("Oak Boards", (self.root / "syndication" / "feeds" / "news.rss").read_text())
+        self.assertFalse(any((self.root / "syndication" / syndication.PENDING_DIR).iterdir()))
+        self.assertTrue((self.root / "prerendered" / "news" / "oak" / "index.html").exists())
+        render_pages.assert_called_once()  # every page the save touched, in one pass
+
+
+class SyndicationTests(TestCase):
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.root = Path(scratch.name)
+        settings_override = override_settings(SYNDICATION_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def shard(self, article):
+        return self.root / f"sitemap-articles-{article.pk // settings.SITEMAP_SHARD_SIZE}.xml"
+
+    def test_saved_article_is_in_its_shard_and_the_feed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(title="Oak Boards", slug="oak", body="<p>Offcuts</p>")
+        self.assertIn(article.get_absolute_url(), self.shard(article).read_text())
+        self.assertIn(self.shard(article).name, (self.root / "sitemap.xml").read_text())
+        self.assertIn("Oak Boards", (self.root / "feeds" / "news.rss").read_text())
+
+    def test_saves_during_a_request_are_rebuilt_after_the_response(self):
+        deferred.start_request()
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Article.objects.create(title="Oak Boards", slug="oak", body="x")
+        with self.captureOnCommitCallbacks(execute=True):
+            second = Article.objects.create(title="Pine Boards", slug="pine", body="x")
+        self.assertFalse(self.shard(first).exists())
+        self.assertTrue(any((self.root / syndication.PENDING_DIR).iterdir()))
+
+        deferred.finish_request()
+        shard = self.shard(first).read_text()
+        self.assertIn(first.get_absolute_url(), shard)
+        self.assertIn(second.get_absolute_url(), shard)
+        self.assertFalse(any((self.root / syndication.PENDING_DIR).iterdir()))
+
+    def test_pending_command_catches_up(self):
+        with self.captureOnCommitCallbacks():  # committed, never rebuilt
+            article = Article.objects.create(title="Oak Boards", slug="oak", body="x")
+        syndication.mark_pending({("articles", article.pk // settings.SITEMAP_SHARD_SIZE)})
+        call_command("build_syndication", "--pending", stdout=StringIO())
+        self.assertIn(article.get_absolute_url(), self.shard(article).read_text())
+
+    def test_rebuild_errors_stay_out_of_the_saving_request(self):
+        with mock.patch.object(syndication, "build_pending", side_effect=RuntimeError("boom")):
+            with self.assertLogs("callsoso.deferred", "ERROR"):
+                with self.captureOnCommitCallbacks(execute=True):
+                    Article.objects.create(title="Oak Boards", slug="oak", body="x")
+            # After the response, a failure is logged rather than raised into the server.
+            deferred.start_request()
+            with self.captureOnCommitCallbacks(execute=True):
+                Article.objects.create(title="Pine Boards", slug="pine", body="x")
+            with self.assertLogs("callsoso.deferred", "ERROR"):
+                deferred.finish_request()
 
-# Create your tests here.
@@ -0,0 +1,128 @@
+"""
+Token-bucket throttling for expensive POST endpoints.
+
+Login and signup hash a password (PBKDF2, deliberately slow), contact and
+the founders form send mail or write rows, so a burst of POSTs to them can
+tie up every worker. ``@throttle(scope, fields=...)`` charges one token per
+POST to a bucket keyed by client IP (rate ``THROTTLE_RATES["<scope>:ip"]``)
+and one keyed by each named form field (``"<scope>:<field>"``) *before*
+the view runs, and answers 429 with Retry-After once a bucket is empty.
+
+Buckets are stored in the ``THROTTLE_CACHE`` cache. The update is
+read-modify-write, so concurrent requests on different workers can
+overdraw a bucket by a token or two; that is fine for flood control.
+If the cache backend fails, a process-local cache takes over.
+"""
+
+import hashlib
+import logging
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.shortcuts import render
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*([smhd])\s*$")
+
+_fallback = LocMemCache("throttle-fallback", {"OPTIONS": {"MAX_ENTRIES": 10000}})
+
+
+def parse_rate(rate):
+    """``"10/15m"`` -> ``(10, 900.0)``: bucket capacity and seconds to refill it."""
+    match = RATE_RE.match(rate)
+    if not match:
+        raise ValueError(f"Invalid throttle rate {rate!r}; expected e.g. '10/m' or '10/15m'")
+    count, multiplier, unit = match.groups()
+    return int(count), float(int(multiplier or 1) * PERIODS[unit])
+
+
+def client_ip(request):
+    """REMOTE_ADDR, or the address THROTTLE_PROXY_COUNT hops back in X-Forwarded-For."""
+    proxies = settings.THROTTLE_PROXY_COUNT
+    if proxies:
+        forwarded = [part.strip() for part in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if part.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+# ===========================
+# BUCKETS
+# ===========================
+class TokenBucket:
+    def __init__(self, rate):
+        self.capacity, period = parse_rate(rate)
+        self.refill_per_second = self.capacity / period
+        self.timeout = int(period) + 1
+
+    def consume(self, key, now=None):
+        """Take one token; returns 0 if allowed, else seconds until one is available."""
+        now = time.time() if now is None else now
+        tokens, stamp = self._get(key) or (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - stamp) * self.refill_per_second)
+        if tokens < 1:
+            return (1 - tokens) / self.refill_per_second
+        self._set(key, (tokens - 1, now))
+        return 0
+
+    def _get(self, key):
+        try:
+            return caches[settings.THROTTLE_CACHE].get(key)
+        except Exception:
+            logger.warning("Throttle cache unavailable; using process-local buckets", exc_info=True)
+            return _fallback.get(key)
+
+    def _set(self, key, value):
+        try:
+            caches[settings.THROTTLE_CACHE].set(key, value, self.timeout)
+        except Exception:
+            _fallback.set(key, value, self.timeout)
+
+
+def _bucket_key(scope, kind, value):
+    # Hashed so arbitrary user input is a safe (memcached) key.
+    digest = hashlib.sha256(value.encode("utf-8")).hexdigest()[:32]
+    return f"throttle:{scope}:{kind}:{digest}"
+
+
+def check(request, scope, fields=()):
+    """Charge every bucket for this request; returns the longest wait (0 if allowed)."""
+    keys = [("ip", client_ip(request))]
+    keys += [(field, request.POST.get(field, "").strip().lower()) for field in fields]
+    wait = 0
+    for kind, value in keys:
+        rate = settings.THROTTLE_RATES.get(f"{scope}:{kind}")
+        if not rate or not value:
+            continue
+        wait = max(wait, TokenBucket(rate).consume(_bucket_key(scope, kind, value)))
+    return wait
+
+
+# ===========================
+# DECORATOR
+# ===========================
+def throttle(scope, fields=()):
+    """Throttle POSTs to a view; GETs are never charged."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if settings.THROTTLE_ENABLED and request.method == "POST":
+                wait = check(request, scope, fields)
+                if wait:
+                    retry_after = max(1, int(wait + 0.999))
+                    logger.info("Throttled %s POST from %s", scope, client_ip(request))
+                    response = render(request, "website/throttled.html", {"retry_after": retry_after}, status=429)
+                    response["Retry-After"] = str(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -19,9 +19,17 @@ urlpatterns = [
     path('knowledge/', views.knowledge_center, name='knowledge'),
     path('categories/', views.categories, name='categories'),
     path('magazine/', views.magazine, name='magazine'),
+    path('magazine/<slug:slug>/', views.magazine_detail, name='magazine_detail'),
+    path('autocomplete/<slug:source>/', views.autocomplete_view, name='autocomplete'),
+
+    # Sitemaps & feeds (pre-built files, see website/syndication.py)
+    path('sitemap.xml', views.sitemap_index, name='sitemap'),
+    path('sitemap-<slug:section>.xml', views.sitemap_section, name='sitemap_section'),
+    path('feeds/<str:name>', views.feed, name='feed'),
 
     # Features (some render templates in directory app, but routed via website)
     path('impact-tracker/', views.impact_tracker, name='impact_tracker'),
+    path('impact-tracker/diverted.csv', views.impact_export, name='impact_export'),
     path('support/', views.support, name='support'),
     path('loops/', views.loops_detail, name='loops_detail'),
     path('tiers/', views.tiers, name='tiers'),
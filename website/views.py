@@ -6,21 +6,54 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.contrib.auth import login, logout
 from django.core.paginator import Paginator
+from django.db.models import BooleanField, Case, Q, Value, When, Window
+from django.db.models.functions import RowNumber
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib import messages
-
+from django.http import FileResponse, Http404, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import condition, require_GET
+from django.views.static import was_modified_since
+
+from callsoso import autocomplete
+from callsoso.pagination import KnownCountPaginator
+from directory import metrics as diverted_metrics
+
+from . import category_registry, founders, freshness, rollups, syndication
+from .feeds import FEEDS
+from .throttling import throttle
 from .models import (
     Collaboration,
     Contribution,
-    FoundersList,
     Article,
     Resource,
-    Category,
     MagazineIssue,
     PopularArticle,
 )
 
+# ---------------------------
+# Template engine selection
+# ---------------------------
+# Public templates that have a Jinja2 port in website/jinja2/.
+JINJA2_TEMPLATES = {
+    "website/insights.html",
+    "website/news.html",
+    "website/magazine.html",
+    "website/knowledge_center.html",
+}
+
+
+def render_public(request, template_name, context=None):
+    """
+    Render a public page with the engine chosen by WEBSITE_TEMPLATE_ENGINE,
+    falling back to the Django engine for templates without a port.
+    """
+    using = settings.WEBSITE_TEMPLATE_ENGINE if template_name in JINJA2_TEMPLATES else None
+    return render(request, template_name, context, using=using)
+
+
 # ---------------------------
 # Magazine / Popular Data
 # ---------------------------
@@ -51,6 +84,7 @@ POPULAR_ARTICLES = [
 # ---------------------------
 # Home View
 # ---------------------------
+@throttle("founders")
 def home(request):
     hero_microcopy = [
         "Every material has a second life.",
@@ -65,14 +99,16 @@ def home(request):
         "Circularity begins with attention.",
     ]
 
-    latest_articles = Article.objects.filter(is_published=True).order_by("-published_date", "-created_at")[:3]
+    latest_articles = Article.objects.for_lists().order_by("-published_date", "-created_at")[:3]
     featured_resources = Resource.objects.filter(published=True, is_featured=True).order_by("-created_at")[:3]
 
     if request.method == "POST":
         email = request.POST.get("email")
         if email:
-            FoundersList.objects.get_or_create(email=email)
-            messages.success(request, "Thanks for joining the Call Soso founders list.")
+            if founders.add_signup(email):
+                messages.success(request, "Thanks for joining the Call Soso founders list.")
+            else:
+                messages.error(request, "Please enter a valid email address.")
             return redirect("website:home")
 
     context = {
@@ -94,6 +130,7 @@ def about(request):
 # ---------------------------
 # Contact
 # ---------------------------
+@throttle("contact")
 def contact(request):
     if request.method == "POST":
         name = request.POST.get('name')
@@ -119,44 +156,58 @@ def contact(request):
 # ---------------------------
 # News View
 # ---------------------------
+@freshness.content_cache_control
+@condition(etag_func=freshness.news_etag)
 def news(request):
     # Fetch all published articles
-    articles_qs = Article.objects.filter(is_published=True).order_by("-published_date", "-created_at")
+    articles_qs = Article.objects.for_lists().order_by("-published_date", "-created_at")
+    registry = category_registry.get()
+
+    # Filter by category (an unknown slug matches nothing)
+    category_slug = request.GET.get("category", "").strip()
+    if category_slug:
+        category = registry.by_slug.get(category_slug)
+        articles_qs = articles_qs.filter(categories=category.id) if category else articles_qs.none()
 
     # Featured and popular
     featured_articles = articles_qs.filter(is_featured=True)[:3]
     popular_articles = articles_qs[:4]
 
-    # Pagination
+    # Pagination (cards use the stored teaser and category labels)
     paginator = Paginator(articles_qs, 5)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
-    # All categories for filter UI
-    all_categories = Category.objects.all()
-
     context = {
         "articles": page_obj.object_list,
         "featured_articles": featured_articles,
         "popular_articles": popular_articles,
         "page_obj": page_obj,
         "is_paginated": page_obj.has_other_pages(),
-        "all_categories": all_categories,
+        "all_categories": registry.entries,  # filter UI
+        "selected_category": category_slug,
     }
 
-    return render(request, "website/news.html", context)
+    return render_public(request, "website/news.html", context)
 
 
 # ---------------------------
 # Article Detail View
 # ---------------------------
+@freshness.content_cache_control
+@condition(etag_func=freshness.article_detail_etag)
 def article_detail(request, slug):
     # Fetch the requested article
     article = get_object_or_404(Article, slug=slug, is_published=True)
 
+    # The body is rendered on save; catch up on rows not rendered yet (see render_articles)
+    if article.render_body():
+        Article.objects.filter(pk=article.pk).update(
+            body_html=article.body_html, toc=article.toc, body_hash=article.body_hash
+        )
+
     # Fetch related articles: same categories, exclude current article
-    related_articles = Article.objects.filter(
-        is_published=True,
+    related_articles = Article.objects.for_lists().filter(
         categories__in=article.categories.all()
     ).exclude(pk=article.pk).distinct().order_by('-published_date')[:4]
 
@@ -186,15 +237,15 @@ def insights(request):
     - Uses Article.display_image property
     """
 
-    # Fetch all published articles, newest first
-    articles = Article.objects.filter(is_published=True).order_by('-published_date', '-created_at')
+    # Fetch all published articles, newest first; category names come from the registry
+    articles_qs = Article.objects.for_lists().order_by('-published_date', '-created_at')
+    articles = category_registry.attach(articles_qs, queryset=articles_qs)
 
     # Build category → articles mapping
     categories_map = {}
     for article in articles:
-        category_names = [cat.name for cat in article.categories.all()]
-        if category_names:
-            for category in category_names:
+        if article.category_names:
+            for category in article.category_names:
                 categories_map.setdefault(category, []).append(article)
         else:
             categories_map.setdefault("Uncategorized", []).append(article)
@@ -216,7 +267,7 @@ def insights(request):
         "popular": popular_articles,          # Sidebar popular list
     }
 
-    return render(request, "website/insights.html", context)
+    return render_public(request, "website/insights.html", context)
 
 
 # ---------------------------
@@ -231,24 +282,24 @@ def knowledge_center(request):
     """
 
     # Sidebar categories
-    categories = Category.objects.all().order_by("name")
+    categories = category_registry.get().entries
 
     # Fetch all published resources
-    resources_qs = Resource.objects.filter(published=True).prefetch_related("categories").order_by("-created_at")
+    resources_qs = Resource.objects.filter(published=True).order_by("-created_at")
+    all_resources = category_registry.attach(resources_qs, queryset=resources_qs)
 
     highlights = []
     resources = []
 
-    for r in resources_qs:
-        cats = r.categories.all()
+    for r in all_resources:
         resource_data = {
             "title": r.title,
             "published_date": r.created_at,
             "description": r.description,
             "link": r.link,
             "display_image": r.display_image,  # Uses model property
-            "categories": [cat.name for cat in cats],
-            "category_ids": [str(cat.id) for cat in cats],
+            "categories": r.category_names,
+            "category_ids": [str(pk) for pk in r.category_ids],
         }
 
         if r.is_featured:
@@ -257,14 +308,13 @@ def knowledge_center(request):
             resources.append(resource_data)
 
     # Popular resources: top 5 newest
-    popular_qs = resources_qs.order_by("-created_at")[:5]
     popular = [
         {
             "title": r.title,
             "published_date": r.created_at,
             "link": r.link,
         }
-        for r in popular_qs
+        for r in all_resources[:5]
     ]
 
     context = {
@@ -274,58 +324,164 @@ def knowledge_center(request):
         "popular": popular,
     }
 
-    return render(request, "website/knowledge_center.html", context)
+    return render_public(request, "website/knowledge_center.html", context)
 
 
 # ---------------------------
 # Categories
 # ---------------------------
 def categories(request):
-    return render(request, 'website/categories.html')
+    # Names and published counts come from the in-process registry
+    return render(request, 'website/categories.html', {'categories': category_registry.get().entries})
 
 # ---------------------------
 # Magazine
 # ---------------------------
-def magazine(request):
-    query = request.GET.get("q", "").strip()
-    category_slug = request.GET.get("category", "").strip()
+MAGAZINE_FEATURED = 4
+MAGAZINE_PAGE_SIZE = 12
+
 
-    # Base queryset
-    issues = MagazineIssue.objects.filter(is_published=True)
+def _issue_cursor(issue):
+    return f"{issue.published_date.isoformat()}.{issue.pk}"
 
-    # Filter by search
-    if query:
-        issues = issues.filter(title__icontains=query)
 
-    # Filter by category
+def _parse_issue_cursor(raw):
+    """``(published_date, id)`` from ``?after=``, or None if absent or malformed."""
+    published, _, pk = raw.partition(".")
+    try:
+        return date.fromisoformat(published), int(pk)
+    except ValueError:
+        return None
+
+
+def magazine_issues(query="", category_slug=""):
+    """Published issues matching the search box and category filter."""
+    issues = MagazineIssue.objects.filter(is_published=True).search(query)
     if category_slug:
-        issues = issues.filter(categories__slug=category_slug)
+        category = category_registry.get().by_slug.get(category_slug)
+        issues = issues.in_category(category.id) if category else issues.none()
+    return issues
+
 
-    # Featured vs regular
-    featured_issues = issues.filter(is_featured=True)[:4]
-    regular_issues = issues.exclude(id__in=[issue.id for issue in featured_issues])
+@freshness.content_cache_control
+@condition(etag_func=freshness.magazine_etag)
+def magazine(request):
+    query = request.GET.get("q", "").strip()
+    category_slug = request.GET.get("category", "").strip()
+    cursor = _parse_issue_cursor(request.GET.get("after", ""))
+
+    # One query returns the slider (newest featured issues) first, then the
+    # next page of the grid plus one row that tells whether there is more.
+    issues = magazine_issues(query, category_slug).annotate(
+        featured_rank=Window(RowNumber(), partition_by="is_featured", order_by=("-published_date", "-id"))
+    )
+    is_slider = Q(is_featured=True, featured_rank__lte=MAGAZINE_FEATURED)
+    if cursor:
+        published, pk = cursor
+        issues = issues.filter(is_slider | Q(published_date__lt=published) | Q(published_date=published, id__lt=pk))
+    rows = issues.annotate(
+        in_grid=Case(When(is_slider, then=Value(False)), default=Value(True), output_field=BooleanField())
+    ).order_by("in_grid", "-published_date", "-id")[: MAGAZINE_FEATURED + MAGAZINE_PAGE_SIZE + 1]
+
+    # Featured vs regular, in one pass; the featured slider shows on every page
+    featured_issues, regular_issues = [], []
+    for issue in rows:
+        (regular_issues if issue.in_grid else featured_issues).append(issue)
+    has_next = len(regular_issues) > MAGAZINE_PAGE_SIZE
+    regular_issues = regular_issues[:MAGAZINE_PAGE_SIZE]
 
     # Popular articles for sidebar
     popular_articles = PopularArticle.objects.all()[:5]
 
-    # Categories for filter bar
-    all_categories = Category.objects.all()
-
     context = {
-        "issues": issues,
         "featured_issues": featured_issues,
         "regular_issues": regular_issues,
+        "next_cursor": _issue_cursor(regular_issues[-1]) if has_next else "",
+        "is_older_page": bool(cursor),
+        "is_paginated": has_next or bool(cursor),
         "popular_articles": popular_articles,
         "search_query": query,
-        "all_categories": all_categories,
+        "all_categories": category_registry.get().entries,  # filter bar
         "selected_category": category_slug,
     }
 
-    return render(request, "website/magazine.html", context)
+    return render_public(request, "website/magazine.html", context)
+
+
+# ---------------------------
+# Autocomplete
+# ---------------------------
+AUTOCOMPLETE_MAX_RESULTS = 10
+
+
+@require_GET
+def autocomplete_view(request, source):
+    """Typeahead suggestions from the in-memory prefix index (callsoso.autocomplete)."""
+    found = autocomplete.get_source(source)
+    if found is None:
+        raise Http404(source)
+    if found.login_required and not request.user.is_authenticated:
+        return JsonResponse({"results": []}, status=403)
+    results = autocomplete.complete(source, request.GET.get("q", "")[:100], AUTOCOMPLETE_MAX_RESULTS)
+    response = JsonResponse({"results": results})
+    if found.login_required:
+        patch_cache_control(response, private=True, max_age=60)
+    else:
+        patch_cache_control(response, public=True, max_age=60)
+    return response
+
+
+def magazine_detail(request, slug):
+    issue = get_object_or_404(MagazineIssue, slug=slug, is_published=True)
+    return render(request, 'website/magazine_detail.html', {
+        'issue': issue,
+        'categories': issue.categories.all(),
+    })
+
+
+# ---------------------------
+# Sitemaps & Feeds (pre-built files)
+# ---------------------------
+FEED_NAMES = {name for feeds in FEEDS.values() for name in feeds}
+
+
+def _serve_prebuilt(request, name):
+    path = syndication.ensure_built(name)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        raise Http404(name)
+    if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(path.open("rb"), content_type=syndication.CONTENT_TYPES[path.suffix])
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=settings.CONTENT_CACHE_MAX_AGE,
+        s_maxage=settings.CONTENT_CACHE_S_MAXAGE,
+    )
+    return response
+
+
+def sitemap_index(request):
+    return _serve_prebuilt(request, "sitemap.xml")
+
+
+def sitemap_section(request, section):
+    return _serve_prebuilt(request, f"sitemap-{section}.xml")
+
+
+def feed(request, name):
+    if name not in FEED_NAMES:
+        raise Http404(name)
+    return _serve_prebuilt(request, f"feeds/{name}")
 
 # ---------------------------
 # Signup / Login / Logout
 # ---------------------------
+@throttle("signup")
 def signup_view(request):
     if request.method == "POST":
         form = UserCreationForm(request.POST)
@@ -340,6 +496,7 @@ def signup_view(request):
         form = UserCreationForm()
     return render(request, 'website/signup.html', {'form': form})
 
+@throttle("login", fields=("username",))
 def login_view(request):
     next_page = request.GET.get('next') or 'directory:directory_home'
 
@@ -368,13 +525,41 @@ def logout_view(request):
 # ---------------------------
 @login_required(login_url=settings.LOGIN_URL)
 def impact_tracker(request):
-    collaborations = Collaboration.objects.all().order_by('-planted_date')
-    return render(request, 'website/impact_tracker.html', {'collaborations': collaborations})
+    summary = rollups.stage_summary()
+    collaborations = Collaboration.objects.order_by('-planted_date', '-pk')
+    stage = request.GET.get('stage', '')
+    if f'stage_{stage}' in summary:
+        collaborations = collaborations.filter(growth_stage=int(stage))
+        total = summary[f'stage_{stage}']
+    else:
+        stage, total = '', sum(summary.values())
+    # Totals come from the rollup, so paging never runs COUNT(*).
+    page_obj = KnownCountPaginator(collaborations, 24, count=total).get_page(request.GET.get('page'))
+    return render(request, 'website/impact_tracker.html', {
+        'summary': summary,
+        'diverted': diverted_metrics.summary(),
+        'collaborations': page_obj,
+        'page_obj': page_obj,
+        'stage': stage,
+    })
+
+@login_required(login_url=settings.LOGIN_URL)
+def impact_export(request):
+    """Materials diverted per month, material and location, as CSV."""
+    response = StreamingHttpResponse(diverted_metrics.export_rows(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="callsoso-materials-diverted.csv"'
+    return response
 
 @login_required(login_url=settings.LOGIN_URL)
 def support(request):
-    contributions = Contribution.objects.all().order_by('-date')
-    return render(request, 'website/support.html', {'contributions': contributions})
+    summary = rollups.contribution_summary()
+    contributions = Contribution.objects.select_related('user').order_by('-date', '-pk')
+    page_obj = KnownCountPaginator(contributions, 20, count=summary['count']).get_page(request.GET.get('page'))
+    return render(request, 'website/support.html', {
+        'summary': summary,
+        'contributions': page_obj,
+        'page_obj': page_obj,
+    })
 
 @login_required(login_url=settings.LOGIN_URL)
 def loops_detail(request):